@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class AnaliticaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.analitica'
+
+    def ready(self):
+        """
+        Importa los signals que invalidan la caché de analítica y los
+        checks de configuración
+        """
+        import apps.analitica.checks
+        import apps.analitica.signals
@@ -0,0 +1,214 @@
+"""
+Caché de resultados de las vistas de analítica.
+
+Cada respuesta se guarda bajo una clave formada por el alcance del usuario
+(``admin`` o la dependencia del funcionario), el endpoint y los parámetros de
+consulta normalizados. La clave incluye además una *generación* por alcance,
+que se incrementa cuando se guarda una solicitud o un comentario (ver
+``apps.analitica.signals``). Así, invalidar es solo incrementar un contador y
+las entradas viejas expiran por su TTL.
+
+Las generaciones viven en ``GeneracionCache`` y cada proceso guarda una copia
+en la caché durante ``GENERACION_TTL``: con una caché local por proceso
+(locmem) los demás procesos ven la invalidación a más tardar en ese plazo, y
+un reinicio no las devuelve a un valor ya usado. En producción la caché debe
+ser compartida (ver ``apps.analitica.checks``).
+"""
+
+import functools
+import hashlib
+import json
+import time
+import uuid
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.analitica.models import GeneracionCache
+from apps.autenticacion.alcance import dependencia_id_de
+
+PREFIJO = "analitica"
+GENERACION_GLOBAL = f"{PREFIJO}:gen:global"
+ESPERA_BLOQUEO = 5  # segundos que se espera a que otro proceso calcule
+INTERVALO_ESPERA = 0.05
+TTL_BLOQUEO = 30
+GENERACION_TTL = 60  # segundos que un proceso confía en su copia de la generación
+
+
+def _clave_generacion_dependencia(dependencia_id: int) -> str:
+    return f"{PREFIJO}:gen:dep:{dependencia_id}"
+
+
+def _generacion_inicial() -> int:
+    # Basada en el reloj para no reutilizar generaciones si la caché se vacía
+    return time.time_ns() // 1000
+
+
+def _incrementar(clave: str):
+    with transaction.atomic():
+        if not GeneracionCache.objects.filter(clave=clave).update(valor=F("valor") + 1):
+            try:
+                with transaction.atomic():
+                    GeneracionCache.objects.create(clave=clave, valor=_generacion_inicial())
+            except IntegrityError:
+                # Otro proceso la creó entre el UPDATE y el INSERT
+                GeneracionCache.objects.filter(clave=clave).update(valor=F("valor") + 1)
+        valor = GeneracionCache.objects.values_list("valor", flat=True).get(clave=clave)
+    cache.set(clave, valor, timeout=GENERACION_TTL)
+
+
+def invalidar_dependencias(dependencia_ids):
+    """Invalida las respuestas de las dependencias y, una vez, las globales (admin)."""
+    for dependencia_id in set(dependencia_ids) - {None}:
+        _incrementar(_clave_generacion_dependencia(dependencia_id))
+    _incrementar(GENERACION_GLOBAL)
+
+
+def invalidar_dependencia(dependencia_id: int | None):
+    """Invalida las respuestas de la dependencia y las globales (admin)."""
+    invalidar_dependencias([dependencia_id])
+
+
+def _generacion(clave: str, exacta: bool = False) -> int:
+    """
+    Generación vigente de ``clave``. Con ``exacta`` se lee siempre de la base
+    de datos (para lo que se persiste, como las exportaciones).
+    """
+    if not exacta:
+        generacion = cache.get(clave)
+        if generacion is not None:
+            return generacion
+    generacion = (
+        GeneracionCache.objects.filter(clave=clave).values_list("valor", flat=True).first()
+    )
+    if generacion is None:
+        generacion = GeneracionCache.objects.get_or_create(
+            clave=clave, defaults={"valor": _generacion_inicial()}
+        )[0].valor
+    cache.set(clave, generacion, timeout=GENERACION_TTL)
+    return generacion
+
+
+def alcance_de(user) -> tuple[str, str] | None:
+    """
+    ``(alcance, clave_de_generacion)`` del usuario, o ``None`` si sus
+    resultados no deben cachearse.
+    """
+    if getattr(user, "rol", None) == "admin":
+        return "admin", GENERACION_GLOBAL
+    dependencia_id = dependencia_id_de(user)
+    if dependencia_id is None:
+        return None
+    return f"dep{dependencia_id}", _clave_generacion_dependencia(dependencia_id)
+
+
+def generacion_de(user) -> tuple[str, int] | None:
+    """
+    ``(alcance, generacion_vigente)`` del usuario, o ``None`` sin alcance.
+    Se lee de la base de datos: sirve para identificar archivos guardados.
+    """
+    alcance = alcance_de(user)
+    if alcance is None:
+        return None
+    nombre_alcance, clave_generacion = alcance
+    return nombre_alcance, _generacion(clave_generacion, exacta=True)
+
+
+def _parametros_normalizados(query_params) -> str:
+    pares = sorted(
+        (clave, valor)
+        for clave in query_params
+        for valor in query_params.getlist(clave)
+    )
+    return hashlib.sha1(json.dumps(pares).encode()).hexdigest()
+
+
+def _etag(data) -> str:
+    contenido = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    return '"%s"' % hashlib.md5(contenido.encode()).hexdigest()
+
+
+def _calcular_una_vez(clave: str, calcular, ttl: int):
+    """
+    Evita la estampida: solo quien obtiene el bloqueo calcula; los demás
+    esperan brevemente a que aparezca el resultado.
+    """
+    bloqueo = f"{clave}:bloqueo"
+    ficha = uuid.uuid4().hex
+    propio = cache.add(bloqueo, ficha, timeout=TTL_BLOQUEO)
+    if not propio:
+        limite = time.monotonic() + ESPERA_BLOQUEO
+        while time.monotonic() < limite:
+            time.sleep(INTERVALO_ESPERA)
+            entrada = cache.get(clave)
+            if entrada is not None:
+                return entrada
+        # El otro proceso tardó demasiado; calcular sin tocar su bloqueo
+
+    try:
+        entrada = calcular()
+        if entrada is not None:
+            cache.set(clave, entrada, timeout=ttl)
+        return entrada
+    finally:
+        # Si el cálculo superó TTL_BLOQUEO el bloqueo ya puede ser de otro
+        if propio and cache.get(bloqueo) == ficha:
+            cache.delete(bloqueo)
+
+
+def cache_analitica(endpoint: str, ttl: int = 300):
+    """
+    Decorador para ``get`` de vistas de analítica. Cachea las respuestas 200
+    por alcance y parámetros, y responde 304 si el ``If-None-Match`` del
+    cliente coincide con el ``ETag`` vigente.
+    """
+
+    def decorador(get):
+        @functools.wraps(get)
+        def envoltura(self, request, *args, **kwargs):
+            alcance = alcance_de(request.user)
+            if alcance is None:
+                return get(self, request, *args, **kwargs)
+
+            nombre_alcance, clave_generacion = alcance
+            clave = ":".join(
+                [
+                    PREFIJO,
+                    endpoint,
+                    nombre_alcance,
+                    str(_generacion(clave_generacion)),
+                    _parametros_normalizados(request.query_params),
+                ]
+            )
+
+            respuesta_original = None
+
+            def calcular():
+                nonlocal respuesta_original
+                respuesta_original = get(self, request, *args, **kwargs)
+                if respuesta_original.status_code != status.HTTP_200_OK:
+                    return None
+                data = respuesta_original.data
+                return {"data": data, "etag": _etag(data)}
+
+            entrada = cache.get(clave)
+            if entrada is None:
+                entrada = _calcular_una_vez(clave, calcular, ttl)
+            if entrada is None:
+                return respuesta_original
+
+            if request.headers.get("If-None-Match") == entrada["etag"]:
+                respuesta = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                respuesta = Response(entrada["data"])
+            respuesta["ETag"] = entrada["etag"]
+            respuesta["Cache-Control"] = "private, no-cache"
+            return respuesta
+
+        return envoltura
+
+    return decorador
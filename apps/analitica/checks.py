@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+CACHES_LOCALES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(deploy=True)
+def revisar_cache_compartida(app_configs, **kwargs):
+    """
+    Con varios procesos la caché de analítica debe ser compartida: con una
+    caché local cada proceso tiene sus propias respuestas y generaciones.
+    """
+    if settings.CACHES["default"]["BACKEND"] not in CACHES_LOCALES:
+        return []
+    return [
+        Warning(
+            "La caché por defecto es local al proceso.",
+            hint=(
+                "Configure CACHE_URL con una caché compartida (Redis o "
+                "Memcached) para que la caché de analítica y los conteos de "
+                "notificaciones no leídas se invaliden en todos los procesos."
+            ),
+            id="analitica.W001",
+        )
+    ]
@@ -0,0 +1,227 @@
+"""
+Mantenimiento y consulta del cubo diario ``SolicitudDiaria`` y de los
+digestos de tiempos ``TiempoDiario``.
+
+El cubo se refresca por (día, dependencia): se recalculan desde ``Solicitud``
+las filas de esos pares y se reemplazan. Los signals juntan los pares de las
+solicitudes guardadas en una transacción y los refrescan una sola vez al
+confirmarla; si el refresco falla quedan en ``CuboPendiente``. El comando
+``refrescar_cubo_solicitudes`` procesa esos pendientes y reconstruye rangos
+completos (p. ej. tras actualizaciones masivas con ``update()``, o al mover
+una solicitud a una categoría de otra dependencia o cambiar la localidad de
+un ciudadano).
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from apps.analitica.models import CuboPendiente, SolicitudDiaria, TiempoDiario
+from apps.analitica.tdigest import TDigest
+from apps.solicitudes.models import Solicitud
+
+INTENTOS_REFRESCO = 3
+
+
+def dia_local(fecha: datetime) -> date:
+    """Día del cubo al que pertenece una fecha (zona horaria del proyecto)."""
+    return timezone.localtime(fecha).date()
+
+
+def a_dia(valor) -> date | None:
+    """
+    Convierte un parámetro de fecha (``date``, ``datetime`` o texto ISO) a día.
+    Devuelve ``None`` si el texto no es una fecha válida (p. ej. ``2024-02-30``).
+    """
+    if valor is None or isinstance(valor, date) and not isinstance(valor, datetime):
+        return valor
+    if isinstance(valor, str):
+        try:
+            fecha = parse_datetime(valor)
+            if fecha is None:
+                return parse_date(valor)
+        except ValueError:
+            return None
+        valor = fecha
+    if timezone.is_naive(valor):
+        return valor.date()
+    return dia_local(valor)
+
+
+def filtros_dias(desde=None, hasta=None) -> tuple[dict, dict]:
+    """
+    Límites inclusivos por día para ``Solicitud`` y para el cubo, iguales en
+    ambos. Acepta lo mismo que ``a_dia``; los valores vacíos o que no son una
+    fecha válida se ignoran.
+    """
+    solicitudes, cubo = {}, {}
+    for sufijo, valor in (("gte", desde), ("lte", hasta)):
+        dia = a_dia(valor)
+        if dia is not None:
+            solicitudes[f"fecha_creacion__date__{sufijo}"] = dia
+            cubo[f"dia__{sufijo}"] = dia
+    return solicitudes, cubo
+
+
+def _duracion(fin: str):
+    return ExpressionWrapper(F(fin) - F("fecha_creacion"), output_field=DurationField())
+
+
+def _filas(solicitudes):
+    """Agrupa ``solicitudes`` en las filas del cubo."""
+    filas = (
+        solicitudes.order_by()
+        .annotate(dia=TruncDate("fecha_creacion"))
+        .values(
+            "dia",
+            "categoria_id",
+            "estado",
+            dependencia_id=F("categoria__dependencia_municipal_id"),
+            localidad_id=F("ciudadano__localidad_id"),
+        )
+        .annotate(
+            cantidad=Count("id"),
+            respondidas=Count("fecha_visto"),
+            duracion_respuesta=Sum(_duracion("fecha_visto")),
+            resueltas=Count("fecha_resolucion"),
+            duracion_resolucion=Sum(_duracion("fecha_resolucion")),
+        )
+    )
+    for fila in filas:
+        respuesta = fila.pop("duracion_respuesta")
+        resolucion = fila.pop("duracion_resolucion")
+        yield SolicitudDiaria(
+            segundos_respuesta=respuesta.total_seconds() if respuesta else 0,
+            segundos_resolucion=resolucion.total_seconds() if resolucion else 0,
+            **fila,
+        )
+
+
+def _tiempos(solicitudes, chunk_size: int = 2000):
+    """Digestos diarios de primera respuesta y resolución de ``solicitudes``."""
+    filas = (
+        solicitudes.order_by()
+        .annotate(
+            dia=TruncDate("fecha_creacion"),
+            respuesta=_duracion("fecha_visto"),
+            resolucion=_duracion("fecha_resolucion"),
+        )
+        .values_list(
+            "dia",
+            "categoria__dependencia_municipal_id",
+            "categoria_id",
+            "estado",
+            "respuesta",
+            "resolucion",
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    horas = defaultdict(list)
+    for dia, dependencia_id, categoria_id, estado, respuesta, resolucion in filas:
+        if respuesta is not None:
+            horas[dia, dependencia_id, categoria_id, "respuesta"].append(
+                respuesta.total_seconds() / 3600
+            )
+        if resolucion is not None and estado == "completada":
+            horas[dia, dependencia_id, categoria_id, "resolucion"].append(
+                resolucion.total_seconds() / 3600
+            )
+
+    for (dia, dependencia_id, categoria_id, metrica), valores in horas.items():
+        yield TiempoDiario(
+            dia=dia,
+            dependencia_id=dependencia_id,
+            categoria_id=categoria_id,
+            metrica=metrica,
+            cantidad=len(valores),
+            digesto=TDigest().agregar(valores).a_dict(),
+        )
+
+
+def _reemplazar(filtro_cubo: Q, solicitudes, batch_size: int) -> int:
+    SolicitudDiaria.objects.filter(filtro_cubo).delete()
+    TiempoDiario.objects.filter(filtro_cubo).delete()
+    creadas = SolicitudDiaria.objects.bulk_create(_filas(solicitudes), batch_size=batch_size)
+    TiempoDiario.objects.bulk_create(_tiempos(solicitudes), batch_size=batch_size)
+    return len(creadas)
+
+
+def refrescar_pares(pares, batch_size: int = 1000) -> int:
+    """
+    Recalcula las filas del cubo de los pares ``(dia, dependencia_id)``. Si
+    otro proceso refresca el mismo par a la vez, la restricción única hace
+    fallar a uno de los dos, que reintenta con los datos ya confirmados.
+    """
+    pares = set(pares)
+    if not pares:
+        return 0
+    filtro_cubo = Q()
+    filtro_solicitudes = Q()
+    for dia, dependencia_id in pares:
+        filtro_cubo |= Q(dia=dia, dependencia_id=dependencia_id)
+        filtro_solicitudes |= Q(
+            fecha_creacion__date=dia, categoria__dependencia_municipal_id=dependencia_id
+        )
+    for intento in range(INTENTOS_REFRESCO):
+        try:
+            with transaction.atomic():
+                return _reemplazar(
+                    filtro_cubo, Solicitud.objects.filter(filtro_solicitudes), batch_size
+                )
+        except IntegrityError:
+            if intento == INTENTOS_REFRESCO - 1:
+                raise
+
+
+def marcar_pendientes(pares):
+    """Deja los pares para el comando ``refrescar_cubo_solicitudes``."""
+    CuboPendiente.objects.bulk_create(
+        [CuboPendiente(dia=dia, dependencia_id=dependencia_id) for dia, dependencia_id in pares],
+        ignore_conflicts=True,
+    )
+
+
+def refrescar_pendientes(batch_size: int = 1000) -> int:
+    """Refresca los pares marcados como pendientes y los quita de la cola."""
+    pendientes = list(CuboPendiente.objects.values_list("id", "dia", "dependencia_id"))
+    if not pendientes:
+        return 0
+    with transaction.atomic():
+        # Si el refresco falla, los pendientes vuelven con el rollback
+        CuboPendiente.objects.filter(pk__in=[pk for pk, _, _ in pendientes]).delete()
+        return refrescar_pares(
+            [(dia, dependencia_id) for _, dia, dependencia_id in pendientes], batch_size
+        )
+
+
+def reconstruir_cubo(desde: date | None = None, batch_size: int = 1000) -> int:
+    """Reconstruye el cubo completo, o desde el día ``desde`` en adelante."""
+    filtro_cubo = Q()
+    solicitudes = Solicitud.objects.all()
+    if desde is not None:
+        filtro_cubo = Q(dia__gte=desde)
+        solicitudes = solicitudes.filter(fecha_creacion__date__gte=desde)
+
+    with transaction.atomic():
+        CuboPendiente.objects.filter(filtro_cubo).delete()
+        return _reemplazar(filtro_cubo, solicitudes, batch_size)
+
+
+def sumas_por_estado() -> dict:
+    """Anotaciones de conteo por estado sobre filas del cubo."""
+
+    def suma(**filtro):
+        return Coalesce(Sum("cantidad", filter=Q(**filtro) if filtro else None), 0)
+
+    return {
+        "total": suma(),
+        "completadas": suma(estado="completada"),
+        "rechazadas": suma(estado="rechazada"),
+        "enviadas": suma(estado="enviada"),
+        "vistas": suma(estado="visto"),
+    }
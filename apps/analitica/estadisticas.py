@@ -0,0 +1,179 @@
+"""
+Motor de agregación de solicitudes en una sola lectura.
+
+En lugar de lanzar una consulta por cada desglose (conteos por estado,
+categoría, localidad, tendencia mensual, tiempos...), se leen una vez las
+filas del cubo diario ``SolicitudDiaria`` ya filtradas y todos los desgloses
+se calculan en memoria con pandas, ponderando por la ``cantidad`` de cada fila.
+"""
+
+from datetime import datetime, time
+
+import pandas as pd
+from django.db.models import QuerySet
+from django.utils import timezone
+
+ESTADOS_PENDIENTES = ("enviada", "visto")
+
+
+class AgregadoSolicitudes:
+    """Desgloses de un queryset de ``SolicitudDiaria`` calculados sobre una sola lectura."""
+
+    columnas = (
+        "dia",
+        "estado",
+        "categoria_id",
+        "categoria__nombre",
+        "dependencia_id",
+        "dependencia__nombre",
+        "localidad_id",
+        "localidad__colonia",
+        "localidad__codigo_postal",
+        "localidad__municipio",
+        "cantidad",
+        "respondidas",
+        "segundos_respuesta",
+    )
+
+    def __init__(self, cubo: QuerySet, chunk_size: int = 2000):
+        filas = cubo.order_by().values_list(*self.columnas).iterator(chunk_size=chunk_size)
+        self.df = pd.DataFrame.from_records(filas, columns=self.columnas)
+
+    @property
+    def total(self) -> int:
+        return int(self.df["cantidad"].sum())
+
+    def conteo_por_estado(self) -> dict[str, int]:
+        return {
+            estado: int(total)
+            for estado, total in self.df.groupby("estado")["cantidad"].sum().items()
+        }
+
+    def tiempo_promedio_respuesta_horas(self) -> float | None:
+        respondidas = self.df["respondidas"].sum()
+        if not respondidas:
+            return None
+        return float(self.df["segundos_respuesta"].sum() / respondidas / 3600)
+
+    def resumen(self) -> dict:
+        conteo = self.conteo_por_estado()
+        horas = self.tiempo_promedio_respuesta_horas()
+        return {
+            "total_solicitudes": self.total,
+            "completadas": conteo.get("completada", 0),
+            "rechazadas": conteo.get("rechazada", 0),
+            "enviadas": conteo.get("enviada", 0),
+            "vistas": conteo.get("visto", 0),
+            "tiempo_promedio_respuesta_horas": round(horas, 2) if horas else None,
+        }
+
+    def por_estado(self) -> list[dict]:
+        return [
+            {"estado": estado, "total": total}
+            for estado, total in sorted(
+                self.conteo_por_estado().items(), key=lambda x: -x[1]
+            )
+        ]
+
+    def _top(self, campos: dict, limite: int | None, nombre_total="total"):
+        """Agrupa por ``campos`` (columna -> clave de salida) y ordena por total."""
+        if self.df.empty:
+            return []
+        conteo = (
+            self.df.groupby(list(campos), sort=True)["cantidad"]
+            .sum()
+            .sort_values(ascending=False, kind="stable")
+        )
+        if limite is not None:
+            conteo = conteo.head(limite)
+
+        resultado = []
+        for claves, total in conteo.items():
+            claves = claves if isinstance(claves, tuple) else (claves,)
+            fila = {
+                salida: self._nativo(valor)
+                for salida, valor in zip(campos.values(), claves)
+            }
+            fila[nombre_total] = int(total)
+            resultado.append(fila)
+        return resultado
+
+    @staticmethod
+    def _nativo(valor):
+        return valor.item() if hasattr(valor, "item") else valor
+
+    def por_categoria(self, limite: int = 10, claves: dict | None = None) -> list[dict]:
+        return self._top(
+            claves
+            or {"categoria__nombre": "categoria__nombre", "categoria_id": "categoria_id"},
+            limite,
+        )
+
+    def por_localidad(self, limite: int = 10) -> list[dict]:
+        return self._top(
+            {
+                "localidad__colonia": "ciudadano__localidad__colonia",
+                "localidad_id": "ciudadano__localidad_id",
+            },
+            limite,
+        )
+
+    def por_localidad_detallada(self, limite: int = 20) -> list[dict]:
+        return self._top(
+            {
+                "localidad__colonia": "localidad",
+                "localidad__codigo_postal": "codigo_postal",
+                "localidad__municipio": "municipio",
+            },
+            limite,
+            nombre_total="total_solicitudes",
+        )
+
+    def tendencia_diaria(self) -> list[dict]:
+        if self.df.empty:
+            return []
+        conteo = self.df.groupby("dia", sort=True)["cantidad"].sum()
+        return [{"fecha": dia, "total": int(total)} for dia, total in conteo.items()]
+
+    def tendencia_mensual(self) -> list[dict]:
+        """Equivalente a ``TruncMonth`` en la zona horaria actual."""
+        if self.df.empty:
+            return []
+        zona = timezone.get_current_timezone()
+        meses = pd.to_datetime(self.df["dia"]).dt.to_period("M")
+        conteo = self.df.groupby(meses, sort=True)["cantidad"].sum()
+        return [
+            {
+                "mes": timezone.make_aware(
+                    datetime.combine(mes.start_time.date(), time.min), zona
+                ),
+                "total": int(total),
+            }
+            for mes, total in conteo.items()
+        ]
+
+    def por_dependencia(self) -> list[dict]:
+        if self.df.empty:
+            return []
+        cantidad = self.df["cantidad"]
+        df = self.df.assign(
+            completadas=cantidad.where(self.df["estado"].eq("completada"), 0),
+            en_proceso=cantidad.where(self.df["estado"].isin(ESTADOS_PENDIENTES), 0),
+            rechazadas=cantidad.where(self.df["estado"].eq("rechazada"), 0),
+        )
+        tabla = df.groupby(["dependencia_id", "dependencia__nombre"])[
+            ["cantidad", "completadas", "en_proceso", "rechazadas"]
+        ].sum()
+        tabla = tabla.rename(columns={"cantidad": "total"})
+        tabla = tabla.sort_values("total", ascending=False, kind="stable")
+        return [
+            {
+                "dependencia_id": int(dependencia_id),
+                "dependencia": nombre,
+                "total": int(fila["total"]),
+                "completadas": int(fila["completadas"]),
+                "en_proceso": int(fila["en_proceso"]),
+                "rechazadas": int(fila["rechazadas"]),
+            }
+            for (dependencia_id, nombre), fila in tabla.iterrows()
+        ]
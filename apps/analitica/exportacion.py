@@ -0,0 +1,211 @@
+"""
+Exportación de solicitudes a CSV en streaming y reporte PDF de resumen.
+
+Las filas se leen con un cursor del servidor (``iterator``) sobre una
+proyección ``values_list``, se escriben en bloques y se envían conforme se
+generan, opcionalmente comprimidas con gzip. La memoria usada no depende del
+número de solicitudes exportadas. El reporte PDF se maqueta con
+``apps.utils.pdf``. Las mismas funciones sirven a las vistas síncronas y a los
+trabajos en segundo plano (``apps.analitica.trabajos``).
+"""
+
+import csv
+import io
+import zlib
+
+from django.db.models import Count, Q
+from django.db.models.functions import Substr
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from apps.solicitudes.models import Solicitud
+from apps.utils.pdf import DocumentoPDF
+
+ENCABEZADOS = [
+    "Folio",
+    "Categoría",
+    "Estado",
+    "Ciudadano",
+    "Localidad",
+    "Descripción",
+    "Fecha Creación",
+    "Fecha Actualización",
+    "Días Transcurridos",
+]
+
+COLUMNAS = (
+    "folio",
+    "categoria__nombre",
+    "estado",
+    "ciudadano__nombre",
+    "ciudadano__apellido_paterno",
+    "ciudadano__apellido_materno",
+    "ciudadano__localidad__colonia",
+    "descripcion_corta",
+    "fecha_creacion",
+    "fecha_actualizacion",
+)
+
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+# parámetro -> lookup sobre Solicitud
+FILTROS = {
+    "fecha_inicio": "fecha_creacion__gte",
+    "fecha_fin": "fecha_creacion__lte",
+    "estado": "estado",
+    "categoria": "categoria_id",
+}
+
+
+def filtros_de(parametros) -> dict:
+    """Filtros de exportación presentes (y no vacíos) en ``parametros``."""
+    return {
+        clave: str(parametros[clave]) for clave in FILTROS if parametros.get(clave)
+    }
+
+
+def aplicar_filtros(queryset, filtros: dict):
+    return queryset.filter(
+        **{FILTROS[clave]: valor for clave, valor in filtros.items()}
+    )
+
+
+def filas_csv(queryset, chunk_size: int = 2000, filas_por_bloque: int = 500):
+    """Genera el CSV (con BOM para Excel) en bloques de bytes UTF-8."""
+    ahora = timezone.now()
+    estados = dict(Solicitud.ESTADOS_CHOICES)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(ENCABEZADOS)
+
+    filas = (
+        queryset.annotate(descripcion_corta=Substr("descripcion", 1, 100))
+        .values_list(*COLUMNAS)
+        .iterator(chunk_size=chunk_size)
+    )
+    for numero, (
+        folio,
+        categoria,
+        estado,
+        nombre,
+        apellido_paterno,
+        apellido_materno,
+        colonia,
+        descripcion,
+        fecha_creacion,
+        fecha_actualizacion,
+    ) in enumerate(filas, start=1):
+        writer.writerow(
+            [
+                folio,
+                categoria,
+                estados.get(estado, estado),
+                f"{nombre} {apellido_paterno} {apellido_materno}"
+                if apellido_materno
+                else f"{nombre} {apellido_paterno}",
+                colonia or "N/A",
+                descripcion,
+                fecha_creacion.strftime(FORMATO_FECHA),
+                fecha_actualizacion.strftime(FORMATO_FECHA),
+                (ahora - fecha_creacion).days,
+            ]
+        )
+        if numero % filas_por_bloque == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+def comprimir_gzip(bloques, nivel: int = 6):
+    """Comprime un flujo de bloques en formato gzip sin acumularlo."""
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    for bloque in bloques:
+        comprimido = compresor.compress(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+def respuesta_csv(queryset, nombre: str, gzip: bool = False) -> StreamingHttpResponse:
+    """``StreamingHttpResponse`` con el CSV de ``queryset`` como adjunto."""
+    contenido = filas_csv(queryset)
+    if gzip:
+        response = StreamingHttpResponse(
+            comprimir_gzip(contenido), content_type="application/gzip"
+        )
+        nombre = f"{nombre}.csv.gz"
+    else:
+        response = StreamingHttpResponse(
+            contenido, content_type="text/csv; charset=utf-8"
+        )
+        nombre = f"{nombre}.csv"
+    response["Content-Disposition"] = f'attachment; filename="{nombre}"'
+    return response
+
+
+ESTADOS_REPORTE = [
+    ("Completadas", "completadas"),
+    ("Rechazadas", "rechazadas"),
+    ("Pendientes", "pendientes"),
+]
+
+
+def _conteos_por_estado() -> dict:
+    return {
+        "total": Count("id"),
+        "completadas": Count("id", filter=Q(estado="completada")),
+        "rechazadas": Count("id", filter=Q(estado="rechazada")),
+        "pendientes": Count("id", filter=Q(estado__in=["enviada", "visto"])),
+    }
+
+
+def resumen_reporte(queryset) -> dict:
+    """Datos del reporte PDF: conteos por estado, global y por dependencia."""
+    por_dependencia = (
+        queryset.order_by()
+        .values("categoria__dependencia_municipal__nombre")
+        .annotate(**_conteos_por_estado())
+        .order_by("-total", "categoria__dependencia_municipal__nombre")
+    )
+    return {
+        "conteos": queryset.aggregate(**_conteos_por_estado()),
+        "por_dependencia": [
+            {
+                "dependencia": fila.pop("categoria__dependencia_municipal__nombre"),
+                **fila,
+            }
+            for fila in por_dependencia
+        ],
+    }
+
+
+def documento_reporte(resumen: dict) -> DocumentoPDF:
+    """Reporte PDF de solicitudes a partir de ``resumen_reporte``."""
+    conteos = resumen["conteos"]
+    documento = DocumentoPDF("Reporte Analítica de Solicitudes")
+    documento.espacio(6).texto(f"Total: {conteos['total']}", 12)
+    for etiqueta, clave in ESTADOS_REPORTE:
+        documento.texto(f"{etiqueta}: {conteos[clave]}", 12)
+
+    documento.espacio().titulo("Solicitudes por estado", 13)
+    documento.grafica_barras(
+        [etiqueta for etiqueta, _ in ESTADOS_REPORTE],
+        [conteos[clave] for _, clave in ESTADOS_REPORTE],
+    )
+
+    if resumen["por_dependencia"]:
+        documento.espacio().titulo("Por dependencia", 13)
+        documento.tabla(
+            ["Dependencia", "Total", "Completadas", "Rechazadas", "Pendientes"],
+            [
+                [fila["dependencia"], fila["total"]]
+                + [fila[clave] for _, clave in ESTADOS_REPORTE]
+                for fila in resumen["por_dependencia"]
+            ],
+            anchos=[232, 60, 80, 70, 70],
+        )
+    return documento
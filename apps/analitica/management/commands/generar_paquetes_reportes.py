@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.analitica.paquetes import TIPOS, generar_paquetes, paquete_vigente, periodo_de
+from apps.dependecias_municipales.models import DependenciaMunicipal
+
+
+class Command(BaseCommand):
+    help = 'Pre-genera los paquetes de reportes (PDF, CSV y resumen JSON) por dependencia'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tipo',
+            choices=TIPOS,
+            action='append',
+            help='Periodo a generar: mes o semana (por defecto ambos)',
+        )
+        parser.add_argument(
+            '--inicio',
+            default=None,
+            help='Fecha (YYYY-MM-DD) dentro del periodo; por defecto el último periodo completo',
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=None,
+            help='Procesos del pool (por defecto uno por dependencia, hasta el número de CPUs; 0 = sin pool)',
+        )
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help='Regenera también los paquetes que siguen vigentes',
+        )
+
+    def handle(self, *args, **options):
+        inicio = None
+        if options['inicio']:
+            inicio = parse_date(options['inicio'])
+            if inicio is None:
+                raise CommandError('Fecha de inicio inválida, use YYYY-MM-DD')
+
+        periodos = [(tipo, *periodo_de(tipo, inicio)) for tipo in options['tipo'] or TIPOS]
+        alcances = [None, *DependenciaMunicipal.objects.order_by('id').values_list('id', flat=True)]
+
+        tareas = []
+        for dependencia_id in alcances:
+            pendientes = [
+                periodo
+                for periodo in periodos
+                if options['forzar'] or paquete_vigente(dependencia_id, *periodo) is None
+            ]
+            if pendientes:
+                tareas.append((dependencia_id, pendientes))
+
+        if not tareas:
+            self.stdout.write(self.style.SUCCESS('Todos los paquetes están vigentes.'))
+            return
+
+        errores = 0
+        for (dependencia_id, pendientes), error in generar_paquetes(tareas, options['procesos']):
+            alcance = 'admin' if dependencia_id is None else f'dependencia {dependencia_id}'
+            if error is not None:
+                errores += 1
+                self.stderr.write(self.style.ERROR(f'Paquetes de {alcance} fallidos: {error}'))
+            else:
+                self.stdout.write(f'Paquetes de {alcance}: {len(pendientes)} generados.')
+
+        mensaje = f'{len(tareas) - errores} de {len(tareas)} alcances generados.'
+        self.stdout.write(self.style.SUCCESS(mensaje) if not errores else self.style.WARNING(mensaje))
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.analitica.trabajos import generar, purgar_vencidos, tomar_siguiente
+
+
+class Command(BaseCommand):
+    help = 'Genera en segundo plano las exportaciones pendientes (TrabajoExportacion)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa los trabajos pendientes y termina',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2.0,
+            help='Segundos de espera cuando no hay trabajos pendientes',
+        )
+
+    def handle(self, *args, **options):
+        procesados = 0
+        while True:
+            trabajo = tomar_siguiente()
+            if trabajo is None:
+                purgados = purgar_vencidos()
+                if purgados:
+                    self.stdout.write(f'{purgados} exportaciones vencidas eliminadas.')
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+
+            try:
+                generar(trabajo)
+            except Exception as exc:
+                self.stderr.write(self.style.ERROR(f'Exportación {trabajo.pk} fallida: {exc}'))
+            else:
+                procesados += 1
+                self.stdout.write(f'Exportación {trabajo.pk} lista ({trabajo.tamano} bytes).')
+
+        self.stdout.write(self.style.SUCCESS(f'{procesados} exportaciones generadas.'))
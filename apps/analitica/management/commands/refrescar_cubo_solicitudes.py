@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.analitica.cubo import reconstruir_cubo, refrescar_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el cubo diario de solicitudes (SolicitudDiaria)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=None,
+            help='Solo reconstruye los últimos N días (por defecto, todo el histórico)',
+        )
+        parser.add_argument(
+            '--pendientes',
+            action='store_true',
+            help='Solo refresca los días cuyo refresco automático falló',
+        )
+
+    def handle(self, *args, **options):
+        if options['pendientes']:
+            filas = refrescar_pendientes()
+            self.stdout.write(self.style.SUCCESS(f'Pendientes del cubo refrescados: {filas} filas.'))
+            return
+
+        desde = None
+        if options['dias'] is not None:
+            desde = timezone.localdate() - timedelta(days=options['dias'])
+
+        filas = reconstruir_cubo(desde=desde)
+
+        alcance = f'desde {desde}' if desde else 'completo'
+        self.stdout.write(self.style.SUCCESS(f'Cubo {alcance} reconstruido: {filas} filas.'))
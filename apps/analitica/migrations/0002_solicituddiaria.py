@@ -0,0 +1,82 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def poblar_cubo(apps, schema_editor):
+    Solicitud = apps.get_model("solicitudes", "Solicitud")
+    SolicitudDiaria = apps.get_model("analitica", "SolicitudDiaria")
+
+    def duracion(fin):
+        return ExpressionWrapper(F(fin) - F("fecha_creacion"), output_field=DurationField())
+
+    # El manager histórico no excluye las solicitudes con borrado lógico
+    filas = (
+        Solicitud.objects.filter(deleted_at__isnull=True)
+        .annotate(dia=TruncDate("fecha_creacion"))
+        .values(
+            "dia",
+            "categoria_id",
+            "estado",
+            dependencia_id=F("categoria__dependencia_municipal_id"),
+            localidad_id=F("ciudadano__localidad_id"),
+        )
+        .annotate(
+            cantidad=Count("id"),
+            respondidas=Count("fecha_visto"),
+            duracion_respuesta=Sum(duracion("fecha_visto")),
+            resueltas=Count("fecha_resolucion"),
+            duracion_resolucion=Sum(duracion("fecha_resolucion")),
+        )
+        .order_by()
+    )
+    cubo = []
+    for fila in filas:
+        respuesta = fila.pop("duracion_respuesta")
+        resolucion = fila.pop("duracion_resolucion")
+        cubo.append(
+            SolicitudDiaria(
+                segundos_respuesta=respuesta.total_seconds() if respuesta else 0,
+                segundos_resolucion=resolucion.total_seconds() if resolucion else 0,
+                **fila,
+            )
+        )
+    SolicitudDiaria.objects.bulk_create(cubo, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analitica', '0001_initial'),
+        ('dependecias_municipales', '0001_initial'),
+        ('localidades', '0001_initial'),
+        ('solicitudes', '0004_contadores_solicitudes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('estado', models.CharField(max_length=20)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('respondidas', models.IntegerField(default=0)),
+                ('segundos_respuesta', models.FloatField(default=0)),
+                ('resueltas', models.IntegerField(default=0)),
+                ('segundos_resolucion', models.FloatField(default=0)),
+                ('categoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='solicitudes_diarias', to='solicitudes.categoria')),
+                ('dependencia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='solicitudes_diarias', to='dependecias_municipales.dependenciamunicipal')),
+                ('localidad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='solicitudes_diarias', to='localidades.localidad')),
+            ],
+            options={
+                'db_table': 'analytics_solicitudes_diarias',
+                'indexes': [models.Index(fields=['dependencia', 'dia'], name='analytics_s_depende_e904e0_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dia', 'dependencia', 'categoria', 'localidad', 'estado'), name='solicitud_diaria_unica')],
+            },
+        ),
+        migrations.RunPython(poblar_cubo, migrations.RunPython.noop),
+    ]
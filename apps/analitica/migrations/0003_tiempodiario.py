@@ -0,0 +1,93 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:49
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import DurationField, ExpressionWrapper, F
+from django.db.models.functions import TruncDate
+
+from apps.analitica.tdigest import TDigest
+
+
+def poblar_tiempos(apps, schema_editor):
+    Solicitud = apps.get_model("solicitudes", "Solicitud")
+    TiempoDiario = apps.get_model("analitica", "TiempoDiario")
+
+    def duracion(fin):
+        return ExpressionWrapper(F(fin) - F("fecha_creacion"), output_field=DurationField())
+
+    # El manager histórico no excluye las solicitudes con borrado lógico
+    filas = (
+        Solicitud.objects.filter(deleted_at__isnull=True)
+        .annotate(
+            dia=TruncDate("fecha_creacion"),
+            respuesta=duracion("fecha_visto"),
+            resolucion=duracion("fecha_resolucion"),
+        )
+        .values_list(
+            "dia",
+            "categoria__dependencia_municipal_id",
+            "categoria_id",
+            "estado",
+            "respuesta",
+            "resolucion",
+        )
+        .order_by()
+        .iterator(chunk_size=2000)
+    )
+    horas = defaultdict(list)
+    for dia, dependencia_id, categoria_id, estado, respuesta, resolucion in filas:
+        if respuesta is not None:
+            horas[dia, dependencia_id, categoria_id, "respuesta"].append(
+                respuesta.total_seconds() / 3600
+            )
+        if resolucion is not None and estado == "completada":
+            horas[dia, dependencia_id, categoria_id, "resolucion"].append(
+                resolucion.total_seconds() / 3600
+            )
+
+    TiempoDiario.objects.bulk_create(
+        (
+            TiempoDiario(
+                dia=dia,
+                dependencia_id=dependencia_id,
+                categoria_id=categoria_id,
+                metrica=metrica,
+                cantidad=len(valores),
+                digesto=TDigest().agregar(valores).a_dict(),
+            )
+            for (dia, dependencia_id, categoria_id, metrica), valores in horas.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analitica', '0002_solicituddiaria'),
+        ('dependecias_municipales', '0001_initial'),
+        ('solicitudes', '0004_contadores_solicitudes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TiempoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('metrica', models.CharField(choices=[('respuesta', 'Primera respuesta'), ('resolucion', 'Resolución')], max_length=20)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('digesto', models.JSONField()),
+                ('categoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tiempos_diarios', to='solicitudes.categoria')),
+                ('dependencia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tiempos_diarios', to='dependecias_municipales.dependenciamunicipal')),
+            ],
+            options={
+                'db_table': 'analytics_tiempos_diarios',
+                'indexes': [models.Index(fields=['dependencia', 'dia'], name='analytics_t_depende_f9f81b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dia', 'dependencia', 'categoria', 'metrica'), name='tiempo_diario_unico')],
+            },
+        ),
+        migrations.RunPython(poblar_tiempos, migrations.RunPython.noop),
+    ]
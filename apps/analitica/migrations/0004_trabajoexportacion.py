@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analitica', '0003_tiempodiario'),
+        ('dependecias_municipales', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoExportacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('formato', models.CharField(choices=[('csv', 'CSV'), ('pdf', 'PDF')], max_length=10)),
+                ('alcance', models.CharField(max_length=50)),
+                ('filtros', models.JSONField(blank=True, default=dict)),
+                ('clave', models.CharField(db_index=True, max_length=64)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('fallido', 'Fallido')], default='pendiente', max_length=20)),
+                ('archivo', models.FileField(blank=True, upload_to='exportaciones/')),
+                ('tamano', models.BigIntegerField(blank=True, null=True)),
+                ('etag', models.CharField(blank=True, max_length=80)),
+                ('error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('dependencia', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_exportacion', to='dependecias_municipales.dependenciamunicipal')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos_exportacion', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'analytics_trabajos_exportacion',
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='analytics_t_estado_c06191_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analitica', '0004_trabajoexportacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneracionCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=100, unique=True)),
+                ('valor', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'analytics_generaciones_cache',
+            },
+        ),
+    ]
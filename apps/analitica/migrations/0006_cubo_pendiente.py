@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analitica', '0005_generacion_cache'),
+        ('dependecias_municipales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CuboPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('dependencia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cubo_pendiente', to='dependecias_municipales.dependenciamunicipal')),
+            ],
+            options={
+                'db_table': 'analytics_cubo_pendiente',
+                'constraints': [models.UniqueConstraint(fields=('dia', 'dependencia'), name='cubo_pendiente_unico')],
+            },
+        ),
+    ]
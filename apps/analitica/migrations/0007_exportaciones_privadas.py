@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:00
+
+import apps.analitica.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analitica', '0006_cubo_pendiente'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trabajoexportacion',
+            name='archivo',
+            field=models.FileField(blank=True, storage=apps.analitica.models.AlmacenExportaciones(), upload_to=''),
+        ),
+    ]
@@ -1,6 +1,9 @@
 import hashlib
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.utils import timezone
+from django.utils.functional import cached_property
 
 
 class UserAgent(models.Model):
@@ -150,3 +153,204 @@ class Evento(models.Model):
 
     def __str__(self):
         return f"{self.tipo}:{self.nombre} @{self.hora.isoformat()}"
+
+
+class SolicitudDiaria(models.Model):
+    """
+    Cubo diario de solicitudes: una fila por (día, dependencia, categoría,
+    localidad, estado) con conteos y tiempos acumulados. Se refresca por día
+    desde ``apps.analitica.cubo``; las vistas de analítica agregan sobre esta
+    tabla en lugar de recorrer las solicitudes.
+    """
+    dia = models.DateField()
+    dependencia = models.ForeignKey(
+        "dependecias_municipales.DependenciaMunicipal",
+        on_delete=models.CASCADE,
+        related_name="solicitudes_diarias",
+    )
+    categoria = models.ForeignKey(
+        "solicitudes.Categoria", on_delete=models.CASCADE, related_name="solicitudes_diarias"
+    )
+    localidad = models.ForeignKey(
+        "localidades.Localidad", on_delete=models.CASCADE, related_name="solicitudes_diarias"
+    )
+    estado = models.CharField(max_length=20)
+    cantidad = models.IntegerField(default=0)
+    # Solicitudes con fecha_visto y suma de (fecha_visto - fecha_creacion)
+    respondidas = models.IntegerField(default=0)
+    segundos_respuesta = models.FloatField(default=0)
+    # Solicitudes con fecha_resolucion y suma de (fecha_resolucion - fecha_creacion)
+    resueltas = models.IntegerField(default=0)
+    segundos_resolucion = models.FloatField(default=0)
+
+    class Meta:
+        db_table = "analytics_solicitudes_diarias"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dia", "dependencia", "categoria", "localidad", "estado"],
+                name="solicitud_diaria_unica",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["dependencia", "dia"]),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.dependencia_id}/{self.categoria_id}/{self.localidad_id}/{self.estado}: {self.cantidad}"
+
+
+class TiempoDiario(models.Model):
+    """
+    Digesto t-digest diario de los tiempos (en horas) de primera respuesta o
+    de resolución por (día, dependencia, categoría). Los percentiles de un
+    rango se obtienen fusionando los digestos de sus días.
+    """
+    METRICAS = [
+        ("respuesta", "Primera respuesta"),
+        ("resolucion", "Resolución"),
+    ]
+
+    dia = models.DateField()
+    dependencia = models.ForeignKey(
+        "dependecias_municipales.DependenciaMunicipal",
+        on_delete=models.CASCADE,
+        related_name="tiempos_diarios",
+    )
+    categoria = models.ForeignKey(
+        "solicitudes.Categoria", on_delete=models.CASCADE, related_name="tiempos_diarios"
+    )
+    metrica = models.CharField(max_length=20, choices=METRICAS)
+    cantidad = models.IntegerField(default=0)
+    digesto = models.JSONField()
+
+    class Meta:
+        db_table = "analytics_tiempos_diarios"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dia", "dependencia", "categoria", "metrica"],
+                name="tiempo_diario_unico",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["dependencia", "dia"]),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.dependencia_id}/{self.categoria_id}/{self.metrica}: {self.cantidad}"
+
+
+class AlmacenExportaciones(FileSystemStorage):
+    """
+    Archivos de exportación en ``EXPORTACIONES_ROOT``, fuera de ``MEDIA_ROOT``
+    (que se sirve públicamente): no tienen URL y solo se entregan por la vista
+    de descarga autenticada.
+    """
+
+    @cached_property
+    def base_location(self):
+        return settings.EXPORTACIONES_ROOT
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == "EXPORTACIONES_ROOT":
+            self.__dict__.pop("base_location", None)
+            self.__dict__.pop("location", None)
+
+    def url(self, name):
+        raise ValueError("Las exportaciones no tienen URL pública")
+
+
+class TrabajoExportacion(models.Model):
+    """
+    Exportación (CSV o PDF) generada en segundo plano por el comando
+    ``procesar_exportaciones`` y guardada en ``EXPORTACIONES_ROOT``. La ``clave``
+    resume alcance, formato, filtros y generación de datos: solicitudes
+    idénticas reutilizan el trabajo mientras el archivo siga vigente.
+    """
+    FORMATOS = [
+        ("csv", "CSV"),
+        ("pdf", "PDF"),
+    ]
+    ESTADOS = [
+        ("pendiente", "Pendiente"),
+        ("procesando", "Procesando"),
+        ("completado", "Completado"),
+        ("fallido", "Fallido"),
+    ]
+
+    usuario = models.ForeignKey(
+        "autenticacion.Usuario",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="trabajos_exportacion",
+    )
+    formato = models.CharField(max_length=10, choices=FORMATOS)
+    # "admin" o "dep<id>"; la dependencia es nula para el alcance admin
+    alcance = models.CharField(max_length=50)
+    dependencia = models.ForeignKey(
+        "dependecias_municipales.DependenciaMunicipal",
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="trabajos_exportacion",
+    )
+    filtros = models.JSONField(default=dict, blank=True)
+    clave = models.CharField(max_length=64, db_index=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default="pendiente")
+    archivo = models.FileField(storage=AlmacenExportaciones(), blank=True)
+    tamano = models.BigIntegerField(null=True, blank=True)
+    etag = models.CharField(max_length=80, blank=True)
+    error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "analytics_trabajos_exportacion"
+        indexes = [
+            models.Index(fields=["estado", "fecha_creacion"]),
+        ]
+
+    def __str__(self):
+        return f"Exportación {self.pk} {self.formato} [{self.alcance}] {self.estado}"
+
+
+class GeneracionCache(models.Model):
+    """
+    Generación vigente de cada alcance de la caché de analítica (ver
+    ``apps.analitica.cache``). Persistida para que todos los procesos la
+    compartan y no se reinicie al reiniciar el servidor: las exportaciones
+    guardadas se identifican por ella.
+    """
+    clave = models.CharField(max_length=100, unique=True)
+    valor = models.BigIntegerField()
+
+    class Meta:
+        db_table = "analytics_generaciones_cache"
+
+    def __str__(self):
+        return f"{self.clave}: {self.valor}"
+
+
+class CuboPendiente(models.Model):
+    """
+    Par (día, dependencia) del cubo cuyo refresco falló al confirmarse una
+    transacción; lo procesa ``refrescar_cubo_solicitudes --pendientes``.
+    """
+    dia = models.DateField()
+    dependencia = models.ForeignKey(
+        "dependecias_municipales.DependenciaMunicipal",
+        on_delete=models.CASCADE,
+        related_name="cubo_pendiente",
+    )
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "analytics_cubo_pendiente"
+        constraints = [
+            models.UniqueConstraint(fields=["dia", "dependencia"], name="cubo_pendiente_unico")
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.dependencia_id}"
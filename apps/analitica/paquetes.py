@@ -0,0 +1,244 @@
+"""
+Paquetes de reportes pre-generados por dependencia.
+
+El comando ``generar_paquetes_reportes`` arma, para cada dependencia (y para
+el alcance global del administrador), el paquete del último mes y de la
+última semana completos: PDF, CSV y un resumen JSON, más un ``manifest.json``
+con el tamaño y el SHA-256 de cada archivo, bajo ``PAQUETES_ROOT``: los
+paquetes contienen datos de los ciudadanos y nunca se guardan en
+``MEDIA_ROOT``, que se sirve públicamente. Cada dependencia se genera en un
+proceso aparte. Las consultas pesadas de fin de mes se hacen así una sola vez
+y fuera de horario, en lugar de una vez por descarga.
+
+Las vistas de reporte sirven el archivo del paquete cuando el periodo pedido
+coincide con uno pre-generado. Antes se comparan los conteos por estado del
+manifiesto con los del cubo diario y la última ``fecha_actualizacion`` de las
+solicitudes del periodo (dos consultas pequeñas): si algún dato del periodo
+cambió después de generar el paquete, aunque los conteos sigan iguales (p. ej.
+al editar una ubicación o el título), se responde en vivo.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.analitica.cubo import sumas_por_estado
+from apps.analitica.exportacion import documento_reporte, filas_csv, resumen_reporte
+from apps.analitica.models import SolicitudDiaria
+from apps.analitica.periodos import limites_mes, mes_anterior
+from apps.solicitudes.models import Solicitud
+
+TIPOS = ("mes", "semana")
+MANIFIESTO = "manifest.json"
+ARCHIVOS = {
+    "pdf": ("reporte.pdf", "application/pdf"),
+    "csv": ("solicitudes.csv", "text/csv; charset=utf-8"),
+    "json": ("resumen.json", "application/json"),
+}
+
+
+def periodo_de(tipo: str, inicio: date | None = None) -> tuple[date, date]:
+    """
+    Mes o semana (lunes a domingo) que contiene ``inicio``; sin ``inicio``, el
+    último periodo completo antes de hoy.
+    """
+    if tipo not in TIPOS:
+        raise ValueError(f"Periodo no soportado: {tipo}")
+    if tipo == "mes":
+        if inicio is None:
+            return limites_mes(*mes_anterior(timezone.localdate()))
+        return limites_mes(inicio.year, inicio.month)
+    if inicio is None:
+        inicio = timezone.localdate() - timedelta(days=7)
+    lunes = inicio - timedelta(days=inicio.weekday())
+    return lunes, lunes + timedelta(days=6)
+
+
+def solicitudes_del_periodo(queryset, inicio: date, fin: date):
+    """Solicitudes creadas entre ``inicio`` y ``fin`` (días locales, inclusive)."""
+    return queryset.filter(
+        fecha_creacion__gte=timezone.make_aware(datetime.combine(inicio, time.min)),
+        fecha_creacion__lt=timezone.make_aware(
+            datetime.combine(fin + timedelta(days=1), time.min)
+        ),
+    )
+
+
+def _alcance(dependencia_id: int | None) -> str:
+    return "admin" if dependencia_id is None else f"dep{dependencia_id}"
+
+
+def directorio_paquete(dependencia_id: int | None, tipo: str, inicio: date) -> str:
+    return os.path.join(
+        settings.PAQUETES_ROOT, tipo, inicio.isoformat(), _alcance(dependencia_id)
+    )
+
+
+def _conteos_cubo(dependencia_id: int | None, inicio: date, fin: date) -> dict:
+    cubo = SolicitudDiaria.objects.filter(dia__range=(inicio, fin))
+    if dependencia_id is not None:
+        cubo = cubo.filter(dependencia_id=dependencia_id)
+    return cubo.aggregate(**sumas_por_estado())
+
+
+def _solicitudes(dependencia_id: int | None, inicio: date, fin: date):
+    solicitudes = Solicitud.objects.all()
+    if dependencia_id is not None:
+        solicitudes = solicitudes.filter(
+            categoria__dependencia_municipal_id=dependencia_id
+        )
+    return solicitudes_del_periodo(solicitudes, inicio, fin)
+
+
+def _ultima_actualizacion(dependencia_id: int | None, inicio: date, fin: date) -> str | None:
+    ultima = _solicitudes(dependencia_id, inicio, fin).aggregate(
+        ultima=Max("fecha_actualizacion")
+    )["ultima"]
+    return ultima.isoformat() if ultima else None
+
+
+def _escribir(ruta: str, bloques) -> dict:
+    digesto = hashlib.sha256()
+    tamano = 0
+    with open(f"{ruta}.tmp", "wb") as archivo:
+        for bloque in bloques:
+            archivo.write(bloque)
+            digesto.update(bloque)
+            tamano += len(bloque)
+    os.replace(f"{ruta}.tmp", ruta)
+    return {"bytes": tamano, "sha256": digesto.hexdigest()}
+
+
+def generar_paquete(dependencia_id: int | None, tipo: str, inicio: date, fin: date) -> dict:
+    """Escribe el paquete de un alcance y periodo; el manifiesto va al final."""
+    directorio = directorio_paquete(dependencia_id, tipo, inicio)
+    os.makedirs(directorio, exist_ok=True)
+
+    # Conteos y última edición se toman antes de leer las solicitudes: si algo
+    # cambia mientras se genera, el paquete queda marcado como desactualizado
+    conteos = _conteos_cubo(dependencia_id, inicio, fin)
+    ultima_actualizacion = _ultima_actualizacion(dependencia_id, inicio, fin)
+
+    solicitudes = _solicitudes(dependencia_id, inicio, fin)
+    resumen = resumen_reporte(solicitudes)
+
+    contenidos = {
+        "pdf": documento_reporte(resumen).bloques(),
+        "csv": filas_csv(solicitudes),
+        "json": [
+            json.dumps(
+                {"inicio": inicio, "fin": fin, **resumen},
+                default=str,
+                ensure_ascii=False,
+            ).encode("utf-8")
+        ],
+    }
+    archivos = {}
+    for formato, bloques in contenidos.items():
+        nombre = ARCHIVOS[formato][0]
+        archivos[formato] = {
+            "nombre": nombre,
+            **_escribir(os.path.join(directorio, nombre), bloques),
+        }
+
+    manifiesto = {
+        "alcance": _alcance(dependencia_id),
+        "tipo": tipo,
+        "inicio": inicio.isoformat(),
+        "fin": fin.isoformat(),
+        "generado_en": timezone.now().isoformat(),
+        "conteos": conteos,
+        "ultima_actualizacion": ultima_actualizacion,
+        "archivos": archivos,
+    }
+    _escribir(
+        os.path.join(directorio, MANIFIESTO),
+        [json.dumps(manifiesto, indent=2).encode("utf-8")],
+    )
+    return manifiesto
+
+
+def _leer_manifiesto(directorio: str) -> dict | None:
+    try:
+        with open(os.path.join(directorio, MANIFIESTO), encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except (OSError, ValueError):
+        return None
+
+
+def paquete_vigente(dependencia_id: int | None, tipo: str, inicio: date, fin: date) -> dict | None:
+    """
+    Manifiesto del paquete del periodo si existe y sus conteos y su última
+    edición siguen coincidiendo con los datos; si no, ``None``.
+    """
+    directorio = directorio_paquete(dependencia_id, tipo, inicio)
+    manifiesto = _leer_manifiesto(directorio)
+    if manifiesto is None or manifiesto["conteos"] != _conteos_cubo(
+        dependencia_id, inicio, fin
+    ):
+        return None
+    if manifiesto.get("ultima_actualizacion") != _ultima_actualizacion(
+        dependencia_id, inicio, fin
+    ):
+        return None
+    manifiesto["directorio"] = directorio
+    return manifiesto
+
+
+def archivo_paquete(manifiesto: dict, formato: str) -> tuple[str, str, str]:
+    """``(ruta, etag, content_type)`` de un archivo del paquete."""
+    datos = manifiesto["archivos"][formato]
+    return (
+        os.path.join(manifiesto["directorio"], datos["nombre"]),
+        f'"{datos["sha256"][:32]}"',
+        ARCHIVOS[formato][1],
+    )
+
+
+def _inicializar_proceso():
+    import django
+
+    django.setup()
+
+
+def _generar(tarea) -> tuple:
+    dependencia_id, periodos = tarea
+    for tipo, inicio, fin in periodos:
+        generar_paquete(dependencia_id, tipo, inicio, fin)
+    return tarea
+
+
+def generar_paquetes(tareas, procesos: int | None = None):
+    """
+    Genera los paquetes de ``tareas`` (``(dependencia_id, [(tipo, inicio,
+    fin), ...])``) en un pool con un proceso por dependencia. Con
+    ``procesos=0`` se generan en el proceso actual. Produce ``(tarea, error)``
+    conforme terminan.
+    """
+    if procesos == 0:
+        for tarea in tareas:
+            try:
+                yield _generar(tarea), None
+            except Exception as exc:
+                yield tarea, exc
+        return
+
+    # Los procesos hijos abren sus propias conexiones; no deben heredar sockets abiertos
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=procesos or min(len(tareas), os.cpu_count() or 1) or 1,
+        initializer=_inicializar_proceso,
+    ) as pool:
+        futuros = {pool.submit(_generar, tarea): tarea for tarea in tareas}
+        for futuro in as_completed(futuros):
+            try:
+                yield futuro.result(), None
+            except Exception as exc:
+                yield futuros[futuro], exc
@@ -0,0 +1,102 @@
+"""
+Comparación de periodos sobre el cubo diario.
+
+Todos los periodos se resuelven en una sola consulta: se filtra el rango que
+los cubre a todos y cada conteo se reparte en su periodo con ``CASE``.
+"""
+
+from calendar import monthrange
+from datetime import date, timedelta
+
+from django.db.models import Case, IntegerField, Q, Sum, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+ESTADOS = {
+    "completadas": "completada",
+    "rechazadas": "rechazada",
+    "enviadas": "enviada",
+    "vistas": "visto",
+}
+
+
+def limites_mes(anio: int, mes: int) -> tuple[date, date]:
+    """Primer y último día del mes."""
+    return date(anio, mes, 1), date(anio, mes, monthrange(anio, mes)[1])
+
+
+def mes_anterior(dia: date) -> tuple[int, int]:
+    anterior = dia.replace(day=1) - timedelta(days=1)
+    return anterior.year, anterior.month
+
+
+def ultimos_meses(cantidad: int, hoy: date | None = None) -> list[tuple[date, date]]:
+    """
+    Los últimos ``cantidad`` meses en orden cronológico. El mes en curso va
+    del día 1 a ``hoy``; los anteriores son meses completos.
+    """
+    hoy = hoy or timezone.localdate()
+    periodos = [(hoy.replace(day=1), hoy)]
+    anio, mes = hoy.year, hoy.month
+    for _ in range(cantidad - 1):
+        anio, mes = mes_anterior(date(anio, mes, 1))
+        periodos.append(limites_mes(anio, mes))
+    return periodos[::-1]
+
+
+def comparar_periodos(cubo, periodos: list[tuple[date, date]]) -> list[dict]:
+    """
+    Conteos por estado de cada periodo ``(inicio, fin)`` (ambos inclusive) en
+    una sola consulta sobre el cubo.
+    """
+    if not periodos:
+        return []
+    inicio = min(p[0] for p in periodos)
+    fin = max(p[1] for p in periodos)
+
+    def conteo(rango, estado=None):
+        condicion = Q(dia__range=rango)
+        if estado:
+            condicion &= Q(estado=estado)
+        return Coalesce(
+            Sum(
+                Case(
+                    When(condicion, then="cantidad"),
+                    default=0,
+                    output_field=IntegerField(),
+                )
+            ),
+            0,
+        )
+
+    anotaciones = {}
+    for indice, rango in enumerate(periodos):
+        anotaciones[f"p{indice}_total"] = conteo(rango)
+        for clave, estado in ESTADOS.items():
+            anotaciones[f"p{indice}_{clave}"] = conteo(rango, estado)
+
+    fila = cubo.filter(dia__range=(inicio, fin)).aggregate(**anotaciones)
+
+    return [
+        {
+            "inicio": rango[0],
+            "fin": rango[1],
+            "estadisticas": {
+                clave: fila[f"p{indice}_{clave}"] for clave in ["total", *ESTADOS]
+            },
+        }
+        for indice, rango in enumerate(periodos)
+    ]
+
+
+def diferencia(anterior: dict, actual: dict) -> dict:
+    """Diferencia absoluta y porcentual entre dos diccionarios de conteos."""
+    resultado = {}
+    for clave in anterior:
+        valor1 = anterior[clave] or 0
+        valor2 = actual[clave] or 0
+        resultado[clave] = valor2 - valor1
+        resultado[f"{clave}_porcentaje"] = (
+            round((valor2 - valor1) / valor1 * 100, 2) if valor1 > 0 else 0
+        )
+    return resultado
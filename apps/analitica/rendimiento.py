@@ -0,0 +1,123 @@
+"""
+Rendimiento de funcionarios calculado por conjuntos.
+
+Todos los funcionarios de una dependencia ven las mismas solicitudes, así que
+los conteos se calculan una vez por dependencia con consultas agrupadas y se
+cruzan en memoria con cada funcionario. El número de consultas no depende de
+cuántos funcionarios haya.
+"""
+
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+
+from apps.funcionarios.models import Funcionario
+from apps.solicitudes.models import Comentario
+
+CAMPO_DEPENDENCIA = "categoria__dependencia_municipal_id"
+
+
+def solicitudes_por_dependencia(solicitudes) -> dict[int, dict]:
+    """``{dependencia_id: {"total", "completadas"}}`` en una sola consulta."""
+    filas = (
+        solicitudes.order_by()
+        .values(dependencia_id=F(CAMPO_DEPENDENCIA))
+        .annotate(
+            total=Count("id"),
+            completadas=Count("id", filter=Q(estado="completada")),
+        )
+    )
+    return {fila.pop("dependencia_id"): fila for fila in filas}
+
+
+def comentarios_por_autor(solicitudes) -> dict[tuple[int, int], int]:
+    """
+    ``{(dependencia_id, autor_id): total}`` con un solo ``GROUP BY`` sobre el
+    autor de cada comentario.
+    """
+    filas = (
+        Comentario.objects.filter(
+            autor__isnull=False, solicitud__in=solicitudes.order_by().values("id")
+        )
+        .order_by()
+        .values("autor_id", dependencia_id=F(f"solicitud__{CAMPO_DEPENDENCIA}"))
+        .annotate(total=Count("id"))
+    )
+    return {(fila["dependencia_id"], fila["autor_id"]): fila["total"] for fila in filas}
+
+
+def tiempo_respuesta_por_dependencia(solicitudes) -> dict[int, float]:
+    """
+    Promedio en horas entre la creación de cada solicitud y su primera
+    respuesta (``primera_respuesta_en``), agrupado por dependencia. Es un solo
+    agregado sobre las solicitudes, sin unir sus comentarios.
+    """
+    filas = (
+        solicitudes.filter(primera_respuesta_en__isnull=False)
+        .order_by()
+        .values(dependencia_id=F(CAMPO_DEPENDENCIA))
+        .annotate(
+            promedio=Avg(
+                ExpressionWrapper(
+                    F("primera_respuesta_en") - F("fecha_creacion"),
+                    output_field=DurationField(),
+                )
+            )
+        )
+    )
+    return {
+        fila["dependencia_id"]: round(fila["promedio"].total_seconds() / 3600, 2)
+        for fila in filas
+        if fila["promedio"] is not None
+    }
+
+
+def rendimiento_funcionarios(
+    solicitudes,
+    funcionarios=None,
+    con_comentarios: bool = True,
+    con_tiempos: bool = False,
+    omitir_sin_solicitudes: bool = False,
+) -> list[dict]:
+    """
+    Rendimiento de cada funcionario sobre ``solicitudes``, ordenado por tasa de
+    resolución descendente.
+    """
+    if funcionarios is None:
+        funcionarios = Funcionario.objects.all()
+    funcionarios = funcionarios.select_related("dependencia")
+
+    por_dependencia = solicitudes_por_dependencia(solicitudes)
+    comentarios = comentarios_por_autor(solicitudes) if con_comentarios else {}
+    tiempos = tiempo_respuesta_por_dependencia(solicitudes) if con_tiempos else {}
+
+    resultado = []
+    for funcionario in funcionarios:
+        conteo = por_dependencia.get(
+            funcionario.dependencia_id, {"total": 0, "completadas": 0}
+        )
+        total = conteo["total"]
+        if omitir_sin_solicitudes and total == 0:
+            continue
+
+        fila = {
+            "id": funcionario.id,
+            "nombre": funcionario.nombre_completo,
+            "cargo": funcionario.cargo,
+            "dependencia": funcionario.dependencia.nombre,
+            "solicitudes_asignadas": total,
+            "solicitudes_completadas": conteo["completadas"],
+            "tasa_resolucion": (
+                round(conteo["completadas"] / total * 100, 2) if total > 0 else 0
+            ),
+        }
+        if con_comentarios:
+            fila["comentarios_realizados"] = comentarios.get(
+                (funcionario.dependencia_id, funcionario.usuario_id), 0
+            )
+        if con_tiempos:
+            fila["tiempo_promedio_respuesta_horas"] = tiempos.get(
+                funcionario.dependencia_id
+            )
+        resultado.append(fila)
+
+    resultado.sort(key=lambda x: x["tasa_resolucion"], reverse=True)
+    return resultado
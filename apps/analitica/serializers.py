@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.utils import timezone
-from .models import UserAgent, Visitante, Sesion, PaginaVista, Evento
+from .models import UserAgent, Visitante, Sesion, PaginaVista, Evento, TrabajoExportacion
 
 
 class IdPairSerializer(serializers.Serializer):
@@ -238,3 +238,19 @@ class EventoBatchSerializer(serializers.Serializer):
             )
             created.append(ev)
         return created
+
+
+class TrabajoExportacionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TrabajoExportacion
+        fields = [
+            "id",
+            "formato",
+            "estado",
+            "filtros",
+            "tamano",
+            "error",
+            "fecha_creacion",
+            "fecha_inicio",
+            "fecha_fin",
+        ]
@@ -0,0 +1,117 @@
+"""
+Series de tiempo densas sobre el cubo diario.
+
+Se lanza una sola consulta agrupada por día y los conteos se reparten con
+NumPy sobre una rejilla ``datetime64`` de cubetas contiguas (días, semanas o
+meses de cualquier tamaño), de modo que los periodos sin solicitudes aparecen
+con cero. Los días del cubo ya están en la zona horaria del proyecto
+(``America/Mexico_City``).
+"""
+
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from apps.analitica.cubo import sumas_por_estado
+
+METRICAS = ("total", "completadas", "rechazadas", "enviadas", "vistas")
+
+# periodo -> (unidad de datetime64, días o meses por cubeta, cubetas por defecto, ventana por defecto)
+PERIODOS = {
+    "dia": ("D", 1, 30, 7),
+    "semana": ("D", 7, 12, 4),
+    "mes": ("M", 1, 12, 3),
+}
+MAX_CUBETAS = 1000
+
+
+def _rejilla(periodo: str, inicio: date | None, fin: date, tamano: int) -> np.ndarray:
+    """Inicio de cada cubeta como ``datetime64[D]``."""
+    unidad, paso, por_defecto, _ = PERIODOS[periodo]
+    paso *= tamano
+
+    if unidad == "M":
+        ultimo = np.datetime64(fin, "M")
+        primero = (
+            np.datetime64(inicio, "M") if inicio else ultimo - paso * (por_defecto - 1)
+        )
+        # Alinear al último mes para que la cubeta final contenga ``fin``
+        meses = int((ultimo - primero).astype(int))
+        primero = ultimo - -(-meses // paso) * paso
+        return np.arange(primero, ultimo + 1, paso).astype("datetime64[D]")
+
+    if inicio is None:
+        inicio = fin - timedelta(days=paso * por_defecto - 1)
+    if periodo == "semana":
+        inicio -= timedelta(days=inicio.weekday())
+    return np.arange(np.datetime64(inicio, "D"), np.datetime64(fin, "D") + 1, paso)
+
+
+def promedio_movil(valores: np.ndarray, ventana: int) -> np.ndarray:
+    """Promedio de las últimas ``ventana`` cubetas (menos al inicio de la serie)."""
+    acumulado = np.concatenate(([0.0], np.cumsum(valores, dtype=np.float64)))
+    posicion = np.arange(1, len(valores) + 1)
+    cuenta = np.minimum(posicion, ventana)
+    return np.round((acumulado[posicion] - acumulado[posicion - cuenta]) / cuenta, 2)
+
+
+def serie_temporal(
+    cubo,
+    periodo: str = "dia",
+    inicio: date | None = None,
+    fin: date | None = None,
+    tamano: int = 1,
+    ventana: int | None = None,
+) -> list[dict]:
+    """
+    Conteos por estado de cada cubeta entre ``inicio`` y ``fin`` (por defecto
+    los últimos 30 días, 12 semanas o 12 meses hasta hoy), con el promedio
+    móvil del total. Lanza ``ValueError`` si el rango pide demasiadas cubetas
+    o la ventana no está entre 1 y ``MAX_CUBETAS``.
+    """
+    if periodo not in PERIODOS:
+        raise ValueError(f"Periodo no soportado: {periodo}")
+    if tamano < 1:
+        raise ValueError("El tamaño de cubeta debe ser al menos 1")
+    if ventana is not None and not 1 <= ventana <= MAX_CUBETAS:
+        raise ValueError(f"La ventana debe estar entre 1 y {MAX_CUBETAS} cubetas")
+    fin = fin or timezone.localdate()
+    if inicio and inicio > fin:
+        raise ValueError("El inicio no puede ser posterior al fin")
+
+    bordes = _rejilla(periodo, inicio, fin, tamano)
+    if len(bordes) > MAX_CUBETAS:
+        raise ValueError(f"El rango excede {MAX_CUBETAS} cubetas")
+
+    filas = list(
+        cubo.filter(dia__range=(bordes[0].item(), fin))
+        .values("dia")
+        .annotate(**sumas_por_estado())
+        .order_by()
+    )
+
+    valores = np.zeros((len(METRICAS), len(bordes)), dtype=np.int64)
+    if filas:
+        dias = np.array([fila["dia"] for fila in filas], dtype="datetime64[D]")
+        cubetas = np.searchsorted(bordes, dias, side="right") - 1
+        for i, metrica in enumerate(METRICAS):
+            np.add.at(valores[i], cubetas, [fila[metrica] for fila in filas])
+
+    movil = promedio_movil(
+        valores[0], PERIODOS[periodo][3] if ventana is None else ventana
+    )
+
+    serie = []
+    for j, borde in enumerate(bordes.tolist()):
+        fecha = borde
+        if periodo != "dia":
+            # Semanas y meses se devuelven como inicio del periodo con zona horaria
+            fecha = timezone.make_aware(datetime.combine(borde, time.min))
+        punto = {"fecha": fecha}
+        punto.update(
+            (metrica, int(valores[i, j])) for i, metrica in enumerate(METRICAS)
+        )
+        punto["promedio_movil"] = float(movil[j])
+        serie.append(punto)
+    return serie
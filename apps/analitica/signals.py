@@ -0,0 +1,71 @@
+import logging
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.analitica.cache import invalidar_dependencias
+from apps.analitica.cubo import dia_local, marcar_pendientes, refrescar_pares
+from apps.funcionarios.models import Funcionario
+from apps.solicitudes.models import Categoria, Comentario, Solicitud
+from apps.utils.transacciones import RecolectorTransaccion
+
+logger = logging.getLogger(__name__)
+
+
+class RefrescoAnalitica(RecolectorTransaccion):
+    """
+    Pares ``(dia, dependencia_id)`` tocados en la transacción; ``dia`` es
+    ``None`` si solo hay que invalidar la caché. Al confirmar se refresca cada
+    par del cubo una sola vez y después se invalida la caché de analítica.
+    """
+
+    robusto = True
+
+    def vaciar(self, elementos):
+        pares = {(dia, dependencia_id) for dia, dependencia_id in elementos if dia is not None}
+        if pares:
+            try:
+                refrescar_pares(pares)
+            except Exception:
+                # La escritura ya se confirmó: el cubo se pone al día después
+                logger.exception("No se pudo refrescar el cubo; quedan pendientes %s", pares)
+                marcar_pendientes(pares)
+        invalidar_dependencias(dependencia_id for _, dependencia_id in elementos)
+
+
+@receiver(post_save, sender=Solicitud)
+@receiver(post_delete, sender=Solicitud)
+def refrescar_por_solicitud(sender, instance, **kwargs):
+    """
+    Refresca el día de la solicitud en el cubo diario y después invalida la
+    caché de analítica de su dependencia.
+    """
+    if Solicitud._meta.get_field("categoria").is_cached(instance):
+        dependencia_id = instance.categoria.dependencia_municipal_id
+    else:
+        dependencia_id = (
+            Categoria.objects.filter(pk=instance.categoria_id)
+            .values_list("dependencia_municipal_id", flat=True)
+            .first()
+        )
+    RefrescoAnalitica.agregar((dia_local(instance.fecha_creacion), dependencia_id))
+
+
+@receiver(post_save, sender=Comentario)
+@receiver(post_delete, sender=Comentario)
+def invalidar_por_comentario(sender, instance, **kwargs):
+    """Invalida la caché de analítica de la dependencia del comentario."""
+    dependencia_id = (
+        Solicitud.objects.filter(pk=instance.solicitud_id)
+        .values_list("categoria__dependencia_municipal_id", flat=True)
+        .first()
+    )
+    # Tras el commit, para que nadie recalcule con datos aún no visibles
+    RefrescoAnalitica.agregar((None, dependencia_id))
+
+
+@receiver(post_save, sender=Funcionario)
+@receiver(post_delete, sender=Funcionario)
+def invalidar_por_funcionario(sender, instance, **kwargs):
+    """El ranking depende de los funcionarios de cada dependencia."""
+    RefrescoAnalitica.agregar((None, instance.dependencia_id))
@@ -0,0 +1,135 @@
+"""
+t-digest fusionable para percentiles aproximados.
+
+Implementa la variante *merging* de Dunning: los valores se agrupan en
+centroides (media, peso) cuyo tamaño máximo depende de la posición en la
+distribución, de modo que las colas (p99) conservan más detalle que el centro.
+Dos digestos se combinan concatenando sus centroides y recomprimiendo, así
+que un rango de fechas se responde fusionando los digestos de cada día.
+"""
+
+import math
+
+import numpy as np
+
+
+class TDigest:
+    """Digesto de una distribución de valores numéricos."""
+
+    def __init__(self, compresion: float = 100, medias=(), pesos=(), minimo=None, maximo=None):
+        self.compresion = compresion
+        self.medias = np.asarray(medias, dtype=np.float64)
+        self.pesos = np.asarray(pesos, dtype=np.float64)
+        self.minimo = minimo
+        self.maximo = maximo
+
+    @property
+    def total(self) -> float:
+        return float(self.pesos.sum())
+
+    def __len__(self):
+        return len(self.medias)
+
+    def agregar(self, valores) -> "TDigest":
+        """Agrega valores (con peso 1 cada uno) y recomprime."""
+        valores = np.asarray(valores, dtype=np.float64)
+        if not valores.size:
+            return self
+        self._extender(valores, np.ones_like(valores), valores.min(), valores.max())
+        return self
+
+    def fusionar(self, otro: "TDigest") -> "TDigest":
+        """Incorpora los centroides de ``otro``."""
+        if len(otro):
+            self._extender(otro.medias, otro.pesos, otro.minimo, otro.maximo)
+        return self
+
+    @classmethod
+    def fusionar_todos(cls, digestos, compresion: float = 100) -> "TDigest":
+        digestos = [d for d in digestos if len(d)]
+        if not digestos:
+            return cls(compresion)
+        resultado = cls(compresion)
+        resultado._extender(
+            np.concatenate([d.medias for d in digestos]),
+            np.concatenate([d.pesos for d in digestos]),
+            min(d.minimo for d in digestos),
+            max(d.maximo for d in digestos),
+        )
+        return resultado
+
+    def _extender(self, medias, pesos, minimo, maximo):
+        self.medias = np.concatenate([self.medias, medias])
+        self.pesos = np.concatenate([self.pesos, pesos])
+        self.minimo = minimo if self.minimo is None else min(self.minimo, minimo)
+        self.maximo = maximo if self.maximo is None else max(self.maximo, maximo)
+        self._comprimir()
+
+    def _k(self, q: float) -> float:
+        return self.compresion / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inversa(self, k: float) -> float:
+        return (math.sin(min(k * 2 * math.pi / self.compresion, math.pi / 2)) + 1) / 2
+
+    def _comprimir(self):
+        """Una pasada de fusión en orden con la función de escala k1."""
+        orden = np.argsort(self.medias, kind="stable")
+        medias, pesos = self.medias[orden], self.pesos[orden]
+        total = pesos.sum()
+
+        nuevas_medias, nuevos_pesos = [], []
+        media, peso = medias[0], pesos[0]
+        q_inicio = 0.0
+        q_limite = self._k_inversa(self._k(q_inicio) + 1)
+        for m, w in zip(medias[1:], pesos[1:]):
+            if q_inicio + (peso + w) / total <= q_limite:
+                peso += w
+                media += (m - media) * w / peso
+            else:
+                nuevas_medias.append(media)
+                nuevos_pesos.append(peso)
+                q_inicio += peso / total
+                q_limite = self._k_inversa(self._k(q_inicio) + 1)
+                media, peso = m, w
+        nuevas_medias.append(media)
+        nuevos_pesos.append(peso)
+
+        self.medias = np.asarray(nuevas_medias)
+        self.pesos = np.asarray(nuevos_pesos)
+
+    def cuantil(self, q: float) -> float | None:
+        """Valor aproximado del cuantil ``q`` (0-1)."""
+        if not len(self):
+            return None
+        if len(self) == 1:
+            return float(self.medias[0])
+
+        objetivo = q * self.total
+        centros = np.cumsum(self.pesos) - self.pesos / 2
+        if objetivo <= centros[0]:
+            # Entre el mínimo y el primer centroide
+            return float(
+                self.minimo + (self.medias[0] - self.minimo) * objetivo / centros[0]
+            )
+        if objetivo >= centros[-1]:
+            restante = self.total - centros[-1]
+            fraccion = (objetivo - centros[-1]) / restante if restante else 0
+            return float(self.medias[-1] + (self.maximo - self.medias[-1]) * fraccion)
+
+        i = int(np.searchsorted(centros, objetivo, side="right")) - 1
+        fraccion = (objetivo - centros[i]) / (centros[i + 1] - centros[i])
+        return float(self.medias[i] + (self.medias[i + 1] - self.medias[i]) * fraccion)
+
+    def a_dict(self) -> dict:
+        """Representación serializable en JSON."""
+        return {
+            "c": self.compresion,
+            "m": self.medias.round(6).tolist(),
+            "w": self.pesos.tolist(),
+            "min": self.minimo,
+            "max": self.maximo,
+        }
+
+    @classmethod
+    def desde_dict(cls, datos: dict) -> "TDigest":
+        return cls(datos["c"], datos["m"], datos["w"], datos["min"], datos["max"])
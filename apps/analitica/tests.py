@@ -1,3 +1,677 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import os
+import re
+import tempfile
+import zlib
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import override_settings
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from apps.analitica.cubo import a_dia, reconstruir_cubo
+from apps.analitica.estadisticas import AgregadoSolicitudes
+from apps.analitica.models import SolicitudDiaria
+from apps.analitica.periodos import comparar_periodos, ultimos_meses
+from apps.analitica.series import MAX_CUBETAS, serie_temporal
+from apps.analitica.tdigest import TDigest
+from apps.analitica.rendimiento import rendimiento_funcionarios
+from apps.analitica.tiempos import tiempos_resolucion_por_dependencia
+from apps.autenticacion.models import Usuario
+from apps.funcionarios.models import Funcionario
+from apps.localidades.models import Localidad
+from apps.solicitudes.models import Categoria, Solicitud
+from apps.solicitudes.tests import SolicitudesBaseTestCase
+from apps.utils.pdf import DocumentoPDF
+
+URL_COMPLETAS = "/api/v1/analitica/basica/solicitudes-funcionarios/completas/"
+URL_PERIODO = "/api/v1/analitica/basica/solicitudes-funcionarios/periodo/"
+URL_MAPA = "/api/v1/analitica/basica/solicitudes-funcionarios/mapa-calor/"
+URL_PERCENTILES = "/api/v1/analitica/basica/solicitudes-funcionarios/percentiles/"
+URL_COMPARACION = "/api/v1/analitica/basica/solicitudes-funcionarios/comparacion/"
+
+
+class AgregadoSolicitudesTests(SolicitudesBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        otra_categoria = Categoria.objects.create(
+            nombre="Alumbrado", dependencia_municipal=self.dependencia
+        )
+        otra_localidad = Localidad.objects.create(
+            codigo_postal="86710",
+            colonia="Benito Juárez",
+            municipio="Macuspana",
+            estado="Tabasco",
+            tipo="Colonia",
+        )
+        solicitudes = self.crear_solicitudes(6)
+        for solicitud in solicitudes[:2]:
+            solicitud.categoria = otra_categoria
+            solicitud.save()
+        solicitudes[0].cambiar_estado("visto")
+        solicitudes[1].cambiar_estado("completada")
+        solicitudes[2].cambiar_estado("rechazada")
+        self.ciudadano.localidad = otra_localidad
+        self.ciudadano.save()
+        reconstruir_cubo()
+
+    def test_desgloses_coinciden_con_las_consultas_orm(self):
+        queryset = Solicitud.objects.all()
+        agregado = AgregadoSolicitudes(SolicitudDiaria.objects.all())
+
+        self.assertEqual(
+            sorted(agregado.por_estado(), key=lambda x: x["estado"]),
+            list(queryset.values("estado").annotate(total=Count("id")).order_by("estado")),
+        )
+        self.assertEqual(
+            sorted(agregado.por_categoria(), key=lambda x: x["categoria_id"]),
+            list(
+                queryset.values("categoria__nombre", "categoria_id")
+                .annotate(total=Count("id"))
+                .order_by("categoria_id")
+            ),
+        )
+        self.assertEqual(
+            agregado.tendencia_mensual(),
+            list(
+                queryset.annotate(mes=TruncMonth("fecha_creacion"))
+                .values("mes")
+                .annotate(total=Count("id"))
+                .order_by("mes")
+            ),
+        )
+        self.assertEqual(agregado.resumen()["total_solicitudes"], 6)
+        self.assertEqual(agregado.por_dependencia()[0]["en_proceso"], 4)
+
+    def test_estadisticas_completas_en_una_sola_consulta(self):
+        client = self.cliente_jwt(self.usuario_funcionario)
+
+        # Antes eran ~10 consultas sobre el mismo queryset; ahora una lectura
+        consultas = self.contar_consultas(client, URL_COMPLETAS)
+        self.assertEqual(consultas, 1)
+
+        data = client.get(URL_COMPLETAS).json()
+        self.assertEqual(data["resumen"]["total_solicitudes"], 6)
+        self.assertEqual(data["por_localidad"][0]["total"], 6)
+
+
+class RankingFuncionariosTests(SolicitudesBaseTestCase):
+    def crear_funcionario(self, indice):
+        usuario = Usuario.objects.create_user(
+            f"funcionario{indice}@example.com", "funcionario", "secreto123"
+        )
+        return Funcionario.objects.create(
+            nombre_completo=f"Funcionario {indice}",
+            correo=f"funcionario{indice}@example.com",
+            telefono="9930000000",
+            cargo="Auxiliar",
+            sexo="F",
+            dependencia=self.dependencia,
+            usuario=usuario,
+        )
+
+    def test_ranking_en_numero_constante_de_consultas(self):
+        primera, _ = self.crear_solicitudes(2, comentarios=2)
+        primera.cambiar_estado("completada")
+        admin = Usuario.objects.create_user("admin@example.com", "admin", "secreto123")
+        client = self.cliente_jwt(admin)
+        url = "/api/v1/analitica/basica/solicitudes-funcionarios/ranking/"
+
+        pocos = self.contar_consultas(client, url)
+        with self.captureOnCommitCallbacks(execute=True):
+            for indice in range(5):
+                self.crear_funcionario(indice)
+        muchos = self.contar_consultas(client, url)
+
+        self.assertEqual(pocos, muchos)
+        ranking = client.get(url).json()["ranking"]
+        self.assertEqual(len(ranking), 6)
+        self.assertEqual(ranking[0]["tasa_completadas"], 50.0)
+
+    def test_rendimiento_cruza_comentarios_por_autor(self):
+        self.crear_solicitudes(2, comentarios=3)
+        otro = self.crear_funcionario(1)
+
+        filas = {
+            fila["id"]: fila
+            for fila in rendimiento_funcionarios(
+                Solicitud.objects.all(), con_tiempos=True
+            )
+        }
+
+        self.assertEqual(filas[self.funcionario.id]["comentarios_realizados"], 6)
+        self.assertEqual(filas[otro.id]["comentarios_realizados"], 0)
+        self.assertEqual(filas[otro.id]["solicitudes_asignadas"], 2)
+        self.assertIsNotNone(filas[otro.id]["tiempo_promedio_respuesta_horas"])
+
+
+class TiemposResolucionTests(SolicitudesBaseTestCase):
+    def test_promedio_mediana_y_p90_por_dependencia(self):
+        solicitudes = self.crear_solicitudes(5)
+        inicio = timezone.now() - timedelta(days=10)
+        for horas, solicitud in zip([1, 2, 3, 4, 10], solicitudes):
+            Solicitud.objects.filter(pk=solicitud.pk).update(
+                estado="completada",
+                fecha_creacion=inicio,
+                fecha_resolucion=inicio + timedelta(hours=horas),
+            )
+        # Pendiente: no cuenta
+        self.crear_solicitudes(1)
+
+        (fila,) = tiempos_resolucion_por_dependencia(Solicitud.objects.all())
+
+        self.assertEqual(fila["dependencia"], "Obras Públicas")
+        self.assertEqual(fila["solicitudes_completadas"], 5)
+        self.assertEqual(fila["tiempo_promedio_horas"], 4.0)
+        self.assertEqual(fila["mediana_horas"], 3.0)
+        self.assertEqual(fila["p90_horas"], 7.6)
+
+
+class CacheAnaliticaTests(SolicitudesBaseTestCase):
+    url = "/api/v1/analitica/basica/solicitudes-funcionarios/completas/"
+
+    def test_respuesta_cacheada_con_etag_e_invalidacion(self):
+        self.crear_solicitudes(2)
+        client = self.cliente_jwt(self.usuario_funcionario)
+
+        primera = client.get(self.url)
+        self.assertEqual(self.contar_consultas(client, self.url), 0)
+
+        etag = primera["ETag"]
+        no_modificada = client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(no_modificada.status_code, 304)
+
+        # Otros parámetros de consulta usan otra entrada
+        otra = self.cliente(self.usuario_funcionario).get(self.url, {"x": "1"})
+        self.assertEqual(otra.status_code, 200)
+
+        self.crear_solicitudes(1)
+
+        nueva = client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(nueva.status_code, 200)
+        self.assertNotEqual(nueva["ETag"], etag)
+        self.assertEqual(nueva.json()["resumen"]["total_solicitudes"], 3)
+
+    def test_generaciones_persistidas_para_exportaciones(self):
+        from django.core.cache import cache
+
+        from apps.analitica.cache import generacion_de, invalidar_dependencia
+
+        alcance, generacion = generacion_de(self.usuario_funcionario)
+        # Un reinicio (caché vacía) no reutiliza la generación
+        cache.clear()
+        self.assertEqual(generacion_de(self.usuario_funcionario), (alcance, generacion))
+
+        # Otro proceso invalida; la copia local queda vieja pero las
+        # exportaciones leen la generación de la base de datos
+        invalidar_dependencia(self.dependencia.id)
+        cache.set(f"analitica:gen:dep:{self.dependencia.id}", generacion)
+        self.assertEqual(generacion_de(self.usuario_funcionario), (alcance, generacion + 1))
+
+    def test_solo_el_dueno_libera_el_bloqueo(self):
+        from django.core.cache import cache
+
+        from apps.analitica import cache as cache_analitica
+
+        cache.add("analitica:prueba:bloqueo", "otro", timeout=30)
+        # Quien espera y se cansa calcula, pero no borra el bloqueo ajeno
+        with mock.patch.object(cache_analitica, "ESPERA_BLOQUEO", 0):
+            entrada = cache_analitica._calcular_una_vez(
+                "analitica:prueba", lambda: {"data": 1}, 60
+            )
+
+        self.assertEqual(entrada, {"data": 1})
+        self.assertEqual(cache.get("analitica:prueba:bloqueo"), "otro")
+
+
+class CuboDiarioTests(SolicitudesBaseTestCase):
+    def test_signals_mantienen_el_cubo_igual_a_una_reconstruccion(self):
+        primera, segunda, _ = self.crear_solicitudes(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            primera.cambiar_estado("visto")
+            primera.cambiar_estado("completada")
+            segunda.cambiar_estado("rechazada")
+
+        columnas = ("dia", "categoria_id", "localidad_id", "estado", "cantidad", "resueltas")
+        incremental = sorted(SolicitudDiaria.objects.values_list(*columnas))
+        reconstruir_cubo()
+        self.assertEqual(incremental, sorted(SolicitudDiaria.objects.values_list(*columnas)))
+
+        fila = SolicitudDiaria.objects.get(estado="completada")
+        self.assertEqual((fila.cantidad, fila.respondidas, fila.resueltas), (1, 1, 1))
+
+    def test_transaccion_refresca_cada_par_una_vez(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        (solicitud,) = self.crear_solicitudes(1)
+        client = self.cliente(self.usuario_funcionario)
+        with CaptureQueriesContext(connection) as consultas:
+            with self.captureOnCommitCallbacks(execute=True):
+                client.patch(
+                    f"/api/v1/solicitudes/{solicitud.pk}/",
+                    {"estado": "visto", "comentario": "Revisando"},
+                    format="json",
+                )
+        borrados = [
+            c for c in consultas if c["sql"].startswith('DELETE FROM "analytics_solicitudes_diarias"')
+        ]
+        self.assertEqual(len(borrados), 1)
+        self.assertEqual(SolicitudDiaria.objects.get().estado, "visto")
+
+    def test_fallo_al_refrescar_queda_pendiente(self):
+        from apps.analitica.models import CuboPendiente
+
+        with mock.patch(
+            "apps.analitica.signals.refrescar_pares", side_effect=RuntimeError("caído")
+        ), self.assertLogs("apps.analitica.signals", "ERROR"):
+            self.crear_solicitudes(2)
+
+        self.assertFalse(SolicitudDiaria.objects.exists())
+        self.assertEqual(CuboPendiente.objects.count(), 1)
+
+        call_command("refrescar_cubo_solicitudes", "--pendientes", stdout=io.StringIO())
+        self.assertEqual(SolicitudDiaria.objects.get().cantidad, 2)
+        self.assertFalse(CuboPendiente.objects.exists())
+
+    def test_mismos_limites_por_dia_en_cubo_y_solicitudes(self):
+        primera, _ = self.crear_solicitudes(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            primera.cambiar_estado("completada")
+        admin = Usuario.objects.create_user("admin@example.com", "admin", "secreto123")
+        client = self.cliente_jwt(admin)
+
+        # Una hora de hoy anterior a las solicitudes incluye todo el día en
+        # ambas fuentes; una fecha inválida se ignora
+        response = client.get(
+            URL_COMPLETAS,
+            {"fecha_inicio": "2025-02-30", "fecha_fin": f"{timezone.localdate()}T00:00:00"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["resumen"]["total_solicitudes"], 2)
+        self.assertEqual(len(data["admin_avanzado"]["tiempo_resolucion_por_dependencia"]), 1)
+
+    def test_periodos_y_mapa_se_leen_del_cubo(self):
+        self.crear_solicitudes(4)
+        client = self.cliente_jwt(self.usuario_funcionario)
+
+        datos = client.get(URL_PERIODO, {"periodo": "dia"}).json()["datos"]
+        self.assertEqual(len(datos), 30)
+        self.assertEqual(
+            datos[0],
+            {
+                "fecha": timezone.localdate().isoformat(),
+                "total": 4,
+                "completadas": 0,
+                "rechazadas": 0,
+                "enviadas": 4,
+                "vistas": 0,
+                "promedio_movil": round(4 / 7, 2),
+            },
+        )
+        mes = client.get(URL_PERIODO, {"periodo": "mes"}).json()["datos"]
+        self.assertEqual(mes[0]["total"], 4)
+        self.assertEqual(
+            client.get(URL_PERIODO, {"ventana": "-1"}).status_code, 400
+        )
+
+        (localidad,) = client.get(URL_MAPA).json()["localidades"]
+        self.assertEqual(localidad["ciudadano__localidad__colonia"], "Centro")
+        self.assertEqual(localidad["pendientes"], 4)
+
+
+class ComparacionPeriodosTests(SolicitudesBaseTestCase):
+    def test_meses_alineados_incluso_en_fin_de_mes(self):
+        self.assertEqual(
+            ultimos_meses(3, hoy=date(2025, 3, 31)),
+            [
+                (date(2025, 1, 1), date(2025, 1, 31)),
+                (date(2025, 2, 1), date(2025, 2, 28)),
+                (date(2025, 3, 1), date(2025, 3, 31)),
+            ],
+        )
+        self.assertEqual(
+            ultimos_meses(2, hoy=date(2024, 1, 15))[0],
+            (date(2023, 12, 1), date(2023, 12, 31)),
+        )
+
+    def test_todos_los_periodos_en_una_consulta(self):
+        anteriores = self.crear_solicitudes(3)
+        self.crear_solicitudes(2)
+        hace_un_mes = timezone.now() - timedelta(days=35)
+        Solicitud.objects.filter(pk__in=[s.pk for s in anteriores]).update(
+            fecha_creacion=hace_un_mes
+        )
+        reconstruir_cubo()
+        periodos = [
+            (a_dia(hace_un_mes), a_dia(hace_un_mes)),
+            (timezone.localdate(), timezone.localdate()),
+        ]
+
+        with self.assertNumQueries(1):
+            primero, segundo = comparar_periodos(SolicitudDiaria.objects.all(), periodos)
+
+        self.assertEqual(primero["estadisticas"]["total"], 3)
+        self.assertEqual(segundo["estadisticas"]["enviadas"], 2)
+        self.assertEqual(segundo["estadisticas"]["completadas"], 0)
+
+    def test_vista_por_defecto_y_varios_meses(self):
+        self.crear_solicitudes(2)
+        client = self.cliente_jwt(self.usuario_funcionario)
+
+        data = client.get(URL_COMPARACION).json()
+        self.assertEqual(data["periodo2"]["estadisticas"]["total"], 2)
+        self.assertEqual(data["periodo2"]["fin"], timezone.localdate().isoformat())
+        self.assertEqual(data["diferencia"]["total"], 2)
+
+        data = client.get(URL_COMPARACION, {"meses": 6}).json()
+        self.assertEqual(len(data["periodos"]), 6)
+
+    def test_fechas_imposibles_responden_400(self):
+        client = self.cliente_jwt(self.usuario_funcionario)
+        respuesta = client.get(
+            URL_COMPARACION,
+            {
+                "periodo1_inicio": "2024-02-30",
+                "periodo1_fin": "2024-03-31",
+                "periodo2_inicio": "2024-04-01",
+                "periodo2_fin": "2024-04-30",
+            },
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()["detail"], "Fechas de periodo inválidas")
+
+
+class SerieTemporalTests(SolicitudesBaseTestCase):
+    def test_rejilla_densa_con_cubetas_arbitrarias(self):
+        hoy = date(2025, 3, 12)
+        SolicitudDiaria.objects.bulk_create(
+            SolicitudDiaria(
+                dia=dia,
+                dependencia=self.dependencia,
+                categoria=self.categoria,
+                localidad=self.localidad,
+                estado="enviada",
+                cantidad=cantidad,
+            )
+            for dia, cantidad in [(date(2025, 3, 1), 2), (date(2025, 3, 3), 4), (hoy, 6)]
+        )
+
+        with self.assertNumQueries(1):
+            serie = serie_temporal(
+                SolicitudDiaria.objects.all(),
+                periodo="dia",
+                inicio=date(2025, 3, 1),
+                fin=hoy,
+                tamano=3,
+                ventana=2,
+            )
+
+        self.assertEqual(
+            [(p["fecha"], p["total"]) for p in serie],
+            [
+                (date(2025, 3, 1), 6),
+                (date(2025, 3, 4), 0),
+                (date(2025, 3, 7), 0),
+                (date(2025, 3, 10), 6),
+            ],
+        )
+        self.assertEqual([p["promedio_movil"] for p in serie], [6.0, 3.0, 0.0, 3.0])
+
+        meses = serie_temporal(
+            SolicitudDiaria.objects.all(), periodo="mes", inicio=date(2024, 12, 5), fin=hoy
+        )
+        self.assertEqual([p["total"] for p in meses], [0, 0, 0, 12])
+        self.assertEqual(meses[0]["fecha"].date(), date(2024, 12, 1))
+
+        for ventana in (0, -1, MAX_CUBETAS + 1):
+            with self.assertRaises(ValueError):
+                serie_temporal(SolicitudDiaria.objects.all(), ventana=ventana)
+
+
+class PercentilesTiemposTests(SolicitudesBaseTestCase):
+    def test_digestos_fusionados_aproximan_los_cuantiles(self):
+        valores = np.random.default_rng(7).lognormal(2, 1, 10_000)
+        partes = [TDigest().agregar(parte) for parte in np.array_split(valores, 30)]
+        fusionado = TDigest.fusionar_todos(
+            TDigest.desde_dict(parte.a_dict()) for parte in partes
+        )
+
+        self.assertEqual(fusionado.total, 10_000)
+        for q in (0.5, 0.9, 0.99):
+            exacto = np.quantile(valores, q)
+            self.assertAlmostEqual(fusionado.cuantil(q) / exacto, 1, delta=0.03)
+
+    def test_endpoint_por_dependencia_y_categoria(self):
+        solicitudes = self.crear_solicitudes(4)
+        inicio = timezone.now() - timedelta(hours=30)
+        for horas, solicitud in zip([1, 2, 3, 24], solicitudes):
+            Solicitud.objects.filter(pk=solicitud.pk).update(
+                estado="completada",
+                fecha_creacion=inicio,
+                fecha_visto=inicio + timedelta(hours=horas / 2),
+                fecha_resolucion=inicio + timedelta(hours=horas),
+            )
+        reconstruir_cubo()
+        client = self.cliente_jwt(self.usuario_funcionario)
+
+        (fila,) = client.get(URL_PERCENTILES).json()["percentiles"]
+        self.assertEqual(fila["dependencia"], "Obras Públicas")
+        self.assertEqual(fila["resolucion"]["solicitudes"], 4)
+        self.assertEqual(fila["resolucion"]["p99"], 24.0)
+        self.assertEqual(fila["respuesta"]["p50"], 1.25)
+
+        (fila,) = client.get(URL_PERCENTILES, {"agrupar": "categoria"}).json()[
+            "percentiles"
+        ]
+        self.assertEqual(fila["categoria"], "Bacheo")
+
+        respuesta = client.get(URL_PERCENTILES, {"desde": "2024-02-30"})
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class ExportacionCSVTests(SolicitudesBaseTestCase):
+    url = "/api/v1/analitica/basica/solicitudes-funcionarios/exportar/"
+
+    def test_csv_en_streaming_y_gzip(self):
+        solicitudes = self.crear_solicitudes(3)
+        solicitudes[0].cambiar_estado("completada")
+        client = self.cliente_jwt(self.usuario_funcionario)
+
+        response = client.get(self.url)
+        self.assertTrue(response.streaming)
+        contenido = b"".join(response.streaming_content).decode("utf-8")
+        filas = list(csv.reader(io.StringIO(contenido.lstrip("\ufeff"))))
+        self.assertEqual(filas[0][0], "Folio")
+        self.assertEqual(len(filas), 4)
+        self.assertIn(
+            ["SOL-TEST-00000", "Bacheo", "Completada", "Ana Pérez", "Centro"],
+            [fila[:5] for fila in filas[1:]],
+        )
+
+        comprimida = client.get(self.url, {"gzip": "1"})
+        self.assertEqual(comprimida["Content-Type"], "application/gzip")
+        self.assertEqual(
+            gzip.decompress(b"".join(comprimida.streaming_content)).decode("utf-8"),
+            contenido,
+        )
+
+
+class ExportacionesSegundoPlanoTests(SolicitudesBaseTestCase):
+    url = "/api/v1/analitica/basica/solicitudes-funcionarios/exportaciones/"
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        privado = tempfile.TemporaryDirectory()
+        self.addCleanup(privado.cleanup)
+        self.media, self.privado = media.name, privado.name
+        ajustes = override_settings(MEDIA_ROOT=media.name, EXPORTACIONES_ROOT=privado.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_trabajo_deduplicado_y_descarga_reanudable(self):
+        self.crear_solicitudes(3)
+        client = self.cliente_jwt(self.usuario_funcionario)
+
+        creado = client.post(self.url, {"formato": "csv", "estado": "enviada"})
+        self.assertEqual(creado.status_code, 202)
+        self.assertEqual(creado.json()["estado"], "pendiente")
+        repetido = client.post(self.url, {"formato": "csv", "estado": "enviada"})
+        self.assertEqual(repetido.json()["id"], creado.json()["id"])
+
+        detalle = f"{self.url}{creado.json()['id']}/"
+        self.assertEqual(client.get(f"{detalle}descargar/").status_code, 409)
+
+        call_command("procesar_exportaciones", "--una-vez", stdout=io.StringIO())
+        self.assertEqual(client.get(detalle).json()["estado"], "completado")
+        # El archivo queda en el directorio privado, no en MEDIA_ROOT
+        self.assertEqual(os.listdir(self.media), [])
+        self.assertEqual(len(os.listdir(self.privado)), 1)
+
+        completa = client.get(f"{detalle}descargar/")
+        self.assertEqual(completa.status_code, 200)
+        contenido = b"".join(completa.streaming_content)
+        self.assertEqual(len(contenido.decode("utf-8").splitlines()), 4)
+        etag = completa["ETag"]
+
+        parcial = client.get(
+            f"{detalle}descargar/", HTTP_RANGE="bytes=10-", HTTP_IF_RANGE=etag
+        )
+        self.assertEqual(parcial.status_code, 206)
+        self.assertEqual(
+            parcial["Content-Range"], f"bytes 10-{len(contenido) - 1}/{len(contenido)}"
+        )
+        self.assertEqual(b"".join(parcial.streaming_content), contenido[10:])
+
+        # Si el ETag cambió se envía el archivo completo
+        otro = client.get(
+            f"{detalle}descargar/", HTTP_RANGE="bytes=10-", HTTP_IF_RANGE='"x"'
+        )
+        self.assertEqual(otro.status_code, 200)
+        fuera = client.get(f"{detalle}descargar/", HTTP_RANGE=f"bytes={len(contenido)}-")
+        self.assertEqual(fuera.status_code, 416)
+
+        # Un archivo vigente se reutiliza hasta que cambian los datos
+        vigente = client.post(self.url, {"formato": "csv", "estado": "enviada"})
+        self.assertEqual(vigente.status_code, 200)
+        self.crear_solicitudes(1)
+        nuevo = client.post(self.url, {"formato": "csv", "estado": "enviada"})
+        self.assertEqual(nuevo.status_code, 202)
+        self.assertNotEqual(nuevo.json()["id"], creado.json()["id"])
+
+    def test_pdf_solo_para_administradores(self):
+        client = self.cliente_jwt(self.usuario_funcionario)
+        self.assertEqual(client.post(self.url, {"formato": "pdf"}).status_code, 403)
+        self.assertEqual(client.post(self.url, {"formato": "xls"}).status_code, 400)
+
+
+class DocumentoPDFTests(SolicitudesBaseTestCase):
+    url = "/api/v1/analitica/basica/solicitudes-funcionarios/reporte/pdf/"
+
+    def test_tabla_larga_se_pagina_con_xref_valida(self):
+        documento = DocumentoPDF("Prueba").tabla(
+            ["#", "Ruta (muy larga)"], [[i, "x" * 300] for i in range(120)]
+        )
+        pdf = documento.a_bytes()
+
+        paginas = int(re.search(rb"/Type /Pages /Kids \[.*?\] /Count (\d+)", pdf)[1])
+        self.assertGreater(paginas, 1)
+        inicio_xref = int(re.search(rb"startxref\n(\d+)", pdf)[1])
+        entradas = pdf[inicio_xref:].split(b"\n")[2:]
+        for numero, entrada in enumerate(entradas[1:], start=1):
+            if not entrada.endswith(b" n "):
+                break
+            desplazamiento = int(entrada[:10])
+            self.assertTrue(pdf[desplazamiento:].startswith(b"%d 0 obj" % numero))
+
+        # Cada página repite el encabezado de la tabla
+        contenidos = [
+            zlib.decompress(flujo)
+            for flujo in re.findall(rb"stream\n(.*?)\nendstream", pdf, re.S)
+        ]
+        self.assertEqual(len(contenidos), paginas)
+        self.assertTrue(all(b"(Ruta \\(muy larga\\))" in c for c in contenidos))
+
+    def test_reporte_cacheado_por_datos(self):
+        self.crear_solicitudes(2)
+        usuario = Usuario.objects.create_user("admin@example.com", "admin", "secreto123")
+        client = self.cliente_jwt(usuario)
+
+        primera = client.get(self.url)
+        self.assertEqual(primera.status_code, 200)
+        pdf = b"".join(primera.streaming_content)
+        self.assertTrue(pdf.startswith(b"%PDF-1.4"))
+
+        segunda = client.get(self.url)
+        self.assertFalse(segunda.streaming)
+        self.assertEqual(segunda.content, pdf)
+        self.assertEqual(segunda["ETag"], primera["ETag"])
+        self.assertEqual(
+            client.get(self.url, HTTP_IF_NONE_MATCH=primera["ETag"]).status_code, 304
+        )
+
+
+class PaquetesReportesTests(SolicitudesBaseTestCase):
+    url = "/api/v1/analitica/basica/solicitudes-funcionarios/exportar/"
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        privado = tempfile.TemporaryDirectory()
+        self.addCleanup(privado.cleanup)
+        self.media = media.name
+        ajustes = override_settings(MEDIA_ROOT=media.name, PAQUETES_ROOT=privado.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_paquete_servido_mientras_coincide_con_el_cubo(self):
+        self.crear_solicitudes(3)
+        hoy = timezone.localdate().isoformat()
+        call_command(
+            "generar_paquetes_reportes",
+            "--tipo=semana",
+            f"--inicio={hoy}",
+            "--procesos=0",
+            stdout=io.StringIO(),
+        )
+        # Los paquetes no quedan en el árbol público de MEDIA_ROOT
+        self.assertEqual(os.listdir(self.media), [])
+        client = self.cliente_jwt(self.usuario_funcionario)
+        parametros = {"periodo": "semana", "inicio": hoy}
+
+        paquete = client.get(self.url, parametros)
+        self.assertEqual(paquete["Accept-Ranges"], "bytes")
+        contenido = b"".join(paquete.streaming_content).decode("utf-8")
+        self.assertEqual(len(contenido.splitlines()), 4)
+
+        # Con filtros adicionales, ediciones o datos nuevos se responde en vivo
+        filtrada = client.get(self.url, {**parametros, "estado": "enviada"})
+        self.assertNotIn("Accept-Ranges", filtrada)
+        solicitud = Solicitud.objects.first()
+        solicitud.descripcion = "Descripción corregida"
+        with self.captureOnCommitCallbacks(execute=True):
+            solicitud.save()
+        editada = client.get(self.url, parametros)
+        self.assertNotIn("Accept-Ranges", editada)
+        self.assertIn("Descripción corregida", b"".join(editada.streaming_content).decode("utf-8"))
+        self.crear_solicitudes(1)
+        vivo = client.get(self.url, parametros)
+        self.assertNotIn("Accept-Ranges", vivo)
+        self.assertEqual(
+            len(b"".join(vivo.streaming_content).decode("utf-8").splitlines()), 5
+        )
+
+        self.assertEqual(
+            client.get(self.url, {"periodo": "anio"}).status_code, 400
+        )
@@ -0,0 +1,180 @@
+"""
+Tiempos de resolución por dependencia (promedio, mediana y percentil 90).
+
+En PostgreSQL todo se calcula en una sola consulta agrupada con
+``percentile_cont``. En otros motores (SQLite en desarrollo) se lee una
+proyección de dos columnas (dependencia, duración) y los estadísticos se
+calculan con NumPy.
+
+Para rangos arbitrarios, ``percentiles_tiempos`` fusiona los digestos
+t-digest diarios de ``TiempoDiario`` en lugar de ordenar cada solicitud.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+from django.db import connections
+from django.db.models import (
+    Aggregate,
+    Avg,
+    Count,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    Func,
+)
+
+from apps.analitica.models import TiempoDiario
+from apps.analitica.tdigest import TDigest
+from apps.dependecias_municipales.models import DependenciaMunicipal
+
+CAMPO_DEPENDENCIA = "categoria__dependencia_municipal_id"
+
+
+class HorasEntre(Func):
+    """Horas transcurridas entre dos fechas (solo PostgreSQL)."""
+
+    template = "EXTRACT(EPOCH FROM (%(expressions)s)) / 3600.0"
+    arg_joiner = " - "
+    output_field = FloatField()
+
+
+class PercentilCont(Aggregate):
+    """``percentile_cont(p) WITHIN GROUP (ORDER BY expr)`` de PostgreSQL."""
+
+    function = "PERCENTILE_CONT"
+    name = "PercentilCont"
+    template = "%(function)s(%(percentil)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = FloatField()
+
+    def __init__(self, expression, percentil, **extra):
+        super().__init__(expression, percentil=float(percentil), **extra)
+
+
+def _resueltas(solicitudes):
+    return solicitudes.filter(estado="completada", fecha_resolucion__isnull=False)
+
+
+def _por_dependencia_postgresql(solicitudes) -> dict[int, dict]:
+    horas = HorasEntre(F("fecha_resolucion"), F("fecha_creacion"))
+    filas = (
+        _resueltas(solicitudes)
+        .order_by()
+        .values(dependencia_id=F(CAMPO_DEPENDENCIA))
+        .annotate(
+            total=Count("id"),
+            promedio=Avg(horas),
+            mediana=PercentilCont(horas, 0.5),
+            p90=PercentilCont(horas, 0.9),
+        )
+    )
+    return {fila.pop("dependencia_id"): fila for fila in filas}
+
+
+def _por_dependencia_numpy(solicitudes, chunk_size: int) -> dict[int, dict]:
+    filas = (
+        _resueltas(solicitudes)
+        .order_by()
+        .values_list(
+            CAMPO_DEPENDENCIA,
+            ExpressionWrapper(
+                F("fecha_resolucion") - F("fecha_creacion"),
+                output_field=DurationField(),
+            ),
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    dependencias = []
+    horas = []
+    for dependencia_id, duracion in filas:
+        dependencias.append(dependencia_id)
+        horas.append(duracion.total_seconds() / 3600)
+    if not horas:
+        return {}
+
+    dependencias = np.asarray(dependencias, dtype=np.int64)
+    horas = np.asarray(horas, dtype=np.float64)
+    orden = np.argsort(dependencias, kind="stable")
+    dependencias, horas = dependencias[orden], horas[orden]
+    claves, inicios = np.unique(dependencias, return_index=True)
+
+    resultado = {}
+    for dependencia_id, grupo in zip(claves, np.split(horas, inicios[1:])):
+        mediana, p90 = np.percentile(grupo, [50, 90])
+        resultado[int(dependencia_id)] = {
+            "total": int(grupo.size),
+            "promedio": float(grupo.mean()),
+            "mediana": float(mediana),
+            "p90": float(p90),
+        }
+    return resultado
+
+
+def tiempos_resolucion_por_dependencia(solicitudes, chunk_size: int = 2000) -> list[dict]:
+    """
+    Estadísticos de resolución (en horas) de las solicitudes completadas de
+    ``solicitudes`` agrupados por dependencia, del más rápido al más lento.
+    """
+    if connections[solicitudes.db].vendor == "postgresql":
+        por_dependencia = _por_dependencia_postgresql(solicitudes)
+    else:
+        por_dependencia = _por_dependencia_numpy(solicitudes, chunk_size)
+    if not por_dependencia:
+        return []
+
+    nombres = dict(
+        DependenciaMunicipal.objects.filter(pk__in=por_dependencia).values_list(
+            "id", "nombre"
+        )
+    )
+    resultado = [
+        {
+            "dependencia_id": dependencia_id,
+            "dependencia": nombres.get(dependencia_id),
+            "tiempo_promedio_horas": round(fila["promedio"], 2),
+            "mediana_horas": round(fila["mediana"], 2),
+            "p90_horas": round(fila["p90"], 2),
+            "solicitudes_completadas": fila["total"],
+        }
+        for dependencia_id, fila in por_dependencia.items()
+    ]
+    resultado.sort(key=lambda x: x["tiempo_promedio_horas"])
+    return resultado
+
+
+CUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+
+
+def percentiles_tiempos(tiempos, por_categoria: bool = False) -> list[dict]:
+    """
+    p50/p90/p99 (en horas) de primera respuesta y de resolución por
+    dependencia (y categoría), fusionando los digestos de ``tiempos``
+    (queryset de ``TiempoDiario`` ya filtrado por alcance y fechas).
+    """
+    claves = {"dependencia_id": "dependencia_id", "dependencia__nombre": "dependencia"}
+    if por_categoria:
+        claves.update({"categoria_id": "categoria_id", "categoria__nombre": "categoria"})
+
+    digestos = defaultdict(lambda: defaultdict(list))
+    for *grupo, metrica, digesto in (
+        tiempos.order_by().values_list(*claves, "metrica", "digesto").iterator()
+    ):
+        digestos[tuple(grupo)][metrica].append(TDigest.desde_dict(digesto))
+
+    resultado = []
+    for grupo, por_metrica in digestos.items():
+        fila = dict(zip(claves.values(), grupo))
+        for metrica, _ in TiempoDiario.METRICAS:
+            fusionado = TDigest.fusionar_todos(por_metrica.get(metrica, []))
+            fila[metrica] = {
+                "solicitudes": int(fusionado.total),
+                **{
+                    nombre: round(fusionado.cuantil(q), 2) if len(fusionado) else None
+                    for nombre, q in CUANTILES.items()
+                },
+            }
+        resultado.append(fila)
+
+    resultado.sort(key=lambda x: (x["dependencia"], x.get("categoria") or ""))
+    return resultado
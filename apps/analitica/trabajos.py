@@ -0,0 +1,169 @@
+"""
+Exportaciones en segundo plano.
+
+La vista solo registra un ``TrabajoExportacion`` y devuelve su id; el comando
+``procesar_exportaciones`` toma los trabajos pendientes (``SKIP LOCKED`` para
+que varios procesos no tomen el mismo), escribe el archivo en
+``EXPORTACIONES_ROOT`` (privado, fuera de ``MEDIA_ROOT``) en bloques y guarda
+su tamaño y ``ETag`` para las descargas parciales.
+
+La clave de deduplicación incluye la generación de caché del alcance (ver
+``apps.analitica.cache``): mientras no cambien los datos, la misma exportación
+con los mismos filtros reutiliza el archivo ya generado.
+"""
+
+import hashlib
+import json
+import os
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.analitica.cache import generacion_de
+from apps.analitica.exportacion import (
+    aplicar_filtros,
+    documento_reporte,
+    filas_csv,
+    resumen_reporte,
+)
+from apps.analitica.models import TrabajoExportacion
+from apps.autenticacion.alcance import dependencia_id_de
+from apps.solicitudes.models import Solicitud
+
+VIGENCIA = timedelta(hours=6)  # tiempo que un archivo generado se reutiliza
+TIEMPO_MAXIMO = timedelta(minutes=30)  # un trabajo "procesando" más viejo se reintenta
+
+TIPOS_CONTENIDO = {
+    "csv": "text/csv; charset=utf-8",
+    "pdf": "application/pdf",
+}
+
+
+def clave_exportacion(alcance: str, generacion: int, formato: str, filtros: dict) -> str:
+    contenido = json.dumps([alcance, generacion, formato, filtros], sort_keys=True)
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+def _vigente(trabajo: TrabajoExportacion) -> bool:
+    if trabajo.estado in ("pendiente", "procesando"):
+        return True
+    return (
+        trabajo.estado == "completado"
+        and trabajo.fecha_fin >= timezone.now() - VIGENCIA
+        and os.path.exists(trabajo.archivo.path)
+    )
+
+
+def solicitar_exportacion(user, formato: str, filtros: dict) -> tuple[TrabajoExportacion, bool]:
+    """
+    Trabajo que atiende la exportación pedida por ``user`` y si se creó uno
+    nuevo. Reutiliza un trabajo en curso o un archivo vigente con la misma clave.
+    """
+    alcance, generacion = generacion_de(user)
+    clave = clave_exportacion(alcance, generacion, formato, filtros)
+
+    candidatos = TrabajoExportacion.objects.filter(
+        clave=clave, estado__in=["pendiente", "procesando", "completado"]
+    ).order_by("-fecha_creacion")
+    for trabajo in candidatos[:5]:
+        if _vigente(trabajo):
+            return trabajo, False
+
+    trabajo = TrabajoExportacion.objects.create(
+        usuario_id=user.id,
+        formato=formato,
+        alcance=alcance,
+        dependencia_id=dependencia_id_de(user),
+        filtros=filtros,
+        clave=clave,
+    )
+    return trabajo, True
+
+
+def tomar_siguiente() -> TrabajoExportacion | None:
+    """Marca como ``procesando`` el trabajo pendiente más antiguo y lo devuelve."""
+    limite = timezone.now() - TIEMPO_MAXIMO
+    with transaction.atomic():
+        trabajo = (
+            TrabajoExportacion.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(estado="pendiente") | Q(estado="procesando", fecha_inicio__lt=limite)
+            )
+            .order_by("fecha_creacion", "id")
+            .first()
+        )
+        if trabajo is None:
+            return None
+        trabajo.estado = "procesando"
+        trabajo.fecha_inicio = timezone.now()
+        trabajo.save(update_fields=["estado", "fecha_inicio"])
+    return trabajo
+
+
+def _solicitudes(trabajo: TrabajoExportacion):
+    queryset = Solicitud.objects.all()
+    if trabajo.alcance != "admin":
+        queryset = queryset.filter(
+            categoria__dependencia_municipal_id=trabajo.dependencia_id
+        )
+    return aplicar_filtros(queryset, trabajo.filtros)
+
+
+def _contenido(trabajo: TrabajoExportacion):
+    queryset = _solicitudes(trabajo)
+    if trabajo.formato == "pdf":
+        return documento_reporte(resumen_reporte(queryset)).bloques()
+    return filas_csv(queryset)
+
+
+def generar(trabajo: TrabajoExportacion):
+    """Escribe el archivo del trabajo y lo marca como completado (o fallido)."""
+    nombre = f"{trabajo.pk}_{trabajo.clave[:16]}.{trabajo.formato}"
+    ruta = trabajo.archivo.storage.path(nombre)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+    try:
+        digesto = hashlib.sha256()
+        tamano = 0
+        # Se escribe a un temporal y se renombra: nunca se sirve un archivo a medias
+        with open(f"{ruta}.tmp", "wb") as archivo:
+            for bloque in _contenido(trabajo):
+                archivo.write(bloque)
+                digesto.update(bloque)
+                tamano += len(bloque)
+        os.replace(f"{ruta}.tmp", ruta)
+    except Exception as exc:
+        if os.path.exists(f"{ruta}.tmp"):
+            os.remove(f"{ruta}.tmp")
+        trabajo.estado = "fallido"
+        trabajo.error = str(exc)
+        trabajo.fecha_fin = timezone.now()
+        trabajo.save(update_fields=["estado", "error", "fecha_fin"])
+        raise
+
+    trabajo.archivo.name = nombre
+    trabajo.tamano = tamano
+    trabajo.etag = f'"{digesto.hexdigest()[:32]}"'
+    trabajo.estado = "completado"
+    trabajo.error = ""
+    trabajo.fecha_fin = timezone.now()
+    trabajo.save(
+        update_fields=["archivo", "tamano", "etag", "estado", "error", "fecha_fin"]
+    )
+
+
+def purgar_vencidos() -> int:
+    """Borra los archivos y registros de exportaciones que ya no se reutilizan."""
+    vencidos = TrabajoExportacion.objects.filter(
+        Q(estado="completado") | Q(estado="fallido"),
+        fecha_fin__lt=timezone.now() - VIGENCIA,
+    )
+    cantidad = 0
+    for trabajo in vencidos.iterator():
+        if trabajo.archivo and os.path.exists(trabajo.archivo.path):
+            os.remove(trabajo.archivo.path)
+        trabajo.delete()
+        cantidad += 1
+    return cantidad
@@ -1,5 +1,5 @@
-from django.db.models import Count, Avg, Q, F, ExpressionWrapper, DurationField
-from django.db.models.functions import TruncDate, TruncMonth
+from django.db.models import Count, Q, F
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 from datetime import timedelta
 from rest_framework import status
@@ -10,8 +10,14 @@ from rest_framework.permissions import IsAuthenticated
 from apps.solicitudes.models import Solicitud, Comentario
 from apps.funcionarios.models import Funcionario
 from apps.ciudadanos.models import Ciudadano
-from apps.dependecias_municipales.models import DependenciaMunicipal
 from apps.utils.permissions import IsAdmin
+from apps.analitica.cubo import filtros_dias
+from apps.analitica.estadisticas import AgregadoSolicitudes
+from apps.analitica.models import SolicitudDiaria
+from apps.analitica.tiempos import tiempos_resolucion_por_dependencia
+from apps.analitica.rendimiento import (
+    rendimiento_funcionarios as calcular_rendimiento,
+)
 
 
 @api_view(["GET"])
@@ -27,13 +33,12 @@ def analiticas_administrador(request):
     fecha_fin_str = request.query_params.get("fecha_fin")
 
     # Filtros de fecha
-    filtros_fecha = {}
+    fecha_inicio = fecha_fin = None
     if fecha_inicio_str:
         try:
             fecha_inicio = timezone.datetime.fromisoformat(
                 fecha_inicio_str.replace("Z", "+00:00")
             )
-            filtros_fecha["fecha_creacion__gte"] = fecha_inicio
         except:
             pass
 
@@ -42,169 +47,49 @@ def analiticas_administrador(request):
             fecha_fin = timezone.datetime.fromisoformat(
                 fecha_fin_str.replace("Z", "+00:00")
             )
-            filtros_fecha["fecha_creacion__lte"] = fecha_fin
         except:
             pass
 
+    # Mismos límites en días para las solicitudes y para el cubo diario
+    filtros_fecha, filtros_cubo = filtros_dias(fecha_inicio, fecha_fin)
+
     # Si no hay filtros, usar últimos 30 días
     if not filtros_fecha:
-        hace_30_dias = timezone.now() - timedelta(days=30)
-        filtros_fecha["fecha_creacion__gte"] = hace_30_dias
+        filtros_fecha, filtros_cubo = filtros_dias(timezone.now() - timedelta(days=30))
+
+    agregado = AgregadoSolicitudes(SolicitudDiaria.objects.filter(**filtros_cubo))
 
     # 1. MÉTRICAS GENERALES
-    total_solicitudes = Solicitud.objects.filter(**filtros_fecha).count()
+    total_solicitudes = agregado.total
     total_ciudadanos = Ciudadano.objects.count()
     total_funcionarios = Funcionario.objects.count()
 
-    solicitudes_por_estado = list(
-        Solicitud.objects.filter(**filtros_fecha)
-        .values("estado")
-        .annotate(total=Count("id"))
-        .order_by("-total")
-    )
+    solicitudes_por_estado = agregado.por_estado()
 
     # 2. RENDIMIENTO DE FUNCIONARIOS
     # Calcular solicitudes atendidas por funcionario (basado en comentarios)
-    rendimiento_funcionarios = []
-
-    for funcionario in Funcionario.objects.select_related("dependencia", "usuario"):
-        # Solicitudes de su dependencia
-        solicitudes_dependencia = Solicitud.objects.filter(
-            categoria__dependencia_municipal=funcionario.dependencia, **filtros_fecha
-        )
-
-        total_asignadas = solicitudes_dependencia.count()
-
-        # Comentarios creados por este funcionario
-        comentarios_funcionario = Comentario.objects.filter(
-            solicitud__categoria__dependencia_municipal=funcionario.dependencia,
-            creado_por=(
-                str(funcionario.usuario)
-                if funcionario.usuario
-                else funcionario.nombre_completo
-            ),
-            solicitud__in=solicitudes_dependencia,
-        ).count()
-
-        # Solicitudes completadas de su dependencia
-        completadas = solicitudes_dependencia.filter(estado="completada").count()
-
-        # Tiempo promedio de respuesta (primera interacción)
-        solicitudes_con_comentario = (
-            solicitudes_dependencia.filter(comentarios__isnull=False)
-            .annotate(
-                tiempo_primera_respuesta=ExpressionWrapper(
-                    F("comentarios__fecha_creacion") - F("fecha_creacion"),
-                    output_field=DurationField(),
-                )
-            )
-            .values_list("tiempo_primera_respuesta", flat=True)
-        )
-
-        tiempo_promedio_respuesta = None
-        if solicitudes_con_comentario:
-            tiempos = [
-                t.total_seconds() / 3600 for t in solicitudes_con_comentario if t
-            ]  # en horas
-            if tiempos:
-                tiempo_promedio_respuesta = round(sum(tiempos) / len(tiempos), 2)
-
-        tasa_resolucion = (
-            round((completadas / total_asignadas * 100), 2)
-            if total_asignadas > 0
-            else 0
-        )
-
-        rendimiento_funcionarios.append(
-            {
-                "id": funcionario.id,
-                "nombre": funcionario.nombre_completo,
-                "cargo": funcionario.cargo,
-                "dependencia": funcionario.dependencia.nombre,
-                "solicitudes_asignadas": total_asignadas,
-                "comentarios_realizados": comentarios_funcionario,
-                "solicitudes_completadas": completadas,
-                "tasa_resolucion": tasa_resolucion,
-                "tiempo_promedio_respuesta_horas": tiempo_promedio_respuesta,
-            }
-        )
-
-    # Ordenar por tasa de resolución
-    rendimiento_funcionarios.sort(key=lambda x: x["tasa_resolucion"], reverse=True)
-
-    # 3. SOLICITUDES POR LOCALIDAD
-    solicitudes_por_localidad = list(
-        Solicitud.objects.filter(**filtros_fecha)
-        .select_related("ciudadano__localidad")
-        .values(
-            localidad=F("ciudadano__localidad__colonia"),
-            codigo_postal=F("ciudadano__localidad__codigo_postal"),
-            municipio=F("ciudadano__localidad__municipio"),
-        )
-        .annotate(total_solicitudes=Count("id"))
-        .order_by("-total_solicitudes")[:20]  # Top 20
+    rendimiento_funcionarios = calcular_rendimiento(
+        Solicitud.objects.filter(**filtros_fecha), con_tiempos=True
     )
 
+    # 3. SOLICITUDES POR LOCALIDAD (Top 20)
+    solicitudes_por_localidad = agregado.por_localidad_detallada()
+
     # 4. SOLICITUDES POR DEPENDENCIA
-    solicitudes_por_dependencia = list(
-        Solicitud.objects.filter(**filtros_fecha)
-        .select_related("categoria__dependencia_municipal")
-        .values(
-            dependencia_id=F("categoria__dependencia_municipal__id"),
-            dependencia=F("categoria__dependencia_municipal__nombre"),
-        )
-        .annotate(
-            total=Count("id"),
-            completadas=Count("id", filter=Q(estado="completada")),
-            en_proceso=Count("id", filter=Q(estado__in=["enviada", "visto"])),
-            rechazadas=Count("id", filter=Q(estado="rechazada")),
-        )
-        .order_by("-total")
-    )
+    solicitudes_por_dependencia = agregado.por_dependencia()
 
     # 5. TENDENCIAS TEMPORALES (últimos 30 días)
-    tendencia_diaria = list(
-        Solicitud.objects.filter(**filtros_fecha)
-        .annotate(fecha=TruncDate("fecha_creacion"))
-        .values("fecha")
-        .annotate(total=Count("id"))
-        .order_by("fecha")
-    )
+    tendencia_diaria = agregado.tendencia_diaria()
 
     # 6. CATEGORÍAS MÁS SOLICITADAS
-    categorias_populares = list(
-        Solicitud.objects.filter(**filtros_fecha)
-        .values(categoria_id=F("categoria__id"), categoria=F("categoria__nombre"))
-        .annotate(total=Count("id"))
-        .order_by("-total")[:10]
+    categorias_populares = agregado.por_categoria(
+        claves={"categoria_id": "categoria_id", "categoria__nombre": "categoria"}
     )
 
     # 7. TIEMPO PROMEDIO DE RESOLUCIÓN POR DEPENDENCIA
-    tiempo_resolucion_dependencia = []
-    for dep in DependenciaMunicipal.objects.all():
-        solicitudes_completadas = Solicitud.objects.filter(
-            categoria__dependencia_municipal=dep, estado="completada", **filtros_fecha
-        )
-
-        if solicitudes_completadas.exists():
-            tiempos = []
-            for sol in solicitudes_completadas:
-                tiempo = (
-                    sol.fecha_actualizacion - sol.fecha_creacion
-                ).total_seconds() / 3600  # horas
-                tiempos.append(tiempo)
-
-            promedio = round(sum(tiempos) / len(tiempos), 2) if tiempos else 0
-
-            tiempo_resolucion_dependencia.append(
-                {
-                    "dependencia": dep.nombre,
-                    "tiempo_promedio_horas": promedio,
-                    "solicitudes_completadas": len(tiempos),
-                }
-            )
-
-    tiempo_resolucion_dependencia.sort(key=lambda x: x["tiempo_promedio_horas"])
+    tiempo_resolucion_dependencia = tiempos_resolucion_por_dependencia(
+        Solicitud.objects.filter(**filtros_fecha)
+    )
 
     # 8. ESTADÍSTICAS DE CIUDADANOS
     ciudadanos_por_sexo = list(
@@ -289,13 +174,12 @@ def rendimiento_funcionario_detalle(request, funcionario_id):
     en_proceso = solicitudes.filter(estado__in=["enviada", "visto"]).count()
     rechazadas = solicitudes.filter(estado="rechazada").count()
 
-    # Comentarios del funcionario
-    usuario_str = (
-        str(funcionario.usuario) if funcionario.usuario else funcionario.nombre_completo
-    )
+    # Comentarios del funcionario (índice por autor y fecha)
     comentarios = Comentario.objects.filter(
-        creado_por=usuario_str, solicitud__in=solicitudes
+        autor_id=funcionario.usuario_id, solicitud__in=solicitudes
     )
+    if funcionario.usuario_id is None:
+        comentarios = comentarios.none()
 
     total_comentarios = comentarios.count()
 
@@ -18,8 +18,12 @@ from .views.analitica_basica.funcionarios import (
     MapaCalorGeograficoView,
     AlertasSolicitudesView,
     ComparacionPeriodosView,
+    PercentilesTiemposView,
     ReportePDFView,
     ExportarSolicitudesView,
+    ExportacionesView,
+    ExportacionDetalleView,
+    DescargarExportacionView,
 )
 
 analitica_basica_patterns = [
@@ -64,6 +68,11 @@ analitica_basica_patterns = [
         ComparacionPeriodosView.as_view(),
         name="solicitudes-comparacion",
     ),
+    path(
+        "solicitudes-funcionarios/percentiles/",
+        PercentilesTiemposView.as_view(),
+        name="solicitudes-percentiles",
+    ),
     path(
         "solicitudes-funcionarios/reporte/pdf/",
         ReportePDFView.as_view(),
@@ -74,6 +83,21 @@ analitica_basica_patterns = [
         ExportarSolicitudesView.as_view(),
         name="solicitudes-exportar",
     ),
+    path(
+        "solicitudes-funcionarios/exportaciones/",
+        ExportacionesView.as_view(),
+        name="solicitudes-exportaciones",
+    ),
+    path(
+        "solicitudes-funcionarios/exportaciones/<int:pk>/",
+        ExportacionDetalleView.as_view(),
+        name="solicitudes-exportacion-detalle",
+    ),
+    path(
+        "solicitudes-funcionarios/exportaciones/<int:pk>/descargar/",
+        DescargarExportacionView.as_view(),
+        name="solicitudes-exportacion-descargar",
+    ),
 ]
 
 urlpatterns = [
@@ -1,9 +1,11 @@
 from django.urls import path
 from rest_framework import routers
 
-from apps.api.v1.views.notificaciones import NotificacionViewSet
+from apps.api.v1.views.notificaciones import NotificacionViewSet, stream_notificaciones
 
 router = routers.DefaultRouter()
 router.register(r"", NotificacionViewSet, basename="notificacion")
 
-urlpatterns = [] + router.urls
+urlpatterns = [
+    path("stream/", stream_notificaciones, name="notificaciones-stream"),
+] + router.urls
@@ -5,9 +5,9 @@ from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from datetime import timedelta
 from io import BytesIO
-from django.http import HttpResponse
 
 from apps.analitica.models import Sesion, PaginaVista
+from apps.utils.pdf import DocumentoPDF, respuesta_pdf
 from apps.analitica.serializers import (
     SesionStartSerializer,
     SesionEndSerializer,
@@ -184,6 +184,43 @@ class TopPagesView(APIView):
         return Response(list(qs))
 
 
+def _documento_analitica_web(datos: dict) -> DocumentoPDF:
+    documento = DocumentoPDF("Reporte Analítica Web")
+    if datos["start"] or datos["end"]:
+        documento.texto(f"Rango: {datos['start'] or '-'} a {datos['end'] or '-'}", 10)
+    documento.espacio(6)
+
+    resumen = datos["resumen"]
+    for label, val in [
+        ("Sesiones", resumen["sessions"]),
+        ("Visitantes únicos", resumen["visitors"]),
+        ("Pageviews", resumen["pageviews"]),
+        ("Bounce rate", f"{resumen['bounce_rate']}%"),
+        ("Duración media sesión (s)", resumen["avg_session"]),
+        ("Tiempo medio página (s)", resumen["avg_page"]),
+    ]:
+        documento.texto(f"{label}: {val}")
+
+    top_pages = datos["top_pages"]
+    if top_pages:
+        documento.espacio().titulo("Vistas por página", 12)
+        documento.grafica_barras(
+            [page["ruta"] or "sin-ruta" for page in top_pages[:15]],
+            [page["views"] for page in top_pages[:15]],
+        )
+
+    documento.espacio().titulo("Top páginas", 12)
+    documento.tabla(
+        ["#", "Ruta", "Vistas"],
+        [
+            [idx, page["ruta"] or "sin-ruta", page["views"]]
+            for idx, page in enumerate(top_pages, start=1)
+        ],
+        anchos=[30, 372, 110],
+    )
+    return documento
+
+
 class WebAnalyticsReportPDFView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -191,7 +228,7 @@ class WebAnalyticsReportPDFView(APIView):
         qp = request.query_params
         start = qp.get("start")
         end = qp.get("end")
-        limit = int(qp.get("limit", 10))
+        limit = min(int(qp.get("limit", 10)), 1000)
 
         qs_s = Sesion.objects.all()
         qs_pv = PaginaVista.objects.all()
@@ -223,96 +260,19 @@ class WebAnalyticsReportPDFView(APIView):
             qs_pv.values("ruta").annotate(views=Count("id")).order_by("-views")[:limit]
         )
 
-        def _safe(text: str) -> str:
-            cleaned = (text or "").replace("\\", "/")
-            return cleaned.replace("(", "[").replace(")", "]")
-
-        def _pdf_bytes():
-            y_cursor = 780
-            lines = []
-            lines.append(f"BT /F1 18 Tf 50 {y_cursor} Td (Reporte Analitica Web) Tj ET")
-            y_cursor -= 20
-            if start or end:
-                rango_txt = f"Rango: {start or '-'} a {end or '-'}"
-                lines.append(
-                    f"BT /F1 10 Tf 50 {y_cursor} Td ({_safe(rango_txt)}) Tj ET"
-                )
-                y_cursor -= 18
-
-            resumen_items = [
-                ("Sesiones", total_sessions),
-                ("Visitantes unicos", total_visitors),
-                ("Pageviews", total_pageviews),
-                ("Bounce rate", f"{round(bounce_rate*100,2)}%"),
-                ("Duracion media sesion (s)", round(avg_session, 2)),
-                ("Tiempo medio pagina (s)", round(avg_page, 2)),
-            ]
-            for label, val in resumen_items:
-                lines.append(
-                    f"BT /F1 11 Tf 50 {y_cursor} Td ({_safe(label)}: {val}) Tj ET"
-                )
-                y_cursor -= 16
-
-            lines.append(f"BT /F1 12 Tf 50 {y_cursor-8} Td (Top paginas) Tj ET")
-            y_cursor -= 26
-            lines.append(f"BT /F1 10 Tf 50 {y_cursor} Td (#) Tj ET")
-            lines.append(f"BT /F1 10 Tf 70 {y_cursor} Td (Ruta) Tj ET")
-            lines.append(f"BT /F1 10 Tf 450 {y_cursor} Td (Vistas) Tj ET")
-            y_cursor -= 14
-
-            idx = 1
-            for page in top_pages:
-                ruta = _safe(page["ruta"] or "sin-ruta")[:90]
-                lines.append(f"BT /F1 10 Tf 50 {y_cursor} Td ({idx}) Tj ET")
-                lines.append(f"BT /F1 10 Tf 70 {y_cursor} Td ({ruta}) Tj ET")
-                lines.append(f"BT /F1 10 Tf 450 {y_cursor} Td ({page['views']}) Tj ET")
-                y_cursor -= 12
-                idx += 1
-
-            stream_bytes = "\n".join(lines).encode("latin-1", errors="replace")
-
-            # Build PDF objects
-            objects = []
-            # 1 Catalog
-            objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
-            # 2 Pages
-            objects.append(b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>")
-            # 3 Page
-            objects.append(
-                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>"
-            )
-            # 4 Contents
-            objects.append(
-                b"<< /Length %d >>\nstream\n" % len(stream_bytes)
-                + stream_bytes
-                + b"\nendstream"
-            )
-            # 5 Font
-            objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
-
-            buf = bytearray()
-            buf.extend(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
-            offsets = []
-            for i, obj in enumerate(objects, start=1):
-                offsets.append(len(buf))
-                buf.extend(f"{i} 0 obj\n".encode("ascii"))
-                buf.extend(obj)
-                buf.extend(b"\nendobj\n")
-
-            startxref = len(buf)
-            size = len(objects) + 1
-            buf.extend(b"xref\n")
-            buf.extend(f"0 {size}\n".encode("ascii"))
-            buf.extend(b"0000000000 65535 f \n")
-            for off in offsets:
-                buf.extend(f"{off:010} 00000 n \n".encode("ascii"))
-            buf.extend(f"trailer << /Size {size} /Root 1 0 R >>\n".encode("ascii"))
-            buf.extend(b"startxref\n")
-            buf.extend(f"{startxref}\n".encode("ascii"))
-            buf.extend(b"%%EOF\n")
-            return bytes(buf)
-
-        pdf_bytes = _pdf_bytes()
-        response = HttpResponse(pdf_bytes, content_type="application/pdf")
-        response["Content-Disposition"] = 'attachment; filename="analitica_web.pdf"'
-        return response
+        datos = {
+            "start": start,
+            "end": end,
+            "resumen": {
+                "sessions": total_sessions,
+                "visitors": total_visitors,
+                "pageviews": total_pageviews,
+                "bounce_rate": round(bounce_rate * 100, 2),
+                "avg_session": round(avg_session, 2),
+                "avg_page": round(avg_page, 2),
+            },
+            "top_pages": top_pages,
+        }
+        return respuesta_pdf(
+            request, _documento_analitica_web, datos, "analitica_web.pdf"
+        )
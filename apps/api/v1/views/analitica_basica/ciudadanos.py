@@ -1,9 +1,9 @@
-from django.db.models import Count, Q
 from rest_framework import views, permissions
 
+from apps.autenticacion.alcance import ciudadano_id_de
 from apps.autenticacion.models import Usuario
 from apps.utils.permissions import IsCiudadano
-from apps.solicitudes.models import Solicitud
+from apps.solicitudes.contadores import totales_ciudadano
 
 
 class SolicitudesCiudadanosView(views.APIView):
@@ -14,12 +14,13 @@ class SolicitudesCiudadanosView(views.APIView):
 
         user: Usuario = request.user
 
-        queryset = Solicitud.objects.filter(ciudadano=user.ciudadano)
+        ciudadano_id = ciudadano_id_de(user)
+        totales = totales_ciudadano(ciudadano_id) if ciudadano_id else {}
 
-        data = queryset.aggregate(
-            realizadas=Count('id'),
-            aprobadas=Count('id', filter=Q(estado='completada')),
-            rechazadas=Count('id', filter=Q(estado='rechazada')),
-        )
+        data = {
+            'realizadas': sum(totales.values()),
+            'aprobadas': totales.get('completada', 0),
+            'rechazadas': totales.get('rechazada', 0),
+        }
 
         return views.Response(data)
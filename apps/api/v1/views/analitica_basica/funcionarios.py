@@ -1,36 +1,105 @@
-from datetime import timedelta
-import csv
-from django.db.models import (
-    Count,
-    Q,
-    Avg,
-    F,
-    ExpressionWrapper,
-    DurationField,
-    Max,
-    Min,
-)
-from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from datetime import date, timedelta
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from django.http import HttpResponse
 from rest_framework import views, permissions, status
 from rest_framework.response import Response
 
+from apps.autenticacion.alcance import dependencia_id_de, filtrar_por_dependencia
+from apps.analitica.cache import alcance_de, cache_analitica
+from apps.analitica.cubo import a_dia, filtros_dias, sumas_por_estado
+from apps.analitica.estadisticas import AgregadoSolicitudes
+from apps.analitica.exportacion import (
+    aplicar_filtros,
+    documento_reporte,
+    filtros_de,
+    respuesta_csv,
+    resumen_reporte,
+)
+from apps.analitica.paquetes import (
+    archivo_paquete,
+    paquete_vigente,
+    periodo_de,
+    solicitudes_del_periodo,
+)
+from apps.analitica.models import SolicitudDiaria, TiempoDiario, TrabajoExportacion
+from apps.analitica.serializers import TrabajoExportacionSerializer
+from apps.analitica.trabajos import TIPOS_CONTENIDO, solicitar_exportacion
+from apps.analitica.series import serie_temporal
+from apps.analitica.periodos import comparar_periodos, diferencia, ultimos_meses
+from apps.analitica.tiempos import (
+    percentiles_tiempos,
+    tiempos_resolucion_por_dependencia,
+)
+from apps.analitica.rendimiento import (
+    rendimiento_funcionarios as calcular_rendimiento,
+)
 from apps.autenticacion.models import Usuario
+from apps.utils.descargas import respuesta_archivo
+from apps.utils.pdf import respuesta_pdf
 from apps.utils.permissions import IsAdminOrFuncionario
+from apps.solicitudes.contadores import totales_dependencia
 from apps.solicitudes.models import Solicitud
 from apps.funcionarios.models import Funcionario
 
 
 def _solicitudes_para_usuario(user: Usuario):
     """Devuelve el queryset base según rol. Admin ve todo, funcionario su dependencia."""
+    return filtrar_por_dependencia(Solicitud.objects.all(), user)
+
+
+def _cubo_para_usuario(user: Usuario):
+    """Filas del cubo diario visibles para el usuario."""
+    return filtrar_por_dependencia(
+        SolicitudDiaria.objects.all(), user, campo="dependencia_id"
+    )
+
+
+def _periodo_solicitado(query_params) -> tuple[str, date, date] | None:
+    """
+    ``(tipo, inicio, fin)`` de ``?periodo=mes|semana&inicio=YYYY-MM-DD``, o
+    ``None`` si no se pidió periodo. Lanza ``ValueError`` si es inválido.
+    """
+    tipo = query_params.get("periodo")
+    if not tipo:
+        return None
+    inicio = query_params.get("inicio")
+    dia = a_dia(inicio) if inicio else None
+    if inicio and dia is None:
+        raise ValueError("Fecha de inicio inválida, use YYYY-MM-DD")
+    return (tipo, *periodo_de(tipo, dia))
+
+
+def _dia_parametro(query_params, nombre: str) -> date | None:
+    """
+    Día del parámetro ``nombre`` o ``None`` si no viene. Lanza ``ValueError``
+    si viene pero no es una fecha válida.
+    """
+    valor = query_params.get(nombre)
+    dia = a_dia(valor) if valor else None
+    if valor and dia is None:
+        raise ValueError(f"Fecha inválida en '{nombre}', use YYYY-MM-DD")
+    return dia
+
+
+def _paquete_para_usuario(user: Usuario, tipo: str, inicio: date, fin: date):
+    """Manifiesto del paquete pre-generado vigente del alcance del usuario."""
     if getattr(user, "rol", None) == "admin":
-        return Solicitud.objects.all()
-    if getattr(user, "funcionario", None):
-        return Solicitud.objects.filter(
-            categoria__dependencia_municipal=user.funcionario.dependencia
-        )
-    return Solicitud.objects.none()
+        return paquete_vigente(None, tipo, inicio, fin)
+    dependencia_id = dependencia_id_de(user)
+    if dependencia_id is None:
+        return None
+    return paquete_vigente(dependencia_id, tipo, inicio, fin)
+
+
+def _totales_para_usuario(user: Usuario) -> dict[str, int]:
+    """Totales por estado desde los contadores materializados, según rol."""
+    if getattr(user, "rol", None) == "admin":
+        return totales_dependencia(None)
+    dependencia_id = dependencia_id_de(user)
+    if dependencia_id is None:
+        return {}
+    return totales_dependencia(dependencia_id)
 
 
 class SolicitudAnaliticaView(views.APIView):
@@ -40,16 +109,17 @@ class SolicitudAnaliticaView(views.APIView):
 
     permission_classes = (permissions.IsAuthenticated, IsAdminOrFuncionario)
 
+    @cache_analitica("resumen", ttl=60)
     def get(self, request: views.Request, *args, **kwargs):
         user: Usuario = request.user
 
-        queryset = _solicitudes_para_usuario(user)
+        totales = _totales_para_usuario(user)
 
-        data = queryset.aggregate(
-            realizadas=Count("id"),
-            aprobadas=Count("id", filter=Q(estado="completada")),
-            rechazadas=Count("id", filter=Q(estado="rechazada")),
-        )
+        data = {
+            "realizadas": sum(totales.values()),
+            "aprobadas": totales.get("completada", 0),
+            "rechazadas": totales.get("rechazada", 0),
+        }
 
         return Response(data)
 
@@ -62,6 +132,7 @@ class EstadisticasCompletasView(views.APIView):
 
     permission_classes = (permissions.IsAuthenticated, IsAdminOrFuncionario)
 
+    @cache_analitica("estadisticas-completas", ttl=300)
     def get(self, request: views.Request, *args, **kwargs):
         user: Usuario = request.user
 
@@ -72,188 +143,45 @@ class EstadisticasCompletasView(views.APIView):
         categoria_id = request.query_params.get("categoria")
 
         queryset = _solicitudes_para_usuario(user)
+        cubo = _cubo_para_usuario(user)
 
-        # Aplicar filtros
-        if fecha_inicio:
-            queryset = queryset.filter(fecha_creacion__gte=fecha_inicio)
-        if fecha_fin:
-            queryset = queryset.filter(fecha_creacion__lte=fecha_fin)
+        # Aplicar filtros (mismos días en solicitudes y cubo)
+        filtros_fecha, filtros_cubo = filtros_dias(fecha_inicio, fecha_fin)
+        queryset = queryset.filter(**filtros_fecha)
+        cubo = cubo.filter(**filtros_cubo)
         if estado:
             queryset = queryset.filter(estado=estado)
+            cubo = cubo.filter(estado=estado)
         if categoria_id:
             queryset = queryset.filter(categoria_id=categoria_id)
+            cubo = cubo.filter(categoria_id=categoria_id)
 
-        # Calcular tiempo promedio de respuesta (de creación a actualización)
-        solicitudes_con_tiempo = queryset.exclude(
-            fecha_actualizacion=F("fecha_creacion")
-        ).annotate(
-            tiempo_respuesta=ExpressionWrapper(
-                F("fecha_actualizacion") - F("fecha_creacion"),
-                output_field=DurationField(),
-            )
-        )
-
-        tiempo_promedio = solicitudes_con_tiempo.aggregate(
-            promedio=Avg("tiempo_respuesta")
-        )
-
-        # Convertir tiempo promedio a horas
-        tiempo_promedio_horas = None
-        if tiempo_promedio["promedio"]:
-            tiempo_promedio_horas = tiempo_promedio["promedio"].total_seconds() / 3600
-
-        # Solicitudes por estado
-        por_estado = (
-            queryset.values("estado").annotate(total=Count("id")).order_by("-total")
-        )
-
-        # Solicitudes por categoría
-        por_categoria = (
-            queryset.values("categoria__nombre", "categoria_id")
-            .annotate(total=Count("id"))
-            .order_by("-total")[:10]
-        )
-
-        # Solicitudes por localidad (si el ciudadano tiene localidad)
-        por_localidad = (
-            queryset.exclude(ciudadano__localidad__isnull=True)
-            .values("ciudadano__localidad__colonia", "ciudadano__localidad_id")
-            .annotate(total=Count("id"))
-            .order_by("-total")[:10]
-        )
-
-        # Tendencia mensual
-        tendencia_mensual = (
-            queryset.annotate(mes=TruncMonth("fecha_creacion"))
-            .values("mes")
-            .annotate(total=Count("id"))
-            .order_by("mes")
-        )
+        # Una sola lectura del cubo filtrado; todos los desgloses salen de ella
+        agregado = AgregadoSolicitudes(cubo)
 
         data = {
-            "resumen": {
-                "total_solicitudes": queryset.count(),
-                "completadas": queryset.filter(estado="completada").count(),
-                "rechazadas": queryset.filter(estado="rechazada").count(),
-                "enviadas": queryset.filter(estado="enviada").count(),
-                "vistas": queryset.filter(estado="visto").count(),
-                "tiempo_promedio_respuesta_horas": (
-                    round(tiempo_promedio_horas, 2) if tiempo_promedio_horas else None
-                ),
-            },
-            "por_estado": list(por_estado),
-            "por_categoria": list(por_categoria),
-            "por_localidad": list(por_localidad),
-            "tendencia_mensual": list(tendencia_mensual),
+            "resumen": agregado.resumen(),
+            "por_estado": agregado.por_estado(),
+            "por_categoria": agregado.por_categoria(),
+            "por_localidad": agregado.por_localidad(),
+            "tendencia_mensual": agregado.tendencia_mensual(),
         }
 
         # Si es admin, agregar analíticas avanzadas
         if getattr(user, "rol", None) == "admin":
-            from apps.dependecias_municipales.models import DependenciaMunicipal
             from apps.ciudadanos.models import Ciudadano
-            from apps.solicitudes.models import Comentario
-
-            # Rendimiento de funcionarios
-            rendimiento_funcionarios = []
-            for funcionario in Funcionario.objects.select_related(
-                "dependencia", "usuario"
-            ):
-                solicitudes_dependencia = queryset.filter(
-                    categoria__dependencia_municipal=funcionario.dependencia
-                )
-
-                total_asignadas = solicitudes_dependencia.count()
-                if total_asignadas == 0:
-                    continue
-
-                comentarios_funcionario = Comentario.objects.filter(
-                    solicitud__in=solicitudes_dependencia,
-                    creado_por=(
-                        str(funcionario.usuario)
-                        if funcionario.usuario
-                        else funcionario.nombre_completo
-                    ),
-                ).count()
-
-                completadas = solicitudes_dependencia.filter(
-                    estado="completada"
-                ).count()
-                tasa_resolucion = (
-                    round((completadas / total_asignadas * 100), 2)
-                    if total_asignadas > 0
-                    else 0
-                )
 
-                rendimiento_funcionarios.append(
-                    {
-                        "id": funcionario.id,
-                        "nombre": funcionario.nombre_completo,
-                        "cargo": funcionario.cargo,
-                        "dependencia": funcionario.dependencia.nombre,
-                        "solicitudes_asignadas": total_asignadas,
-                        "comentarios_realizados": comentarios_funcionario,
-                        "solicitudes_completadas": completadas,
-                        "tasa_resolucion": tasa_resolucion,
-                    }
-                )
-
-            rendimiento_funcionarios.sort(
-                key=lambda x: x["tasa_resolucion"], reverse=True
+            # Rendimiento de funcionarios (consultas agrupadas por dependencia)
+            rendimiento_funcionarios = calcular_rendimiento(
+                queryset, omitir_sin_solicitudes=True
             )
 
-            # Solicitudes por localidad detallada (Top 20)
-            solicitudes_por_localidad_detallada = list(
-                queryset.exclude(ciudadano__localidad__isnull=True)
-                .values(
-                    localidad=F("ciudadano__localidad__colonia"),
-                    codigo_postal=F("ciudadano__localidad__codigo_postal"),
-                    municipio=F("ciudadano__localidad__municipio"),
-                )
-                .annotate(total_solicitudes=Count("id"))
-                .order_by("-total_solicitudes")[:20]
-            )
-
-            # Solicitudes por dependencia
-            solicitudes_por_dependencia = list(
-                queryset.values(
-                    dependencia_id=F("categoria__dependencia_municipal__id"),
-                    dependencia=F("categoria__dependencia_municipal__nombre"),
-                )
-                .annotate(
-                    total=Count("id"),
-                    completadas=Count("id", filter=Q(estado="completada")),
-                    en_proceso=Count("id", filter=Q(estado__in=["enviada", "visto"])),
-                    rechazadas=Count("id", filter=Q(estado="rechazada")),
-                )
-                .order_by("-total")
-            )
+            # Solicitudes por localidad detallada (Top 20) y por dependencia
+            solicitudes_por_localidad_detallada = agregado.por_localidad_detallada()
+            solicitudes_por_dependencia = agregado.por_dependencia()
 
             # Tiempo de resolución por dependencia
-            tiempo_resolucion_dependencia = []
-            for dep in DependenciaMunicipal.objects.all():
-                solicitudes_completadas = queryset.filter(
-                    categoria__dependencia_municipal=dep, estado="completada"
-                )
-
-                if solicitudes_completadas.exists():
-                    tiempos = []
-                    for sol in solicitudes_completadas:
-                        tiempo = (
-                            sol.fecha_actualizacion - sol.fecha_creacion
-                        ).total_seconds() / 3600
-                        tiempos.append(tiempo)
-
-                    promedio = round(sum(tiempos) / len(tiempos), 2) if tiempos else 0
-
-                    tiempo_resolucion_dependencia.append(
-                        {
-                            "dependencia": dep.nombre,
-                            "tiempo_promedio_horas": promedio,
-                            "solicitudes_completadas": len(tiempos),
-                        }
-                    )
-
-            tiempo_resolucion_dependencia.sort(key=lambda x: x["tiempo_promedio_horas"])
+            tiempo_resolucion_dependencia = tiempos_resolucion_por_dependencia(queryset)
 
             # Ciudadanos activos y por sexo
             ciudadanos_activos = (
@@ -289,54 +217,27 @@ class SolicitudesPorPeriodoView(views.APIView):
 
     permission_classes = (permissions.IsAuthenticated, IsAdminOrFuncionario)
 
+    @cache_analitica("periodo", ttl=300)
     def get(self, request: views.Request, *args, **kwargs):
         user: Usuario = request.user
         periodo = request.query_params.get("periodo", "dia")  # dia, semana, mes
 
-        queryset = _solicitudes_para_usuario(user)
-
-        # Agrupar según periodo
-        if periodo == "dia":
-            agrupado = (
-                queryset.annotate(fecha=TruncDate("fecha_creacion"))
-                .values("fecha")
-                .annotate(
-                    total=Count("id"),
-                    completadas=Count("id", filter=Q(estado="completada")),
-                    rechazadas=Count("id", filter=Q(estado="rechazada")),
-                    enviadas=Count("id", filter=Q(estado="enviada")),
-                    vistas=Count("id", filter=Q(estado="visto")),
-                )
-                .order_by("-fecha")[:30]
-            )
-        elif periodo == "semana":
-            agrupado = (
-                queryset.annotate(fecha=TruncWeek("fecha_creacion"))
-                .values("fecha")
-                .annotate(
-                    total=Count("id"),
-                    completadas=Count("id", filter=Q(estado="completada")),
-                    rechazadas=Count("id", filter=Q(estado="rechazada")),
-                    enviadas=Count("id", filter=Q(estado="enviada")),
-                    vistas=Count("id", filter=Q(estado="visto")),
-                )
-                .order_by("-fecha")[:12]
-            )
-        else:  # mes
-            agrupado = (
-                queryset.annotate(fecha=TruncMonth("fecha_creacion"))
-                .values("fecha")
-                .annotate(
-                    total=Count("id"),
-                    completadas=Count("id", filter=Q(estado="completada")),
-                    rechazadas=Count("id", filter=Q(estado="rechazada")),
-                    enviadas=Count("id", filter=Q(estado="enviada")),
-                    vistas=Count("id", filter=Q(estado="visto")),
-                )
-                .order_by("-fecha")[:12]
+        try:
+            tamano = int(request.query_params.get("tamano", 1))
+            ventana = request.query_params.get("ventana")
+            serie = serie_temporal(
+                _cubo_para_usuario(user),
+                periodo=periodo if periodo in ("dia", "semana", "mes") else "mes",
+                inicio=_dia_parametro(request.query_params, "desde"),
+                fin=_dia_parametro(request.query_params, "hasta"),
+                tamano=tamano,
+                ventana=int(ventana) if ventana else None,
             )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({"periodo": periodo, "datos": list(agrupado)})
+        # Del periodo más reciente al más antiguo, como antes
+        return Response({"periodo": periodo, "datos": serie[::-1]})
 
 
 class RankingFuncionariosView(views.APIView):
@@ -346,6 +247,7 @@ class RankingFuncionariosView(views.APIView):
 
     permission_classes = (permissions.IsAuthenticated, IsAdminOrFuncionario)
 
+    @cache_analitica("ranking", ttl=600)
     def get(self, request: views.Request, *args, **kwargs):
         user: Usuario = request.user
 
@@ -354,37 +256,24 @@ class RankingFuncionariosView(views.APIView):
             funcionarios = Funcionario.objects.all()
         else:
             funcionarios = Funcionario.objects.filter(
-                dependencia=user.funcionario.dependencia
-            )
-
-        # Por ahora, ranking por número de solicitudes en su dependencia
-        # En el futuro se puede mejorar con solicitudes atendidas directamente
-        ranking_data = []
-
-        for funcionario in funcionarios:
-            solicitudes_dependencia = Solicitud.objects.filter(
-                categoria__dependencia_municipal=funcionario.dependencia
+                dependencia_id=dependencia_id_de(user)
             )
 
-            total = solicitudes_dependencia.count()
-            completadas = solicitudes_dependencia.filter(estado="completada").count()
-
-            tasa_completadas = (completadas / total * 100) if total > 0 else 0
-
-            ranking_data.append(
-                {
-                    "id": funcionario.id,
-                    "nombre": funcionario.nombre_completo,
-                    "cargo": funcionario.cargo,
-                    "dependencia": funcionario.dependencia.nombre,
-                    "total_solicitudes": total,
-                    "completadas": completadas,
-                    "tasa_completadas": round(tasa_completadas, 2),
-                }
+        # Ranking por solicitudes de su dependencia, calculado por dependencia
+        ranking_data = [
+            {
+                "id": fila["id"],
+                "nombre": fila["nombre"],
+                "cargo": fila["cargo"],
+                "dependencia": fila["dependencia"],
+                "total_solicitudes": fila["solicitudes_asignadas"],
+                "completadas": fila["solicitudes_completadas"],
+                "tasa_completadas": fila["tasa_resolucion"],
+            }
+            for fila in calcular_rendimiento(
+                Solicitud.objects.all(), funcionarios, con_comentarios=False
             )
-
-        # Ordenar por tasa de completadas
-        ranking_data.sort(key=lambda x: x["tasa_completadas"], reverse=True)
+        ]
 
         return Response({"ranking": ranking_data})
 
@@ -396,26 +285,38 @@ class MapaCalorGeograficoView(views.APIView):
 
     permission_classes = (permissions.IsAuthenticated, IsAdminOrFuncionario)
 
+    @cache_analitica("mapa-calor", ttl=600)
     def get(self, request: views.Request, *args, **kwargs):
         user: Usuario = request.user
 
-        queryset = _solicitudes_para_usuario(user).exclude(
-            ciudadano__localidad__isnull=True
-        )
-
-        # Agrupar por localidad
+        # Agrupar por localidad sobre el cubo diario
+        sumas = sumas_por_estado()
         mapa_data = (
-            queryset.values("ciudadano__localidad__colonia", "ciudadano__localidad_id")
+            _cubo_para_usuario(user)
+            .values("localidad__colonia", "localidad_id")
             .annotate(
-                total=Count("id"),
-                completadas=Count("id", filter=Q(estado="completada")),
-                rechazadas=Count("id", filter=Q(estado="rechazada")),
-                pendientes=Count("id", filter=Q(estado__in=["enviada", "visto"])),
+                total=sumas["total"],
+                completadas=sumas["completadas"],
+                rechazadas=sumas["rechazadas"],
+                pendientes=Coalesce(
+                    Sum("cantidad", filter=Q(estado__in=["enviada", "visto"])), 0
+                ),
             )
             .order_by("-total")
         )
 
-        return Response({"localidades": list(mapa_data)})
+        return Response(
+            {
+                "localidades": [
+                    {
+                        "ciudadano__localidad__colonia": fila.pop("localidad__colonia"),
+                        "ciudadano__localidad_id": fila.pop("localidad_id"),
+                        **fila,
+                    }
+                    for fila in mapa_data
+                ]
+            }
+        )
 
 
 class AlertasSolicitudesView(views.APIView):
@@ -425,6 +326,7 @@ class AlertasSolicitudesView(views.APIView):
 
     permission_classes = (permissions.IsAuthenticated, IsAdminOrFuncionario)
 
+    @cache_analitica("alertas", ttl=60)
     def get(self, request: views.Request, *args, **kwargs):
         user: Usuario = request.user
 
@@ -472,20 +374,23 @@ class AlertasSolicitudesView(views.APIView):
             {
                 "solicitudes_antiguas": antiguas_data,
                 "solicitudes_recientes": recientes_data,
-                "total_pendientes": queryset.filter(
-                    estado__in=["enviada", "visto"]
-                ).count(),
+                "total_pendientes": sum(
+                    total
+                    for estado, total in _totales_para_usuario(user).items()
+                    if estado in ("enviada", "visto")
+                ),
             }
         )
 
 
 class ComparacionPeriodosView(views.APIView):
     """
-    Comparación de solicitudes entre dos periodos
+    Comparación de solicitudes entre dos periodos, o entre los últimos N meses
     """
 
     permission_classes = (permissions.IsAuthenticated, IsAdminOrFuncionario)
 
+    @cache_analitica("comparacion", ttl=300)
     def get(self, request: views.Request, *args, **kwargs):
         user: Usuario = request.user
 
@@ -495,76 +400,70 @@ class ComparacionPeriodosView(views.APIView):
         periodo2_inicio = request.query_params.get("periodo2_inicio")
         periodo2_fin = request.query_params.get("periodo2_fin")
 
-        if not all([periodo1_inicio, periodo1_fin, periodo2_inicio, periodo2_fin]):
-            # Por defecto: comparar este mes vs mes anterior
-            hoy = timezone.now()
-            periodo2_fin = hoy
-            periodo2_inicio = hoy.replace(day=1)
-
-            # Mes anterior
-            if periodo2_inicio.month == 1:
-                periodo1_fin = periodo2_inicio.replace(
-                    year=periodo2_inicio.year - 1, month=12
+        if all([periodo1_inicio, periodo1_fin, periodo2_inicio, periodo2_fin]):
+            periodos = [
+                (a_dia(periodo1_inicio), a_dia(periodo1_fin)),
+                (a_dia(periodo2_inicio), a_dia(periodo2_fin)),
+            ]
+            if None in periodos[0] or None in periodos[1]:
+                return Response(
+                    {"detail": "Fechas de periodo inválidas"},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
-            else:
-                periodo1_fin = periodo2_inicio.replace(month=periodo2_inicio.month - 1)
+        else:
+            # Por defecto: este mes (hasta hoy) contra los meses anteriores completos
+            try:
+                meses = min(max(int(request.query_params.get("meses", 2)), 2), 24)
+            except ValueError:
+                meses = 2
+            periodos = ultimos_meses(meses)
 
-            periodo1_inicio = periodo1_fin.replace(day=1)
+        # Una sola consulta para todos los periodos
+        resultados = comparar_periodos(_cubo_para_usuario(user), periodos)
+        periodo1, periodo2 = resultados[-2], resultados[-1]
 
-        queryset = _solicitudes_para_usuario(user)
+        data = {
+            "periodo1": periodo1,
+            "periodo2": periodo2,
+            "diferencia": diferencia(
+                periodo1["estadisticas"], periodo2["estadisticas"]
+            ),
+        }
+        if len(resultados) > 2:
+            data["periodos"] = resultados
+        return Response(data)
 
-        # Estadísticas periodo 1
-        periodo1_queryset = queryset.filter(
-            fecha_creacion__gte=periodo1_inicio, fecha_creacion__lte=periodo1_fin
-        )
 
-        stats_periodo1 = periodo1_queryset.aggregate(
-            total=Count("id"),
-            completadas=Count("id", filter=Q(estado="completada")),
-            rechazadas=Count("id", filter=Q(estado="rechazada")),
-            enviadas=Count("id", filter=Q(estado="enviada")),
-            vistas=Count("id", filter=Q(estado="visto")),
-        )
+class PercentilesTiemposView(views.APIView):
+    """
+    Percentiles (p50/p90/p99) de primera respuesta y resolución por dependencia
+    o por categoría, a partir de los digestos diarios
+    """
 
-        # Estadísticas periodo 2
-        periodo2_queryset = queryset.filter(
-            fecha_creacion__gte=periodo2_inicio, fecha_creacion__lte=periodo2_fin
-        )
+    permission_classes = (permissions.IsAuthenticated, IsAdminOrFuncionario)
 
-        stats_periodo2 = periodo2_queryset.aggregate(
-            total=Count("id"),
-            completadas=Count("id", filter=Q(estado="completada")),
-            rechazadas=Count("id", filter=Q(estado="rechazada")),
-            enviadas=Count("id", filter=Q(estado="enviada")),
-            vistas=Count("id", filter=Q(estado="visto")),
-        )
+    @cache_analitica("percentiles", ttl=600)
+    def get(self, request: views.Request, *args, **kwargs):
+        user: Usuario = request.user
 
-        # Calcular diferencias
-        diferencia = {}
-        for key in stats_periodo1.keys():
-            valor1 = stats_periodo1[key] or 0
-            valor2 = stats_periodo2[key] or 0
-            diferencia[key] = valor2 - valor1
-            if valor1 > 0:
-                diferencia[f"{key}_porcentaje"] = round(
-                    (valor2 - valor1) / valor1 * 100, 2
-                )
-            else:
-                diferencia[f"{key}_porcentaje"] = 0
+        try:
+            hasta = _dia_parametro(request.query_params, "hasta") or timezone.localdate()
+            desde = _dia_parametro(request.query_params, "desde") or hasta - timedelta(days=29)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        por_categoria = request.query_params.get("agrupar") == "categoria"
+
+        tiempos = filtrar_por_dependencia(
+            TiempoDiario.objects.filter(dia__range=(desde, hasta)),
+            user,
+            campo="dependencia_id",
+        )
 
         return Response(
             {
-                "periodo1": {
-                    "inicio": periodo1_inicio,
-                    "fin": periodo1_fin,
-                    "estadisticas": stats_periodo1,
-                },
-                "periodo2": {
-                    "inicio": periodo2_inicio,
-                    "fin": periodo2_fin,
-                    "estadisticas": stats_periodo2,
-                },
-                "diferencia": diferencia,
+                "desde": desde,
+                "hasta": hasta,
+                "percentiles": percentiles_tiempos(tiempos, por_categoria),
             }
         )
 
@@ -576,64 +475,6 @@ class ReportePDFView(views.APIView):
 
     permission_classes = (permissions.IsAuthenticated, IsAdminOrFuncionario)
 
-    def _build_pdf_bytes(
-        self, total: int, completadas: int, rechazadas: int, pendientes: int
-    ) -> bytes:
-        """Genera un PDF minimalista sin dependencias externas."""
-        resumen = [
-            ("Total", total),
-            ("Completadas", completadas),
-            ("Rechazadas", rechazadas),
-            ("Pendientes", pendientes),
-        ]
-
-        stream_lines = [
-            "BT /F1 14 Tf 72 740 Td (Reporte Analitica de Solicitudes) Tj ET",
-        ]
-
-        y = 710
-        for label, valor in resumen:
-            stream_lines.append(f"BT /F1 12 Tf 72 {y} Td ({label}: {valor}) Tj ET")
-            y -= 20
-
-        stream_bytes = "\n".join(stream_lines).encode("latin-1", errors="replace")
-
-        objects = [
-            b"<< /Type /Catalog /Pages 2 0 R >>",
-            b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
-            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 6 0 R >> >> /Contents 4 0 R >>",
-            b"<< /Length %d >>\nstream\n" % len(stream_bytes)
-            + stream_bytes
-            + b"\nendstream",
-            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
-        ]
-
-        buffer = bytearray()
-        buffer.extend(b"%PDF-1.4\n")
-        offsets = []
-
-        for index, obj in enumerate(objects, start=1):
-            offsets.append(len(buffer))
-            buffer.extend(f"{index} 0 obj\n".encode("ascii"))
-            buffer.extend(obj)
-            buffer.extend(b"\nendobj\n")
-
-        startxref = len(buffer)
-        size = len(objects) + 1
-
-        buffer.extend(b"xref\n")
-        buffer.extend(f"0 {size}\n".encode("ascii"))
-        buffer.extend(b"0000000000 65535 f \n")
-        for offset in offsets:
-            buffer.extend(f"{offset:010} 00000 n \n".encode("ascii"))
-
-        buffer.extend(f"trailer << /Size {size} /Root 1 0 R >>\n".encode("ascii"))
-        buffer.extend(b"startxref\n")
-        buffer.extend(f"{startxref}\n".encode("ascii"))
-        buffer.extend(b"%%EOF\n")
-
-        return bytes(buffer)
-
     def get(self, request: views.Request, *args, **kwargs):
         user: Usuario = request.user
         if getattr(user, "rol", None) != "admin":
@@ -641,20 +482,26 @@ class ReportePDFView(views.APIView):
                 {"detail": "Solo administradores"}, status=status.HTTP_403_FORBIDDEN
             )
 
-        queryset = Solicitud.objects.filter(
-            categoria__dependencia_municipal=user.funcionario.dependencia
-        )
-
-        total = queryset.count()
-        completadas = queryset.filter(estado="completada").count()
-        rechazadas = queryset.filter(estado="rechazada").count()
-        pendientes = queryset.filter(estado__in=["enviada", "visto"]).count()
+        try:
+            periodo = _periodo_solicitado(request.query_params)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-        pdf_bytes = self._build_pdf_bytes(total, completadas, rechazadas, pendientes)
+        queryset = _solicitudes_para_usuario(user)
+        nombre = "reporte_analitica.pdf"
+        if periodo:
+            _, inicio, fin = periodo
+            nombre = f"reporte_analitica_{inicio:%Y%m%d}_{fin:%Y%m%d}.pdf"
+            manifiesto = _paquete_para_usuario(user, *periodo)
+            if manifiesto:
+                return respuesta_archivo(
+                    request, *archivo_paquete(manifiesto, "pdf"), nombre
+                )
+            queryset = solicitudes_del_periodo(queryset, inicio, fin)
 
-        response = HttpResponse(pdf_bytes, content_type="application/pdf")
-        response["Content-Disposition"] = 'attachment; filename="reporte_analitica.pdf"'
-        return response
+        return respuesta_pdf(
+            request, documento_reporte, resumen_reporte(queryset), nombre
+        )
 
 
 class ExportarSolicitudesView(views.APIView):
@@ -667,70 +514,122 @@ class ExportarSolicitudesView(views.APIView):
     def get(self, request: views.Request, *args, **kwargs):
         user: Usuario = request.user
 
-        # Filtros opcionales
-        fecha_inicio = request.query_params.get("fecha_inicio")
-        fecha_fin = request.query_params.get("fecha_fin")
-        estado = request.query_params.get("estado")
-        categoria_id = request.query_params.get("categoria")
+        try:
+            periodo = _periodo_solicitado(request.query_params)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Filtros opcionales: fecha_inicio, fecha_fin, estado, categoria
+        filtros = filtros_de(request.query_params)
+        gzip = request.query_params.get("gzip") in ("1", "true")
+        queryset = aplicar_filtros(_solicitudes_para_usuario(user), filtros)
+        nombre = f'solicitudes_{timezone.now().strftime("%Y%m%d_%H%M%S")}'
+
+        if periodo:
+            _, inicio, fin = periodo
+            nombre = f"solicitudes_{inicio:%Y%m%d}_{fin:%Y%m%d}"
+            # El paquete pre-generado solo cubre el periodo completo sin filtros
+            manifiesto = (
+                None if filtros or gzip else _paquete_para_usuario(user, *periodo)
+            )
+            if manifiesto:
+                return respuesta_archivo(
+                    request, *archivo_paquete(manifiesto, "csv"), f"{nombre}.csv"
+                )
+            queryset = solicitudes_del_periodo(queryset, inicio, fin)
 
-        queryset = _solicitudes_para_usuario(user).select_related(
-            "categoria", "ciudadano", "ciudadano__localidad"
-        )
+        # CSV en streaming; ?gzip=1 lo entrega comprimido
+        return respuesta_csv(queryset, nombre, gzip=gzip)
 
-        # Aplicar filtros
-        if fecha_inicio:
-            queryset = queryset.filter(fecha_creacion__gte=fecha_inicio)
-        if fecha_fin:
-            queryset = queryset.filter(fecha_creacion__lte=fecha_fin)
-        if estado:
-            queryset = queryset.filter(estado=estado)
-        if categoria_id:
-            queryset = queryset.filter(categoria_id=categoria_id)
 
-        # Crear respuesta CSV
-        response = HttpResponse(content_type="text/csv; charset=utf-8")
-        response["Content-Disposition"] = (
-            f'attachment; filename="solicitudes_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-        )
+def _trabajos_para_usuario(user: Usuario):
+    """Trabajos de exportación del mismo alcance que el usuario."""
+    alcance = alcance_de(user)
+    if alcance is None:
+        return TrabajoExportacion.objects.none()
+    return TrabajoExportacion.objects.filter(alcance=alcance[0])
 
-        # Agregar BOM para Excel
-        response.write("\ufeff")
-
-        writer = csv.writer(response)
-        writer.writerow(
-            [
-                "Folio",
-                "Categoría",
-                "Estado",
-                "Ciudadano",
-                "Localidad",
-                "Descripción",
-                "Fecha Creación",
-                "Fecha Actualización",
-                "Días Transcurridos",
-            ]
+
+class ExportacionesView(views.APIView):
+    """
+    Solicita una exportación en segundo plano (CSV, o PDF solo admin).
+    Devuelve el trabajo a consultar; si ya existe uno idéntico en curso o un
+    archivo vigente, se devuelve ese.
+    """
+
+    permission_classes = (permissions.IsAuthenticated, IsAdminOrFuncionario)
+
+    def post(self, request: views.Request, *args, **kwargs):
+        user: Usuario = request.user
+        formato = request.data.get("formato", "csv")
+        if formato not in dict(TrabajoExportacion.FORMATOS):
+            return Response(
+                {"detail": "Formato no soportado"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if formato == "pdf" and getattr(user, "rol", None) != "admin":
+            return Response(
+                {"detail": "Solo administradores"}, status=status.HTTP_403_FORBIDDEN
+            )
+        if alcance_de(user) is None:
+            return Response(
+                {"detail": "Sin dependencia asignada"}, status=status.HTTP_403_FORBIDDEN
+            )
+
+        trabajo, _ = solicitar_exportacion(user, formato, filtros_de(request.data))
+        return Response(
+            TrabajoExportacionSerializer(trabajo).data,
+            status=status.HTTP_200_OK
+            if trabajo.estado == "completado"
+            else status.HTTP_202_ACCEPTED,
         )
 
-        for solicitud in queryset:
-            dias_transcurridos = (timezone.now() - solicitud.fecha_creacion).days
-            localidad = (
-                solicitud.ciudadano.localidad.colonia
-                if solicitud.ciudadano.localidad
-                else "N/A"
+
+class ExportacionDetalleView(views.APIView):
+    """
+    Estado de un trabajo de exportación
+    """
+
+    permission_classes = (permissions.IsAuthenticated, IsAdminOrFuncionario)
+
+    def get(self, request: views.Request, pk: int, *args, **kwargs):
+        trabajo = _trabajos_para_usuario(request.user).filter(pk=pk).first()
+        if trabajo is None:
+            return Response(
+                {"detail": "Exportación no encontrada"}, status=status.HTTP_404_NOT_FOUND
             )
+        return Response(TrabajoExportacionSerializer(trabajo).data)
 
-            writer.writerow(
-                [
-                    solicitud.folio,
-                    solicitud.categoria.nombre,
-                    solicitud.get_estado_display(),
-                    solicitud.ciudadano.nombre_completo,
-                    localidad,
-                    solicitud.descripcion[:100],  # Limitar a 100 caracteres
-                    solicitud.fecha_creacion.strftime("%Y-%m-%d %H:%M:%S"),
-                    solicitud.fecha_actualizacion.strftime("%Y-%m-%d %H:%M:%S"),
-                    dias_transcurridos,
-                ]
+
+class DescargarExportacionView(views.APIView):
+    """
+    Descarga del archivo de una exportación terminada, con ``Range`` y
+    ``ETag`` para reanudar descargas interrumpidas.
+    """
+
+    permission_classes = (permissions.IsAuthenticated, IsAdminOrFuncionario)
+
+    def get(self, request: views.Request, pk: int, *args, **kwargs):
+        trabajo = _trabajos_para_usuario(request.user).filter(pk=pk).first()
+        if trabajo is None:
+            return Response(
+                {"detail": "Exportación no encontrada"}, status=status.HTTP_404_NOT_FOUND
+            )
+        if trabajo.estado != "completado":
+            return Response(
+                {"detail": "La exportación aún no está lista", "estado": trabajo.estado},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if not trabajo.archivo.storage.exists(trabajo.archivo.name):
+            return Response(
+                {"detail": "El archivo de la exportación ya no existe"},
+                status=status.HTTP_410_GONE,
             )
 
-        return response
+        nombre = f"solicitudes_{trabajo.fecha_fin.strftime('%Y%m%d_%H%M%S')}.{trabajo.formato}"
+        return respuesta_archivo(
+            request,
+            trabajo.archivo.path,
+            trabajo.etag,
+            TIPOS_CONTENIDO[trabajo.formato],
+            nombre,
+        )
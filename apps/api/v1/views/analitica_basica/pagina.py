@@ -1,6 +1,8 @@
 from django.db.models import Count, Q
 from rest_framework import views, permissions
 
+from apps.analitica.cache import cache_analitica
+from apps.autenticacion.alcance import filtrar_por_dependencia
 from apps.autenticacion.models import Usuario
 from apps.utils.permissions import IsAdminOrFuncionario
 from apps.solicitudes.models import Solicitud
@@ -9,14 +11,13 @@ from apps.solicitudes.models import Solicitud
 class SolicitudAnaliticaView(views.APIView):
     permission_classes = (permissions.IsAuthenticated, IsAdminOrFuncionario)
 
+    @cache_analitica("pagina-resumen", ttl=60)
     def get(self, request: views.Request, *args, **kwargs):
         # Lógica para manejar la solicitud GET
 
         user: Usuario = request.user
 
-        queryset = Solicitud.objects.filter(
-            categoria__dependencia_municipal=user.funcionario.dependencia
-        )
+        queryset = filtrar_por_dependencia(Solicitud.objects.all(), user)
 
         data = queryset.aggregate(
             realizadas=Count('id'),
@@ -1,12 +1,33 @@
+import secrets
+import time
+
+from django.core import signing
+from django.core.cache import cache
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.request import Request
+from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 
-from apps.solicitudes.notificaciones import Notificacion
-from apps.solicitudes.notificaciones_serializers import NotificacionSerializer
+from apps.autenticacion.alcance import ciudadano_id_de
+from apps.autenticacion.authentication import JWTClaimsAuthentication
+from apps.autenticacion.constants import CIUDADANO
+from apps.solicitudes.notificaciones import Notificacion, no_leidas_de
+from apps.solicitudes.notificaciones_serializers import (
+    MarcarLeidasSerializer,
+    NotificacionSerializer,
+)
+from apps.solicitudes.tiempo_real import backend, formatear_evento, hub
+from apps.utils.pagination import KeysetPagination
 from apps.utils.permissions import IsCiudadano
 
+LATIDO_SEGUNDOS = 15
+LOTE_REANUDACION = 100
+TICKET_STREAM_SAL = "notificaciones.stream"
+TICKET_STREAM_SEGUNDOS = 30
+
 
 class NotificacionViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -16,29 +37,40 @@ class NotificacionViewSet(viewsets.ReadOnlyModelViewSet):
 
     serializer_class = NotificacionSerializer
     permission_classes = [IsCiudadano]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """Retorna solo las notificaciones del ciudadano autenticado"""
-        try:
-            ciudadano = self.request.user.ciudadano
-            return Notificacion.objects.filter(ciudadano=ciudadano)
-        except:
+        ciudadano_id = ciudadano_id_de(self.request.user)
+        if ciudadano_id is None:
             return Notificacion.objects.none()
+        # Solo las columnas que usa el serializer; el folio en el mismo JOIN
+        return (
+            Notificacion.objects.filter(ciudadano_id=ciudadano_id)
+            .select_related("solicitud")
+            .only(
+                "id",
+                "ciudadano_id",
+                "tipo",
+                "mensaje",
+                "leida",
+                "fecha_creacion",
+                "fecha_lectura",
+                "solicitud__folio",
+            )
+        )
 
     @action(detail=False, methods=["get"])
     def no_leidas(self, request: Request):
-        """Obtener solo notificaciones no leídas"""
-        try:
-            ciudadano = request.user.ciudadano
-            notificaciones = Notificacion.objects.filter(
-                ciudadano=ciudadano, leida=False
-            )
-            serializer = self.get_serializer(notificaciones, many=True)
-            return Response(serializer.data)
-        except:
+        """Obtener solo notificaciones no leídas, paginadas por cursor"""
+        ciudadano_id = ciudadano_id_de(request.user)
+        if ciudadano_id is None:
             return Response(
                 {"detail": "Ciudadano no encontrado"}, status=status.HTTP_404_NOT_FOUND
             )
+        pagina = self.paginate_queryset(self.get_queryset().filter(leida=False))
+        serializer = self.get_serializer(pagina, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=["post"])
     def marcar_como_leida(self, request: Request, pk=None):
@@ -46,16 +78,16 @@ class NotificacionViewSet(viewsets.ReadOnlyModelViewSet):
         notificacion = self.get_object()
 
         # Validar que pertenece al ciudadano autenticado
-        try:
-            if notificacion.ciudadano != request.user.ciudadano:
-                return Response(
-                    {"detail": "No tiene permiso para marcar esta notificación"},
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-        except:
+        ciudadano_id = ciudadano_id_de(request.user)
+        if ciudadano_id is None:
             return Response(
                 {"detail": "Acceso denegado"}, status=status.HTTP_403_FORBIDDEN
             )
+        if notificacion.ciudadano_id != ciudadano_id:
+            return Response(
+                {"detail": "No tiene permiso para marcar esta notificación"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
 
         notificacion.marcar_como_leida()
         serializer = self.get_serializer(notificacion)
@@ -64,35 +96,202 @@ class NotificacionViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=["post"])
     def marcar_todas_como_leidas(self, request: Request):
         """Marcar todas las notificaciones como leídas"""
-        try:
-            ciudadano = request.user.ciudadano
-            notificaciones = Notificacion.objects.filter(
-                ciudadano=ciudadano, leida=False
+        ciudadano_id = ciudadano_id_de(request.user)
+        if ciudadano_id is None:
+            return Response(
+                {"detail": "Ciudadano no encontrado"}, status=status.HTTP_404_NOT_FOUND
             )
+        marcadas = Notificacion.objects.marcar_leidas(ciudadano_id)
 
-            for notificacion in notificaciones:
-                notificacion.marcar_como_leida()
+        return Response({"detail": f"{marcadas} notificaciones marcadas como leídas"})
 
-            return Response(
-                {
-                    "detail": f"{notificaciones.count()} notificaciones marcadas como leídas"
-                }
-            )
-        except:
+    @action(detail=False, methods=["post"])
+    def marcar_leidas(self, request: Request):
+        """
+        Marcar varias notificaciones como leídas en una sola sentencia.
+        Body: ``{"ids": [1, 2, ...]}`` o ``{"hasta_id": 10}`` (todas las
+        notificaciones con id menor o igual).
+        """
+        ciudadano_id = ciudadano_id_de(request.user)
+        if ciudadano_id is None:
             return Response(
                 {"detail": "Ciudadano no encontrado"}, status=status.HTTP_404_NOT_FOUND
             )
 
+        serializer = MarcarLeidasSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        notificaciones = Notificacion.objects.filter(ciudadano_id=ciudadano_id)
+        if "ids" in datos:
+            notificaciones = notificaciones.filter(id__in=datos["ids"])
+        else:
+            notificaciones = notificaciones.filter(id__lte=datos["hasta_id"])
+
+        return Response({"marcadas": notificaciones.marcar_leidas(ciudadano_id)})
+
     @action(detail=False, methods=["get"])
     def no_leidas_count(self, request: Request):
-        """Obtener el conteo de notificaciones no leídas"""
-        try:
-            ciudadano = request.user.ciudadano
-            count = Notificacion.objects.filter(
-                ciudadano=ciudadano, leida=False
-            ).count()
-            return Response({"no_leidas": count})
-        except:
+        """
+        Obtener el conteo de notificaciones no leídas.
+        Se lee del contador (en caché) y responde 304 si el cliente ya tiene
+        el mismo conteo en ``If-None-Match``.
+        """
+        ciudadano_id = ciudadano_id_de(request.user)
+        if ciudadano_id is None:
+            return Response(
+                {"detail": "Ciudadano no encontrado"}, status=status.HTTP_404_NOT_FOUND
+            )
+        count = no_leidas_de(ciudadano_id)
+        etag = f'"{ciudadano_id}-{count}"'
+        if request.headers.get("If-None-Match") == etag:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({"no_leidas": count})
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    @action(detail=False, methods=["post"], url_path="stream/ticket")
+    def ticket_stream(self, request: Request):
+        """
+        Ticket de un solo uso para abrir el stream con ``?ticket=``
+        (``EventSource`` no permite encabezados). Vence en
+        ``TICKET_STREAM_SEGUNDOS`` y solo sirve para el stream, así el token
+        de acceso no queda en la URL ni en los logs.
+        """
+        ciudadano_id = ciudadano_id_de(request.user)
+        if ciudadano_id is None:
             return Response(
                 {"detail": "Ciudadano no encontrado"}, status=status.HTTP_404_NOT_FOUND
             )
+        # El stream se cierra cuando vence el token con el que se pidió el ticket
+        if request.auth is not None:
+            expira = request.auth["exp"]
+        else:
+            expira = time.time() + jwt_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+        ticket = signing.dumps(
+            {"ciudadano_id": ciudadano_id, "exp": expira, "uso": secrets.token_hex(8)},
+            salt=TICKET_STREAM_SAL,
+        )
+        return Response({"ticket": ticket, "expira_en": TICKET_STREAM_SEGUNDOS})
+
+
+def _acceso_stream(request):
+    """
+    ``(ciudadano_id, expira)`` del ticket de ``?ticket=`` o del token de
+    acceso en ``Authorization``. ``ciudadano_id`` es ``None`` si el usuario
+    no es ciudadano; devuelve ``None`` si no hay credenciales válidas.
+    """
+    ticket = request.GET.get("ticket")
+    if ticket:
+        try:
+            datos = signing.loads(
+                ticket, salt=TICKET_STREAM_SAL, max_age=TICKET_STREAM_SEGUNDOS
+            )
+        except signing.BadSignature:
+            return None
+        # Un solo uso: el primero en registrarlo se queda con el ticket
+        if not cache.add(
+            f"notificaciones:ticket:{datos['uso']}", 1, TICKET_STREAM_SEGUNDOS
+        ):
+            return None
+        return datos["ciudadano_id"], datos["exp"]
+
+    try:
+        resultado = JWTClaimsAuthentication().authenticate(request)
+    except (InvalidToken, TokenError):
+        return None
+    if resultado is None:
+        return None
+    usuario, token = resultado
+    if usuario.rol != CIUDADANO:
+        return None, token["exp"]
+    return usuario.ciudadano_id, token["exp"]
+
+
+async def _pendientes(ciudadano_id: int, desde_id: int):
+    """Notificaciones con id mayor a ``desde_id``, en orden, por lotes."""
+    while True:
+        lote = [
+            notificacion
+            async for notificacion in Notificacion.objects.filter(
+                ciudadano_id=ciudadano_id, id__gt=desde_id
+            )
+            .select_related("solicitud")
+            .order_by("id")[:LOTE_REANUDACION]
+        ]
+        for notificacion in lote:
+            yield notificacion
+        if len(lote) < LOTE_REANUDACION:
+            return
+        desde_id = lote[-1].id
+
+
+async def _eventos(ciudadano_id: int, ultimo_id: int | None, expira: float):
+    # El backend recibe lo publicado por otros procesos; un worker que solo
+    # sirve streams nunca publica, así que se inicia al suscribirse
+    backend()
+    # Se suscribe antes de consultar lo pendiente para no perder nada entre ambos
+    suscripcion = hub.suscribir(ciudadano_id)
+    try:
+        yield b"retry: 5000\n\n"
+        ponerse_al_dia = ultimo_id is not None
+        if ultimo_id is None:
+            # Conexión nueva: solo lo que llegue a partir de ahora
+            ultimo_id = (
+                await Notificacion.objects.filter(ciudadano_id=ciudadano_id)
+                .order_by("-id")
+                .values_list("id", flat=True)
+                .afirst()
+                or 0
+            )
+        while time.time() < expira:
+            if ponerse_al_dia or suscripcion.desbordada:
+                suscripcion.desbordada = False
+                ponerse_al_dia = False
+                async for notificacion in _pendientes(ciudadano_id, ultimo_id):
+                    yield formatear_evento(
+                        notificacion.id, NotificacionSerializer(notificacion).data
+                    )
+                    ultimo_id = notificacion.id
+
+            eventos = await suscripcion.esperar(min(LATIDO_SEGUNDOS, expira - time.time()))
+            if not eventos and not suscripcion.desbordada:
+                yield b": latido\n\n"
+            for evento_id, evento in eventos:
+                # Ya enviada al ponerse al día
+                if evento_id > ultimo_id:
+                    yield evento
+                    ultimo_id = evento_id
+    finally:
+        hub.cancelar(suscripcion)
+
+
+async def stream_notificaciones(request):
+    """
+    Stream SSE de notificaciones nuevas del ciudadano autenticado, con un
+    ticket de ``stream/ticket/`` en ``?ticket=`` o con el token de acceso en
+    ``Authorization``. Con ``Last-Event-ID`` (o ``?ultimo_id=``) primero envía
+    las que se perdieron. La conexión se cierra al vencer el token de acceso;
+    el cliente pide un ticket nuevo y retoma con ``?ultimo_id=``.
+    """
+    acceso = _acceso_stream(request)
+    if acceso is None:
+        return JsonResponse({"detail": "Ticket o token inválido o ausente"}, status=401)
+    ciudadano_id, expira = acceso
+    if ciudadano_id is None:
+        return JsonResponse({"detail": "Ciudadano no encontrado"}, status=403)
+
+    ultimo_id = request.headers.get("Last-Event-ID") or request.GET.get("ultimo_id")
+    try:
+        ultimo_id = int(ultimo_id) if ultimo_id else None
+    except ValueError:
+        return JsonResponse({"detail": "Last-Event-ID inválido"}, status=400)
+
+    response = StreamingHttpResponse(
+        _eventos(ciudadano_id, ultimo_id, expira),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
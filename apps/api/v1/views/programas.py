@@ -2,6 +2,7 @@ from rest_framework import generics, viewsets, permissions, status
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 
+from apps.autenticacion.alcance import dependencia_id_de, filtrar_por_dependencia
 from apps.programas.models import Programa
 from apps.programas.serializers import (
     ProgramaSerializer,
@@ -34,17 +35,10 @@ class ProgramaViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if getattr(user, "rol", None) == "admin":
-            return Programa.objects.all().order_by("-fecha_creacion")
-
-        if getattr(user, "rol", None) == "funcionario":
-            try:
-                dependencia = user.funcionario.dependencia
-                return Programa.objects.filter(
-                    dependencia_municipal=dependencia
-                ).order_by("-fecha_creacion")
-            except Exception:
-                return Programa.objects.none()
+        if getattr(user, "rol", None) in ("admin", "funcionario"):
+            return filtrar_por_dependencia(
+                Programa.objects.all(), user, "dependencia_municipal_id"
+            ).order_by("-fecha_creacion")
 
         # Otros roles: solo lectura general (si se desea filtrar más, ajustar aquí)
         return Programa.objects.all().order_by("-fecha_creacion")
@@ -61,13 +55,13 @@ class ProgramaViewSet(viewsets.ModelViewSet):
             return
 
         if getattr(user, "rol", None) == "funcionario":
-            try:
-                dependencia = user.funcionario.dependencia
-            except Exception:
+            dependencia_id = dependencia_id_de(user)
+            if dependencia_id is None:
                 raise PermissionDenied("Funcionario no encontrado")
 
             # Forzamos la dependencia del funcionario, ignorando payload arbitrario
-            serializer.save(dependencia_municipal=dependencia)
+            serializer.validated_data.pop("dependencia_municipal", None)
+            serializer.save(dependencia_municipal_id=dependencia_id)
             return
 
         raise PermissionDenied("Rol no autorizado para registrar programas")
@@ -81,16 +75,16 @@ class ProgramaViewSet(viewsets.ModelViewSet):
             return
 
         if getattr(user, "rol", None) == "funcionario":
-            try:
-                dependencia = user.funcionario.dependencia
-            except Exception:
+            dependencia_id = dependencia_id_de(user)
+            if dependencia_id is None:
                 raise PermissionDenied("Funcionario no encontrado")
 
-            if programa.dependencia_municipal != dependencia:
+            if programa.dependencia_municipal_id != dependencia_id:
                 raise PermissionDenied("Solo puede editar programas de su dependencia")
 
             # No permitir cambiar dependencia
-            serializer.save(dependencia_municipal=dependencia)
+            serializer.validated_data.pop("dependencia_municipal", None)
+            serializer.save(dependencia_municipal_id=dependencia_id)
             return
 
         raise PermissionDenied("Rol no autorizado para editar programas")
@@ -103,12 +97,11 @@ class ProgramaViewSet(viewsets.ModelViewSet):
             return super().destroy(request, *args, **kwargs)
 
         if getattr(user, "rol", None) == "funcionario":
-            try:
-                dependencia = user.funcionario.dependencia
-            except Exception:
+            dependencia_id = dependencia_id_de(user)
+            if dependencia_id is None:
                 raise PermissionDenied("Funcionario no encontrado")
 
-            if programa.dependencia_municipal != dependencia:
+            if programa.dependencia_municipal_id != dependencia_id:
                 raise PermissionDenied(
                     "Solo puede eliminar programas de su dependencia"
                 )
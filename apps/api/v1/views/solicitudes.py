@@ -1,6 +1,7 @@
 import uuid
 
 from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
@@ -15,7 +16,14 @@ from apps.solicitudes.serializers import (
     SolicitudSerializer,
     validate_attachment_size,
 )
+from apps.autenticacion.alcance import (
+    ciudadano_id_de,
+    dependencia_id_de,
+    filtrar_por_dependencia,
+)
+from apps.solicitudes.consultas import planificar_solicitudes
 from apps.solicitudes.models import Categoria, Solicitud, Comentario
+from apps.utils.pagination import KeysetPagination
 from apps.utils.permissions import IsFuncionario, IsCiudadano
 
 
@@ -33,18 +41,11 @@ class CategoriasListView(viewsets.ModelViewSet):
         """
         user = self.request.user
 
-        if user.rol == "admin":
-            return Categoria.objects.all()
-
-        # Funcionarios ven solo categorías de su dependencia
-        if user.rol == "funcionario":
-            try:
-                funcionario = user.funcionario
-                return Categoria.objects.filter(
-                    dependencia_municipal=funcionario.dependencia
-                )
-            except:
-                return Categoria.objects.none()
+        # Admin ve todas; funcionarios solo las de su dependencia
+        if user.rol in ("admin", "funcionario"):
+            return filtrar_por_dependencia(
+                Categoria.objects.all(), user, "dependencia_municipal_id"
+            )
 
         # Ciudadanos ven todas las categorías
         if user.rol == "ciudadano":
@@ -65,9 +66,8 @@ class CategoriasListView(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        try:
-            funcionario = request.user.funcionario
-        except:
+        funcionario_dependencia_id = dependencia_id_de(request.user)
+        if funcionario_dependencia_id is None:
             return Response(
                 {"detail": "Funcionario no encontrado"},
                 status=status.HTTP_404_NOT_FOUND,
@@ -75,7 +75,7 @@ class CategoriasListView(viewsets.ModelViewSet):
 
         # Validar que la dependencia en el request coincida con la del funcionario
         dependencia_id = request.data.get("dependencia_municipal")
-        if int(dependencia_id) != funcionario.dependencia.id:
+        if int(dependencia_id) != funcionario_dependencia_id:
             return Response(
                 {"detail": "Solo puede crear categorías para su propia dependencia"},
                 status=status.HTTP_403_FORBIDDEN,
@@ -93,20 +93,20 @@ class CategoriasListView(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        try:
-            funcionario = request.user.funcionario
-            # Validar que la categoría pertenece a su dependencia
-            if categoria.dependencia_municipal != funcionario.dependencia:
-                return Response(
-                    {"detail": "No puede actualizar categorías de otra dependencia"},
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-        except:
+        dependencia_id = dependencia_id_de(request.user)
+        if dependencia_id is None:
             return Response(
                 {"detail": "Funcionario no encontrado"},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
+        # Validar que la categoría pertenece a su dependencia
+        if categoria.dependencia_municipal_id != dependencia_id:
+            return Response(
+                {"detail": "No puede actualizar categorías de otra dependencia"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
         return super().update(request, *args, **kwargs)
 
     def partial_update(self, request: Request, *args, **kwargs):
@@ -119,20 +119,20 @@ class CategoriasListView(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        try:
-            funcionario = request.user.funcionario
-            # Validar que la categoría pertenece a su dependencia
-            if categoria.dependencia_municipal != funcionario.dependencia:
-                return Response(
-                    {"detail": "No puede actualizar categorías de otra dependencia"},
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-        except:
+        dependencia_id = dependencia_id_de(request.user)
+        if dependencia_id is None:
             return Response(
                 {"detail": "Funcionario no encontrado"},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
+        # Validar que la categoría pertenece a su dependencia
+        if categoria.dependencia_municipal_id != dependencia_id:
+            return Response(
+                {"detail": "No puede actualizar categorías de otra dependencia"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
         return super().partial_update(request, *args, **kwargs)
 
     def destroy(self, request, *args, **kwargs):
@@ -145,19 +145,19 @@ class CategoriasListView(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        try:
-            funcionario = request.user.funcionario
-            if categoria.dependencia_municipal != funcionario.dependencia:
-                return Response(
-                    {"detail": "No puede eliminar categorías de otra dependencia"},
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-        except:
+        dependencia_id = dependencia_id_de(request.user)
+        if dependencia_id is None:
             return Response(
                 {"detail": "Funcionario no encontrado"},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
+        if categoria.dependencia_municipal_id != dependencia_id:
+            return Response(
+                {"detail": "No puede eliminar categorías de otra dependencia"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
         if not categoria.puede_eliminarse():
             return Response(
                 {
@@ -178,7 +178,7 @@ class SolicitudViewSet(viewsets.ModelViewSet):
     """
 
     serializer_class = SolicitudSerializer
-    pagination_class = None
+    pagination_class = KeysetPagination
     permission_classes = [permissions.IsAuthenticated]
 
     def get_permissions(self):
@@ -194,31 +194,20 @@ class SolicitudViewSet(viewsets.ModelViewSet):
         return [permissions.IsAuthenticated()]
 
     def get_queryset(self):
-        user = self.request.user
-
-        # Admin ve todo
-        if user.rol == "admin":
-            return Solicitud.objects.all()
+        return planificar_solicitudes(self._solicitudes_visibles(), self.action)
 
-        # Funcionario ve solicitudes de su dependencia
-        if user.rol == "funcionario":
-            try:
-                funcionario = user.funcionario
-                return Solicitud.objects.filter(
-                    categoria__dependencia_municipal=funcionario.dependencia
-                ).select_related("ciudadano", "categoria")
-            except:
-                return Solicitud.objects.none()
+    def _solicitudes_visibles(self):
+        user = self.request.user
 
         # Ciudadano ve solo sus solicitudes
         if user.rol == "ciudadano":
-            try:
-                ciudadano = user.ciudadano
-                return Solicitud.objects.filter(ciudadano=ciudadano)
-            except:
+            ciudadano_id = ciudadano_id_de(user)
+            if ciudadano_id is None:
                 return Solicitud.objects.none()
+            return Solicitud.objects.filter(ciudadano_id=ciudadano_id)
 
-        return Solicitud.objects.none()
+        # Admin ve todo, funcionario solo su dependencia
+        return filtrar_por_dependencia(Solicitud.objects.all(), user)
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -233,9 +222,8 @@ class SolicitudViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        try:
-            ciudadano = request.user.ciudadano
-        except:
+        ciudadano_id = ciudadano_id_de(request.user)
+        if ciudadano_id is None:
             return Response(
                 {"detail": "Ciudadano no encontrado"}, status=status.HTTP_404_NOT_FOUND
             )
@@ -248,12 +236,14 @@ class SolicitudViewSet(viewsets.ModelViewSet):
             f"SOL-{timezone.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
         )
 
-        solicitud = Solicitud.objects.create(
-            folio=folio,
-            ciudadano=ciudadano,
-            estado="enviada",
-            **serializer.validated_data,
-        )
+        # Los contadores materializados se actualizan en la misma transacción
+        with transaction.atomic():
+            solicitud = Solicitud.objects.create(
+                folio=folio,
+                ciudadano_id=ciudadano_id,
+                estado="enviada",
+                **serializer.validated_data,
+            )
 
         return Response(
             SolicitudSerializer(solicitud).data, status=status.HTTP_201_CREATED
@@ -270,20 +260,20 @@ class SolicitudViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        try:
-            funcionario = request.user.funcionario
-            # Validar que la solicitud pertenece a su dependencia
-            if solicitud.categoria.dependencia_municipal != funcionario.dependencia:
-                return Response(
-                    {"detail": "No tiene permiso para actualizar esta solicitud"},
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-        except:
+        dependencia_id = dependencia_id_de(request.user)
+        if dependencia_id is None:
             return Response(
                 {"detail": "Funcionario no encontrado"},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
+        # Validar que la solicitud pertenece a su dependencia
+        if solicitud.categoria.dependencia_municipal_id != dependencia_id:
+            return Response(
+                {"detail": "No tiene permiso para actualizar esta solicitud"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
         # Obtener nuevo estado del body
         nuevo_estado = request.data.get("estado")
         comentario_texto = request.data.get("comentario", "")
@@ -298,8 +288,7 @@ class SolicitudViewSet(viewsets.ModelViewSet):
             validate_attachment_size(archivo_adjunto)
 
         if nuevo_estado:
-            solicitud.estado = nuevo_estado
-            solicitud.save()
+            solicitud.cambiar_estado(nuevo_estado, usuario=request.user)
 
         if comentario_texto or archivo_adjunto:
             texto = comentario_texto.strip() or "Archivo adjunto"
@@ -310,6 +299,7 @@ class SolicitudViewSet(viewsets.ModelViewSet):
                     texto=texto,
                     archivo_adjunto=archivo_adjunto,
                     creado_por=str(request.user),
+                    autor_id=request.user.id,
                 )
             except DjangoValidationError as exc:
                 raise ValidationError(exc.message_dict or exc.messages)
@@ -325,30 +315,30 @@ class SolicitudViewSet(viewsets.ModelViewSet):
         - Ciudadano: solo sus solicitudes
         - Funcionario: solicitudes de su dependencia
         - Admin: todas las solicitudes
+
+        Paginado por cursor (``cursor`` / ``limit``), igual que ``list``.
         """
 
         user = request.user
 
         if user.rol == "ciudadano":
-            try:
-                ciudadano = user.ciudadano
-                qs = Solicitud.objects.filter(ciudadano=ciudadano)
-            except Exception:
+            ciudadano_id = ciudadano_id_de(user)
+            if ciudadano_id is None:
                 return Response(
                     {"detail": "Ciudadano no encontrado"},
                     status=status.HTTP_404_NOT_FOUND,
                 )
+            qs = Solicitud.objects.filter(ciudadano_id=ciudadano_id)
         elif user.rol == "funcionario":
-            try:
-                funcionario = user.funcionario
-                qs = Solicitud.objects.filter(
-                    categoria__dependencia_municipal=funcionario.dependencia
-                )
-            except Exception:
+            dependencia_id = dependencia_id_de(user)
+            if dependencia_id is None:
                 return Response(
                     {"detail": "Funcionario no encontrado"},
                     status=status.HTTP_404_NOT_FOUND,
                 )
+            qs = Solicitud.objects.filter(
+                categoria__dependencia_municipal_id=dependencia_id
+            )
         elif user.rol == "admin":
             qs = Solicitud.objects.all()
         else:
@@ -356,8 +346,9 @@ class SolicitudViewSet(viewsets.ModelViewSet):
                 {"detail": "Rol no autorizado"}, status=status.HTTP_403_FORBIDDEN
             )
 
-        serializer = SolicitudSerializer(qs, many=True, context={"request": request})
-        return Response(serializer.data)
+        page = self.paginate_queryset(planificar_solicitudes(qs, self.action))
+        serializer = SolicitudSerializer(page, many=True, context={"request": request})
+        return self.get_paginated_response(serializer.data)
 
     @action(
         detail=True, methods=["get"], permission_classes=[permissions.IsAuthenticated]
@@ -368,34 +359,32 @@ class SolicitudViewSet(viewsets.ModelViewSet):
 
         # Validar acceso
         if request.user.rol == "ciudadano":
-            try:
-                if solicitud.ciudadano != request.user.ciudadano:
-                    return Response(
-                        {"detail": "No tiene permiso para ver esta solicitud"},
-                        status=status.HTTP_403_FORBIDDEN,
-                    )
-            except:
+            ciudadano_id = ciudadano_id_de(request.user)
+            if ciudadano_id is None:
                 return Response(
                     {"detail": "Acceso denegado"}, status=status.HTTP_403_FORBIDDEN
                 )
+            if solicitud.ciudadano_id != ciudadano_id:
+                return Response(
+                    {"detail": "No tiene permiso para ver esta solicitud"},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
         elif request.user.rol == "funcionario":
-            try:
-                if (
-                    solicitud.categoria.dependencia_municipal
-                    != request.user.funcionario.dependencia
-                ):
-                    return Response(
-                        {"detail": "No tiene permiso para ver esta solicitud"},
-                        status=status.HTTP_403_FORBIDDEN,
-                    )
-            except:
+            dependencia_id = dependencia_id_de(request.user)
+            if dependencia_id is None:
                 return Response(
                     {"detail": "Acceso denegado"}, status=status.HTTP_403_FORBIDDEN
                 )
+            if solicitud.categoria.dependencia_municipal_id != dependencia_id:
+                return Response(
+                    {"detail": "No tiene permiso para ver esta solicitud"},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
 
         data = SolicitudSerializer(solicitud, context={"request": request}).data
+        # Los comentarios vienen precargados por planificar_solicitudes
         data["comentarios"] = ComentarioSerializer(
-            Comentario.objects.filter(solicitud=solicitud),
+            solicitud.comentarios.all(),
             many=True,
             context={"request": request},
         ).data
@@ -0,0 +1,95 @@
+"""
+Resolución del alcance de datos de un usuario autenticado.
+
+Con ``JWTClaimsAuthentication`` el usuario es un ``UsuarioToken`` y los ids
+salen del token sin tocar la base de datos. Con las demás autenticaciones
+(token DRF, básica) se recurre a una consulta ligera por id.
+"""
+
+from django.db.models import QuerySet
+
+from apps.autenticacion.authentication import UsuarioToken
+from apps.autenticacion.constants import ADMIN, CIUDADANO, FUNCIONARIO
+
+
+def _claim(user, nombre: str):
+    """Valor del claim ``nombre`` si el usuario viene del token, si no ``None``."""
+    if isinstance(user, UsuarioToken):
+        return getattr(user, nombre)
+    return None
+
+
+def dependencia_id_de(user) -> int | None:
+    """Id de la dependencia del funcionario, o ``None`` si no aplica."""
+    if getattr(user, "rol", None) != FUNCIONARIO:
+        return None
+
+    dependencia_id = _claim(user, "dependencia_id")
+    if dependencia_id is not None:
+        return dependencia_id
+
+    from apps.funcionarios.models import Funcionario
+
+    return (
+        Funcionario.objects.filter(usuario_id=user.id)
+        .values_list("dependencia_id", flat=True)
+        .first()
+    )
+
+
+def funcionario_id_de(user) -> int | None:
+    """Id del funcionario asociado al usuario, o ``None`` si no aplica."""
+    if getattr(user, "rol", None) != FUNCIONARIO:
+        return None
+
+    funcionario_id = _claim(user, "funcionario_id")
+    if funcionario_id is not None:
+        return funcionario_id
+
+    from apps.funcionarios.models import Funcionario
+
+    return (
+        Funcionario.objects.filter(usuario_id=user.id)
+        .values_list("id", flat=True)
+        .first()
+    )
+
+
+def ciudadano_id_de(user) -> int | None:
+    """Id del ciudadano asociado al usuario, o ``None`` si no aplica."""
+    if getattr(user, "rol", None) != CIUDADANO:
+        return None
+
+    ciudadano_id = _claim(user, "ciudadano_id")
+    if ciudadano_id is not None:
+        return ciudadano_id
+
+    from apps.ciudadanos.models import Ciudadano
+
+    return (
+        Ciudadano.objects.filter(usuario_id=user.id)
+        .values_list("id", flat=True)
+        .first()
+    )
+
+
+def filtrar_por_dependencia(
+    queryset: QuerySet, user, campo: str = "categoria__dependencia_municipal_id"
+) -> QuerySet:
+    """
+    Restringe ``queryset`` al alcance del usuario:
+    - Admin: todo
+    - Funcionario: filas cuyo ``campo`` es su dependencia
+    - Otros: nada
+    """
+    rol = getattr(user, "rol", None)
+
+    if rol == ADMIN:
+        return queryset
+
+    if rol == FUNCIONARIO:
+        dependencia_id = dependencia_id_de(user)
+        if dependencia_id is not None:
+            return queryset.filter(**{campo: dependencia_id})
+
+    return queryset.none()
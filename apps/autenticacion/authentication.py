@@ -0,0 +1,100 @@
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.autenticacion.constants import CIUDADANO, FUNCIONARIO
+
+
+class UsuarioToken(TokenUser):
+    """
+    Usuario construido directamente desde los claims del token de acceso.
+
+    Expone ``rol``, ``funcionario_id``, ``dependencia_id`` y ``ciudadano_id``
+    sin consultar la base de datos. ``funcionario`` y ``ciudadano`` se cargan
+    de forma perezosa solo para los flujos de escritura que necesitan la
+    instancia completa.
+    """
+
+    @cached_property
+    def id(self) -> int:
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def rol(self) -> str | None:
+        return self.token.get("rol")
+
+    @cached_property
+    def funcionario_id(self) -> int | None:
+        return self.token.get("funcionario_id")
+
+    @cached_property
+    def dependencia_id(self) -> int | None:
+        return self.token.get("dependencia_id")
+
+    @cached_property
+    def ciudadano_id(self) -> int | None:
+        return self.token.get("ciudadano_id")
+
+    @cached_property
+    def usuario(self) -> str:
+        """Nombre de usuario (CURP o correo); tokens antiguos no lo incluyen."""
+        if "usuario" in self.token:
+            return self.token["usuario"]
+
+        from apps.autenticacion.models import Usuario
+
+        return (
+            Usuario.objects.filter(pk=self.id)
+            .values_list("usuario", flat=True)
+            .first()
+            or ""
+        )
+
+    @cached_property
+    def funcionario(self):
+        from apps.funcionarios.models import Funcionario
+
+        if self.rol != FUNCIONARIO:
+            raise Funcionario.DoesNotExist("El usuario no es funcionario")
+        return Funcionario.objects.get(usuario_id=self.id)
+
+    @cached_property
+    def ciudadano(self):
+        from apps.ciudadanos.models import Ciudadano
+
+        if self.rol != CIUDADANO:
+            raise Ciudadano.DoesNotExist("El usuario no es ciudadano")
+        return Ciudadano.objects.get(usuario_id=self.id)
+
+    @property
+    def username(self) -> str:
+        return self.usuario
+
+    def get_username(self) -> str:
+        return self.usuario
+
+    def __str__(self) -> str:
+        # Igual que Usuario.__str__, se usa como autor de comentarios
+        return self.usuario
+
+
+class JWTClaimsAuthentication(JWTStatelessUserAuthentication):
+    """
+    Autenticación JWT sin consulta a la base de datos.
+
+    El token firmado ya contiene el rol y el alcance (dependencia/ciudadano)
+    del usuario, por lo que se confía en sus claims en lugar de cargar
+    ``Usuario`` en cada petición.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if "rol" not in validated_token:
+            raise InvalidToken(_("El token no contiene el rol del usuario"))
+
+        return UsuarioToken(validated_token)
@@ -11,10 +11,15 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token = super().get_token(user)
 
         token["rol"] = user.rol
+        token["usuario"] = user.usuario
 
         # Si es funcionario, agregar su ID y dependencia
         if user.rol == "funcionario" and hasattr(user, "funcionario"):
             token["funcionario_id"] = user.funcionario.id
-            token["dependencia_id"] = user.funcionario.dependencia.id
+            token["dependencia_id"] = user.funcionario.dependencia_id
+
+        # Si es ciudadano, agregar su ID para filtrar sin consultar la BD
+        if user.rol == "ciudadano" and hasattr(user, "ciudadano"):
+            token["ciudadano_id"] = user.ciudadano.id
 
         return token
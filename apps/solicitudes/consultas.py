@@ -0,0 +1,45 @@
+"""
+Planificación de consultas de solicitudes por acción.
+
+Cada acción del ``SolicitudViewSet`` necesita columnas y relaciones distintas;
+aquí se centraliza qué ``select_related``/``prefetch_related``/``only`` aplica
+cada una para que el número de consultas no dependa del tamaño del resultado.
+"""
+
+from django.db.models import Prefetch, QuerySet
+
+from apps.solicitudes.models import Comentario
+
+# Columnas que usa SolicitudSerializer (categoria se serializa como PK)
+CAMPOS_LISTADO = (
+    "id",
+    "folio",
+    "categoria_id",
+    "descripcion",
+    "archivo_adjunto",
+    "fecha_creacion",
+    "estado",
+)
+
+ACCIONES_LISTADO = {"list", "mis_solicitudes"}
+ACCIONES_ESCRITURA = {"update", "partial_update"}
+
+
+def planificar_solicitudes(queryset: QuerySet, accion: str | None) -> QuerySet:
+    """Ajusta el queryset base de solicitudes a lo que consume ``accion``."""
+    if accion in ACCIONES_LISTADO:
+        return queryset.only(*CAMPOS_LISTADO)
+
+    if accion == "detalles":
+        return queryset.select_related("ciudadano", "categoria").prefetch_related(
+            Prefetch(
+                "comentarios",
+                queryset=Comentario.objects.order_by("fecha_creacion", "id"),
+            )
+        )
+
+    if accion in ACCIONES_ESCRITURA or accion == "retrieve":
+        # La validación de dependencia solo necesita categoria.dependencia_municipal_id
+        return queryset.select_related("categoria")
+
+    return queryset
@@ -0,0 +1,222 @@
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Sum
+
+from apps.ciudadanos.models import Ciudadano
+from apps.dependecias_municipales.models import DependenciaMunicipal
+from apps.solicitudes.models import Categoria, Solicitud
+
+
+class ContadorSolicitudes(models.Model):
+    """
+    Conteo materializado de solicitudes por (dependencia, categoría, estado).
+    Se mantiene al crear solicitudes, al cambiar su estado (``cambiar_estado``)
+    o su categoría, al mover una categoría a otra dependencia y al borrarlas o
+    restaurarlas (solo cuenta solicitudes vigentes).
+
+    Los cambios que no pasan por ``save`` (``QuerySet.update``,
+    ``bulk_update``, SQL directo) o que cambian ``estado`` sin
+    ``cambiar_estado`` no se reflejan: después de ellos hay que ejecutar
+    ``reconciliar_contadores``, que recalcula los totales desde las solicitudes.
+    """
+
+    dependencia = models.ForeignKey(
+        DependenciaMunicipal,
+        on_delete=models.CASCADE,
+        related_name="contadores_solicitudes",
+    )
+    categoria = models.ForeignKey(
+        Categoria, on_delete=models.CASCADE, related_name="contadores_solicitudes"
+    )
+    estado = models.CharField(max_length=20, choices=Solicitud.ESTADOS_CHOICES)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Contador de solicitudes"
+        verbose_name_plural = "Contadores de solicitudes"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dependencia", "categoria", "estado"],
+                name="contador_solicitudes_unico",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.dependencia_id}/{self.categoria_id}/{self.estado}: {self.total}"
+
+
+class ContadorSolicitudesCiudadano(models.Model):
+    """
+    Conteo materializado de solicitudes por (ciudadano, estado).
+    """
+
+    ciudadano = models.ForeignKey(
+        Ciudadano, on_delete=models.CASCADE, related_name="contadores_solicitudes"
+    )
+    estado = models.CharField(max_length=20, choices=Solicitud.ESTADOS_CHOICES)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Contador de solicitudes por ciudadano"
+        verbose_name_plural = "Contadores de solicitudes por ciudadano"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ciudadano", "estado"],
+                name="contador_solicitudes_ciudadano_unico",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.ciudadano_id}/{self.estado}: {self.total}"
+
+
+def _sumar(modelo, claves: dict, delta: int):
+    """Suma ``delta`` a la fila de ``claves`` creándola si no existe."""
+    if modelo.objects.filter(**claves).update(total=F("total") + delta):
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(total=delta, **claves)
+    except IntegrityError:
+        # Otra transacción creó la fila entre el UPDATE y el INSERT
+        modelo.objects.filter(**claves).update(total=F("total") + delta)
+
+
+def registrar_estado(solicitud: Solicitud, estado_anterior: str | None = None):
+    """
+    Refleja en los contadores que ``solicitud`` entró a su estado actual
+    (y salió de ``estado_anterior`` si se indica). Debe llamarse dentro de la
+    misma transacción que guarda la solicitud.
+    """
+    por_dependencia = {
+        "dependencia_id": solicitud.categoria.dependencia_municipal_id,
+        "categoria_id": solicitud.categoria_id,
+    }
+    por_ciudadano = {"ciudadano_id": solicitud.ciudadano_id}
+
+    if estado_anterior:
+        _sumar(ContadorSolicitudes, {**por_dependencia, "estado": estado_anterior}, -1)
+        _sumar(
+            ContadorSolicitudesCiudadano, {**por_ciudadano, "estado": estado_anterior}, -1
+        )
+
+    _sumar(ContadorSolicitudes, {**por_dependencia, "estado": solicitud.estado}, 1)
+    _sumar(
+        ContadorSolicitudesCiudadano, {**por_ciudadano, "estado": solicitud.estado}, 1
+    )
+
+
+def registrar_vigencia(solicitud: Solicitud, delta: int):
+    """
+    Resta (``delta=-1``, borrado lógico) o vuelve a sumar (``delta=1``,
+    restauración) la solicitud en su estado actual.
+    """
+    _sumar(
+        ContadorSolicitudes,
+        {
+            "dependencia_id": solicitud.categoria.dependencia_municipal_id,
+            "categoria_id": solicitud.categoria_id,
+            "estado": solicitud.estado,
+        },
+        delta,
+    )
+    _sumar(
+        ContadorSolicitudesCiudadano,
+        {"ciudadano_id": solicitud.ciudadano_id, "estado": solicitud.estado},
+        delta,
+    )
+
+
+def registrar_categoria(
+    solicitud: Solicitud, dependencia_anterior: int, categoria_anterior: int, estado: str
+):
+    """
+    Mueve la solicitud, contada en ``estado``, de la categoría (y dependencia)
+    donde estaba a su categoría actual.
+    """
+    _sumar(
+        ContadorSolicitudes,
+        {
+            "dependencia_id": dependencia_anterior,
+            "categoria_id": categoria_anterior,
+            "estado": estado,
+        },
+        -1,
+    )
+    _sumar(
+        ContadorSolicitudes,
+        {
+            "dependencia_id": solicitud.categoria.dependencia_municipal_id,
+            "categoria_id": solicitud.categoria_id,
+            "estado": estado,
+        },
+        1,
+    )
+
+
+def reasignar_dependencia(categoria: Categoria):
+    """
+    Pasa a la dependencia actual de ``categoria`` los contadores de la
+    categoría que quedaron en otra dependencia.
+    """
+    with transaction.atomic():
+        anteriores = (
+            ContadorSolicitudes.objects.select_for_update()
+            .filter(categoria=categoria)
+            .exclude(dependencia_id=categoria.dependencia_municipal_id)
+        )
+        for contador in anteriores:
+            _sumar(
+                ContadorSolicitudes,
+                {
+                    "dependencia_id": categoria.dependencia_municipal_id,
+                    "categoria_id": categoria.pk,
+                    "estado": contador.estado,
+                },
+                contador.total,
+            )
+            contador.delete()
+
+
+def totales_por_estado(queryset) -> dict[str, int]:
+    """Agrupa un queryset de contadores en ``{estado: total}``."""
+    return {
+        fila["estado"]: fila["total"] or 0
+        for fila in queryset.values("estado").annotate(total=Sum("total"))
+    }
+
+
+def totales_dependencia(dependencia_id: int | None) -> dict[str, int]:
+    """Totales por estado de una dependencia; ``None`` devuelve todo el sistema."""
+    queryset = ContadorSolicitudes.objects.all()
+    if dependencia_id is not None:
+        queryset = queryset.filter(dependencia_id=dependencia_id)
+    return totales_por_estado(queryset)
+
+
+def totales_ciudadano(ciudadano_id: int) -> dict[str, int]:
+    """Totales por estado de las solicitudes de un ciudadano."""
+    return totales_por_estado(
+        ContadorSolicitudesCiudadano.objects.filter(ciudadano_id=ciudadano_id)
+    )
+
+
+def conteos_reales():
+    """
+    Recalcula los contadores desde la tabla de solicitudes.
+    Devuelve dos diccionarios ``{claves: total}`` (dependencia y ciudadano).
+    """
+    por_dependencia = {
+        (fila["dependencia_id"], fila["categoria_id"], fila["estado"]): fila["total"]
+        for fila in Solicitud.objects.values(
+            "categoria_id",
+            "estado",
+            dependencia_id=F("categoria__dependencia_municipal_id"),
+        ).annotate(total=Count("id"))
+    }
+    por_ciudadano = {
+        (fila["ciudadano_id"], fila["estado"]): fila["total"]
+        for fila in Solicitud.objects.values("ciudadano_id", "estado").annotate(
+            total=Count("id")
+        )
+    }
+    return por_dependencia, por_ciudadano
@@ -0,0 +1,127 @@
+"""
+Envío de los correos de notificación desde la bandeja de salida.
+
+``reclamar`` toma un lote de ``CorreoPendiente`` con ``SKIP LOCKED`` (varios
+procesos pueden despachar a la vez sin repetir filas) y aplaza su
+``proximo_intento``: si el proceso muere a media entrega, las filas vuelven a
+estar disponibles al vencer ese plazo. ``enviar_lote`` agrupa las filas por
+ciudadano en un solo correo (resumen) y los envía todos por una misma conexión
+SMTP. Los fallos se reintentan con espera exponencial hasta ``MAX_INTENTOS``.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from apps.solicitudes.notificaciones import CorreoPendiente
+
+TAMANO_LOTE = 200
+MAX_INTENTOS = 6
+ESPERA_BASE = timedelta(minutes=1)  # 1, 2, 4, 8... minutos entre intentos
+TIEMPO_MAXIMO = timedelta(minutes=10)  # plazo de un lote reclamado
+
+
+def reclamar(tamano: int = TAMANO_LOTE) -> list[int]:
+    """Ids de hasta ``tamano`` correos listos para enviarse, ya reclamados."""
+    ahora = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            CorreoPendiente.objects.select_for_update(skip_locked=True)
+            .filter(estado="pendiente", proximo_intento__lte=ahora)
+            .order_by("proximo_intento", "id")
+            .values_list("id", flat=True)[:tamano]
+        )
+        if ids:
+            CorreoPendiente.objects.filter(pk__in=ids).update(
+                proximo_intento=ahora + TIEMPO_MAXIMO
+            )
+    return ids
+
+
+def _mensaje(correo_destino: str, correos: list[CorreoPendiente], conexion) -> EmailMessage:
+    notificaciones = [correo.notificacion for correo in correos]
+    if len(notificaciones) == 1:
+        asunto = f"SAC Macuspana: {notificaciones[0].get_tipo_display()}"
+    else:
+        asunto = f"SAC Macuspana: tienes {len(notificaciones)} notificaciones nuevas"
+    cuerpo = "\n".join(f"- {notificacion.mensaje}" for notificacion in notificaciones)
+    return EmailMessage(
+        asunto,
+        f"{cuerpo}\n\nConsulta el detalle en el portal de atención ciudadana.",
+        settings.DEFAULT_FROM_EMAIL,
+        [correo_destino],
+        connection=conexion,
+    )
+
+
+def _reprogramar(correos: list[CorreoPendiente], error: str):
+    ahora = timezone.now()
+    for correo in correos:
+        correo.intentos += 1
+        correo.ultimo_error = error
+        if correo.intentos >= MAX_INTENTOS:
+            correo.estado = "fallido"
+        else:
+            correo.proximo_intento = ahora + ESPERA_BASE * 2 ** (correo.intentos - 1)
+        correo.save(update_fields=["intentos", "ultimo_error", "estado", "proximo_intento"])
+
+
+def enviar_lote(ids: list[int]) -> tuple[int, int]:
+    """
+    Envía los correos reclamados, un resumen por ciudadano y una sola conexión
+    SMTP para todo el lote. Devuelve ``(correos enviados, filas con fallo)``.
+    """
+    correos = (
+        CorreoPendiente.objects.filter(pk__in=ids)
+        .select_related("notificacion", "ciudadano")
+        .only(
+            "id",
+            "intentos",
+            "estado",
+            "proximo_intento",
+            "ultimo_error",
+            "ciudadano__correo",
+            "notificacion__tipo",
+            "notificacion__mensaje",
+        )
+        .order_by("id")
+    )
+    por_destino = defaultdict(list)
+    for correo in correos:
+        por_destino[correo.ciudadano.correo].append(correo)
+
+    sin_correo = por_destino.pop("", [])
+    if sin_correo:
+        CorreoPendiente.objects.filter(pk__in=[c.pk for c in sin_correo]).update(
+            estado="fallido", ultimo_error="El ciudadano no tiene correo"
+        )
+
+    enviados = fallidos = 0
+    conexion = get_connection()
+    try:
+        conexion.open()
+    except Exception as exc:
+        for grupo in por_destino.values():
+            _reprogramar(grupo, str(exc))
+            fallidos += len(grupo)
+        return 0, fallidos + len(sin_correo)
+
+    try:
+        for destino, grupo in por_destino.items():
+            try:
+                _mensaje(destino, grupo, conexion).send()
+            except Exception as exc:
+                _reprogramar(grupo, str(exc))
+                fallidos += len(grupo)
+                continue
+            CorreoPendiente.objects.filter(pk__in=[c.pk for c in grupo]).update(
+                estado="enviado", fecha_envio=timezone.now(), ultimo_error=""
+            )
+            enviados += 1
+    finally:
+        conexion.close()
+    return enviados, fallidos + len(sin_correo)
@@ -0,0 +1,79 @@
+from collections import Counter, defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.autenticacion.models import Usuario
+from apps.funcionarios.models import Funcionario
+from apps.solicitudes.models import Comentario
+
+
+class Command(BaseCommand):
+    help = 'Asigna Comentario.autor a partir del texto de creado_por, por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Comentarios procesados por lote (por defecto 1000)',
+        )
+
+    def handle(self, *args, **options):
+        tamano = options['lote']
+        por_nombre = self._usuarios_por_nombre_de_funcionario()
+
+        ultimo_pk = 0
+        asignados = sin_resolver = 0
+        while True:
+            # Recorrido por pk: cada lote usa el índice de la llave primaria
+            lote = list(
+                Comentario.objects.filter(autor__isnull=True, pk__gt=ultimo_pk)
+                .order_by('pk')
+                .values_list('pk', 'creado_por')[:tamano]
+            )
+            if not lote:
+                break
+            ultimo_pk = lote[-1][0]
+
+            textos = {creado_por for _, creado_por in lote}
+            por_usuario = dict(
+                Usuario.objects.filter(usuario__in=textos).values_list('usuario', 'id')
+            )
+
+            por_autor = defaultdict(list)
+            for pk, creado_por in lote:
+                autor_id = por_usuario.get(creado_por) or por_nombre.get(creado_por)
+                if autor_id is None:
+                    sin_resolver += 1
+                else:
+                    por_autor[autor_id].append(pk)
+
+            with transaction.atomic():
+                for autor_id, pks in por_autor.items():
+                    asignados += Comentario.objects.filter(pk__in=pks).update(
+                        autor_id=autor_id
+                    )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Comentarios con autor asignado: {asignados}. Sin resolver: {sin_resolver}.'
+            )
+        )
+
+    def _usuarios_por_nombre_de_funcionario(self):
+        """
+        ``{nombre_completo: usuario_id}`` para comentarios escritos antes de que
+        el funcionario tuviera usuario. Los nombres repetidos se omiten.
+        """
+        funcionarios = list(
+            Funcionario.objects.filter(usuario__isnull=False).values_list(
+                'nombre_completo', 'usuario_id'
+            )
+        )
+        repetidos = Counter(nombre for nombre, _ in funcionarios)
+        return {
+            nombre: usuario_id
+            for nombre, usuario_id in funcionarios
+            if repetidos[nombre] == 1
+        }
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.solicitudes.correos import TAMANO_LOTE, enviar_lote, reclamar
+
+
+class Command(BaseCommand):
+    help = 'Envía por correo las notificaciones de la bandeja de salida (CorreoPendiente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Envía los correos pendientes y termina',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5.0,
+            help='Segundos de espera cuando no hay correos pendientes',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Correos reclamados por lote (por defecto {TAMANO_LOTE})',
+        )
+
+    def handle(self, *args, **options):
+        total_enviados = total_fallidos = 0
+        while True:
+            ids = reclamar(options['lote'])
+            if not ids:
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+
+            enviados, fallidos = enviar_lote(ids)
+            total_enviados += enviados
+            total_fallidos += fallidos
+            if fallidos:
+                self.stderr.write(
+                    self.style.WARNING(f'{fallidos} notificaciones no se enviaron; se reintentarán.')
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Correos enviados: {total_enviados}. Notificaciones con fallo: {total_fallidos}.'
+            )
+        )
@@ -0,0 +1,92 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.solicitudes.contadores import (
+    ContadorSolicitudes,
+    ContadorSolicitudesCiudadano,
+    conteos_reales,
+)
+from apps.solicitudes.notificaciones import (
+    ContadorNotificaciones,
+    conteos_no_leidas_reales,
+)
+
+
+class Command(BaseCommand):
+    help = 'Detecta y corrige diferencias entre los contadores materializados y las solicitudes o notificaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--solo-verificar',
+            action='store_true',
+            help='Solo reporta las diferencias, sin corregirlas',
+        )
+
+    def handle(self, *args, **options):
+        solo_verificar = options['solo_verificar']
+
+        with transaction.atomic():
+            reales_dependencia, reales_ciudadano = conteos_reales()
+
+            diferencias = self._reconciliar(
+                ContadorSolicitudes,
+                ('dependencia_id', 'categoria_id', 'estado'),
+                reales_dependencia,
+                solo_verificar,
+            )
+            diferencias += self._reconciliar(
+                ContadorSolicitudesCiudadano,
+                ('ciudadano_id', 'estado'),
+                reales_ciudadano,
+                solo_verificar,
+            )
+            diferencias += self._reconciliar(
+                ContadorNotificaciones,
+                ('ciudadano_id',),
+                conteos_no_leidas_reales(),
+                solo_verificar,
+            )
+
+            if solo_verificar:
+                transaction.set_rollback(True)
+
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS('Los contadores están al día.'))
+        elif solo_verificar:
+            self.stdout.write(self.style.WARNING(f'Diferencias encontradas: {diferencias}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Diferencias corregidas: {diferencias}'))
+
+    def _reconciliar(self, modelo, campos, reales, solo_verificar):
+        """Compara cada fila con su conteo real y corrige las que no coinciden."""
+        actuales = {
+            tuple(fila[:-1]): (fila[-1], pk)
+            for pk, *fila in modelo.objects.select_for_update().values_list(
+                'pk', *campos, 'total'
+            )
+        }
+
+        diferencias = 0
+        for claves in actuales.keys() | reales.keys():
+            real = reales.get(claves, 0)
+            actual, pk = actuales.get(claves, (0, None))
+            if actual == real:
+                continue
+
+            diferencias += 1
+            self.stdout.write(
+                self.style.NOTICE(
+                    f'{modelo.__name__} {dict(zip(campos, claves))}: {actual} -> {real}'
+                )
+            )
+            if solo_verificar:
+                continue
+
+            if pk is None:
+                modelo.objects.create(total=real, **dict(zip(campos, claves)))
+            elif real == 0:
+                modelo.objects.filter(pk=pk).delete()
+            else:
+                modelo.objects.filter(pk=pk).update(total=real)
+
+        return diferencias
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:31
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def aproximar_tiempos_existentes(apps, schema_editor):
+    """
+    Las solicitudes anteriores no tienen transiciones registradas; se usa
+    fecha_actualizacion como mejor aproximación disponible.
+    """
+    Solicitud = apps.get_model("solicitudes", "Solicitud")
+    Solicitud.objects.exclude(estado="enviada").update(
+        fecha_visto=F("fecha_actualizacion")
+    )
+    Solicitud.objects.filter(estado__in=["completada", "rechazada"]).update(
+        fecha_resolucion=F("fecha_actualizacion")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitudes', '0002_notificacion_alter_categoria_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitud',
+            name='fecha_resolucion',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='solicitud',
+            name='fecha_visto',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='comentario',
+            name='archivo_adjunto',
+            field=models.FileField(blank=True, null=True, upload_to='comentarios/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'jpg', 'jpeg', 'png'])]),
+        ),
+        migrations.AlterField(
+            model_name='solicitud',
+            name='archivo_adjunto',
+            field=models.FileField(blank=True, null=True, upload_to='adjuntos/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'jpg', 'jpeg', 'png'])]),
+        ),
+        migrations.CreateModel(
+            name='TransicionSolicitud',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado_anterior', models.CharField(choices=[('enviada', 'Enviada'), ('visto', 'Visto'), ('completada', 'Completada'), ('rechazada', 'Rechazada')], max_length=20)),
+                ('estado_nuevo', models.CharField(choices=[('enviada', 'Enviada'), ('visto', 'Visto'), ('completada', 'Completada'), ('rechazada', 'Rechazada')], max_length=20)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('realizado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transiciones_solicitud', to=settings.AUTH_USER_MODEL)),
+                ('solicitud', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transiciones', to='solicitudes.solicitud')),
+            ],
+            options={
+                'verbose_name': 'Transición de solicitud',
+                'verbose_name_plural': 'Transiciones de solicitud',
+                'ordering': ['fecha'],
+                'indexes': [models.Index(fields=['solicitud', 'fecha'], include=('estado_nuevo',), name='transicion_solicitud_fecha')],
+            },
+        ),
+        migrations.RunPython(aproximar_tiempos_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def poblar_contadores(apps, schema_editor):
+    Solicitud = apps.get_model("solicitudes", "Solicitud")
+    ContadorSolicitudes = apps.get_model("solicitudes", "ContadorSolicitudes")
+    ContadorSolicitudesCiudadano = apps.get_model(
+        "solicitudes", "ContadorSolicitudesCiudadano"
+    )
+    # El manager histórico no excluye las solicitudes con borrado lógico
+    vigentes = Solicitud.objects.filter(deleted_at__isnull=True)
+
+    ContadorSolicitudes.objects.bulk_create(
+        ContadorSolicitudes(
+            dependencia_id=fila["dependencia_id"],
+            categoria_id=fila["categoria_id"],
+            estado=fila["estado"],
+            total=fila["total"],
+        )
+        for fila in vigentes.values(
+            "categoria_id",
+            "estado",
+            dependencia_id=F("categoria__dependencia_municipal_id"),
+        ).annotate(total=Count("id"))
+    )
+    ContadorSolicitudesCiudadano.objects.bulk_create(
+        ContadorSolicitudesCiudadano(
+            ciudadano_id=fila["ciudadano_id"],
+            estado=fila["estado"],
+            total=fila["total"],
+        )
+        for fila in vigentes.values("ciudadano_id", "estado").annotate(
+            total=Count("id")
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ciudadanos', '0002_ciudadano_sexo'),
+        ('dependecias_municipales', '0001_initial'),
+        ('solicitudes', '0003_transicionsolicitud'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorSolicitudes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('enviada', 'Enviada'), ('visto', 'Visto'), ('completada', 'Completada'), ('rechazada', 'Rechazada')], max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('categoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores_solicitudes', to='solicitudes.categoria')),
+                ('dependencia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores_solicitudes', to='dependecias_municipales.dependenciamunicipal')),
+            ],
+            options={
+                'verbose_name': 'Contador de solicitudes',
+                'verbose_name_plural': 'Contadores de solicitudes',
+                'constraints': [models.UniqueConstraint(fields=('dependencia', 'categoria', 'estado'), name='contador_solicitudes_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ContadorSolicitudesCiudadano',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('enviada', 'Enviada'), ('visto', 'Visto'), ('completada', 'Completada'), ('rechazada', 'Rechazada')], max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('ciudadano', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores_solicitudes', to='ciudadanos.ciudadano')),
+            ],
+            options={
+                'verbose_name': 'Contador de solicitudes por ciudadano',
+                'verbose_name_plural': 'Contadores de solicitudes por ciudadano',
+                'constraints': [models.UniqueConstraint(fields=('ciudadano', 'estado'), name='contador_solicitudes_ciudadano_unico')],
+            },
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
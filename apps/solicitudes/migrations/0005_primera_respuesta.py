@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:02
+
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery
+
+
+def poblar_primera_respuesta(apps, schema_editor):
+    Solicitud = apps.get_model("solicitudes", "Solicitud")
+    Comentario = apps.get_model("solicitudes", "Comentario")
+    primer_comentario = (
+        Comentario.objects.filter(solicitud=OuterRef("pk"))
+        .order_by()
+        .values("solicitud")
+        .annotate(primera=Min("fecha_creacion"))
+        .values("primera")
+    )
+    # Incluye las solicitudes con borrado lógico, igual que Comentario.save
+    Solicitud.objects.filter(pk__in=Comentario.objects.values("solicitud_id")).update(
+        primera_respuesta_en=Subquery(primer_comentario)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ciudadanos', '0002_ciudadano_sexo'),
+        ('solicitudes', '0004_contadores_solicitudes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitud',
+            name='primera_respuesta_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['solicitud', 'fecha_creacion'], name='comentario_solicitud_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['fecha_creacion'], include=('categoria', 'primera_respuesta_en'), name='solicitud_primera_respuesta'),
+        ),
+        migrations.RunPython(poblar_primera_respuesta, migrations.RunPython.noop),
+    ]
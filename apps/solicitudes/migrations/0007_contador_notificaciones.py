@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def poblar_contadores(apps, schema_editor):
+    Notificacion = apps.get_model("solicitudes", "Notificacion")
+    ContadorNotificaciones = apps.get_model("solicitudes", "ContadorNotificaciones")
+    ContadorNotificaciones.objects.bulk_create(
+        ContadorNotificaciones(ciudadano_id=fila["ciudadano_id"], total=fila["total"])
+        for fila in Notificacion.objects.filter(leida=False)
+        .values("ciudadano_id")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ciudadanos', '0002_ciudadano_sexo'),
+        ('solicitudes', '0006_comentario_autor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorNotificaciones',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(default=0)),
+                ('ciudadano', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='contador_notificaciones', to='ciudadanos.ciudadano')),
+            ],
+            options={
+                'verbose_name': 'Contador de notificaciones',
+                'verbose_name_plural': 'Contadores de notificaciones',
+            },
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
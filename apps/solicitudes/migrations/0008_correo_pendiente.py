@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ciudadanos', '0002_ciudadano_sexo'),
+        ('solicitudes', '0007_contador_notificaciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorreoPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_envio', models.DateTimeField(blank=True, null=True)),
+                ('ciudadano', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='correos_pendientes', to='ciudadanos.ciudadano')),
+                ('notificacion', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='correo', to='solicitudes.notificacion')),
+            ],
+            options={
+                'verbose_name': 'Correo pendiente',
+                'verbose_name_plural': 'Correos pendientes',
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='correo_estado_proximo')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ciudadanos', '0002_ciudadano_sexo'),
+        ('solicitudes', '0008_correo_pendiente'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notificacion',
+            name='solicitudes_leida_077e3e_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(condition=models.Q(('leida', False)), fields=['ciudadano', '-fecha_creacion', '-id'], name='notificacion_no_leidas'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitudes', '0009_notificacion_no_leidas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transicionsolicitud',
+            name='solicitud',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', related_query_name='transiciones', to='solicitudes.solicitud'),
+        ),
+    ]
@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Min, OuterRef, Subquery
 from django.core.validators import FileExtensionValidator
+from django.utils import timezone
 from django_softdelete.models import SoftDeleteModel
 
+from apps.autenticacion.models import Usuario
 from apps.ciudadanos.models import Ciudadano
 from apps.dependecias_municipales.models import DependenciaMunicipal
 
@@ -33,6 +36,7 @@ class Solicitud(SoftDeleteModel):
         ("completada", "Completada"),
         ("rechazada", "Rechazada"),
     ]
+    ESTADOS_FINALES = ("completada", "rechazada")
 
     folio = models.CharField(max_length=100, unique=True, db_index=True)
     categoria = models.ForeignKey(
@@ -51,6 +55,11 @@ class Solicitud(SoftDeleteModel):
     )
     fecha_creacion = models.DateTimeField(auto_now_add=True, db_index=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
+    # Tiempos exactos derivados de TransicionSolicitud (no cambian con ediciones)
+    fecha_visto = models.DateTimeField(blank=True, null=True)
+    fecha_resolucion = models.DateTimeField(blank=True, null=True)
+    # Fecha del primer comentario; la mantiene Comentario.save/delete
+    primera_respuesta_en = models.DateTimeField(blank=True, null=True)
     estado = models.CharField(
         max_length=20, choices=ESTADOS_CHOICES, default="enviada", db_index=True
     )
@@ -65,11 +74,117 @@ class Solicitud(SoftDeleteModel):
         indexes = [
             models.Index(fields=["ciudadano", "-fecha_creacion"]),
             models.Index(fields=["estado", "-fecha_creacion"]),
+            # Tiempo de primera respuesta por rango de fechas sin leer la tabla
+            models.Index(
+                fields=["fecha_creacion"],
+                include=["categoria", "primera_respuesta_en"],
+                name="solicitud_primera_respuesta",
+            ),
         ]
 
     def __str__(self):
         return f"{self.folio} - {self.ciudadano.nombre_completo}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Categoría leída, para detectar sin consultar si cambia al guardar
+        # (ver signals.leer_categoria_previa)
+        instancia._categoria_cargada = instancia.__dict__.get("categoria_id")
+        return instancia
+
+    @property
+    def transiciones(self):
+        """Bitácora de cambios de estado (ver ``TransicionSolicitud.solicitud``)."""
+        return TransicionSolicitud.objects.filter(solicitud=self)
+
+    def cambiar_estado(self, nuevo_estado: str, usuario=None):
+        """
+        Cambia el estado registrando la transición.
+
+        - ``fecha_visto``: primera vez que la solicitud sale de "enviada".
+        - ``fecha_resolucion``: última entrada a un estado final; se limpia si
+          la solicitud se reabre.
+
+        Devuelve la ``TransicionSolicitud`` creada o ``None`` si el estado no cambia.
+        """
+        if nuevo_estado == self.estado:
+            return None
+
+        ahora = timezone.now()
+        anterior = self.estado
+
+        self.estado = nuevo_estado
+        if self.fecha_visto is None:
+            self.fecha_visto = ahora
+        if nuevo_estado in self.ESTADOS_FINALES:
+            self.fecha_resolucion = ahora
+        else:
+            self.fecha_resolucion = None
+
+        from apps.solicitudes.contadores import registrar_estado
+
+        with transaction.atomic():
+            self.save()
+            registrar_estado(self, estado_anterior=anterior)
+            return TransicionSolicitud.objects.create(
+                solicitud=self,
+                estado_anterior=anterior,
+                estado_nuevo=nuevo_estado,
+                fecha=ahora,
+                realizado_por_id=getattr(usuario, "id", None),
+            )
+
+
+class TransicionSolicitud(models.Model):
+    """
+    Bitácora de solo inserción con cada cambio de estado de una solicitud.
+    Es la fuente de los tiempos de respuesta y resolución.
+    """
+
+    # Relación inversa oculta: así el borrado lógico de django-softdelete no
+    # recorre la bitácora, que se conserva con la solicitud borrada y vuelve al
+    # restaurarla. El borrado físico la elimina en cascada por SQL.
+    solicitud = models.ForeignKey(
+        Solicitud,
+        on_delete=models.CASCADE,
+        related_name="+",
+        related_query_name="transiciones",
+    )
+    estado_anterior = models.CharField(max_length=20, choices=Solicitud.ESTADOS_CHOICES)
+    estado_nuevo = models.CharField(max_length=20, choices=Solicitud.ESTADOS_CHOICES)
+    fecha = models.DateTimeField(default=timezone.now)
+    realizado_por = models.ForeignKey(
+        Usuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="transiciones_solicitud",
+    )
+
+    class Meta:
+        ordering = ["fecha"]
+        verbose_name = "Transición de solicitud"
+        verbose_name_plural = "Transiciones de solicitud"
+        indexes = [
+            models.Index(
+                fields=["solicitud", "fecha"],
+                include=["estado_nuevo"],
+                name="transicion_solicitud_fecha",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.solicitud_id}: {self.estado_anterior} -> {self.estado_nuevo}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Las transiciones de solicitud no se pueden modificar")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Las transiciones de solicitud no se pueden eliminar")
+
 
 class Comentario(models.Model):
     solicitud = models.ForeignKey(
@@ -90,11 +205,59 @@ class Comentario(models.Model):
     creado_por = models.CharField(
         max_length=100, default="Sistema"
     )  # Nombre de quien crea el comentario
+    autor = models.ForeignKey(
+        Usuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="comentarios",
+    )
 
     class Meta:
         ordering = ["fecha_creacion"]
         verbose_name = "Comentario"
         verbose_name_plural = "Comentarios"
+        indexes = [
+            models.Index(
+                fields=["solicitud", "fecha_creacion"], name="comentario_solicitud_fecha"
+            ),
+            models.Index(
+                fields=["autor", "fecha_creacion"], name="comentario_autor_fecha"
+            ),
+        ]
 
     def __str__(self):
         return f"Comentario en {self.solicitud.folio} - {self.fecha_creacion}"
+
+    def save(self, *args, **kwargs):
+        nuevo = self.pk is None
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if nuevo:
+                # Actualización condicional: solo el primer comentario la fija
+                Solicitud.global_objects.filter(
+                    pk=self.solicitud_id, primera_respuesta_en__isnull=True
+                ).update(primera_respuesta_en=self.fecha_creacion)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            resultado = super().delete(*args, **kwargs)
+            recalcular_primera_respuesta(
+                Solicitud.global_objects.filter(pk=self.solicitud_id)
+            )
+        return resultado
+
+
+def recalcular_primera_respuesta(solicitudes) -> int:
+    """
+    Recalcula ``primera_respuesta_en`` de ``solicitudes`` con un ``MIN`` por
+    solicitud sobre el índice ``(solicitud, fecha_creacion)`` de comentarios.
+    """
+    primer_comentario = (
+        Comentario.objects.filter(solicitud=OuterRef("pk"))
+        .order_by()
+        .values("solicitud")
+        .annotate(primera=Min("fecha_creacion"))
+        .values("primera")
+    )
+    return solicitudes.update(primera_respuesta_en=Subquery(primer_comentario))
@@ -1,6 +1,41 @@
-from django.db import models
+import time
+from collections import Counter
+from functools import partial
+
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
 from apps.ciudadanos.models import Ciudadano
+from apps.solicitudes.contadores import _sumar
 from apps.solicitudes.models import Solicitud
+from apps.solicitudes.tiempo_real import publicar_notificacion
+from apps.utils.transacciones import RecolectorTransaccion
+
+# El conteo se guarda bajo la versión vigente del ciudadano; cada cambio del
+# contador incrementa la versión al confirmarse. Un lector que leyó el
+# contador antes del commit guarda su valor bajo la versión vieja, que ya
+# nadie consulta.
+CACHE_NO_LEIDAS = "notificaciones:no_leidas:{}:{}"
+CACHE_NO_LEIDAS_VERSION = "notificaciones:no_leidas:version:{}"
+CACHE_NO_LEIDAS_TTL = 30
+
+
+class NotificacionQuerySet(models.QuerySet):
+    def marcar_leidas(self, ciudadano_id: int, ahora=None) -> int:
+        """
+        Marca como leídas las notificaciones no leídas de ``ciudadano_id`` dentro
+        del queryset con un solo ``UPDATE``, descuenta las que cambiaron de su
+        contador y devuelve cuántas fueron.
+        """
+        with transaction.atomic():
+            marcadas = self.filter(ciudadano_id=ciudadano_id, leida=False).update(
+                leida=True, fecha_lectura=ahora or timezone.now()
+            )
+            if marcadas:
+                sumar_no_leidas(ciudadano_id, -marcadas)
+        return marcadas
 
 
 class Notificacion(models.Model):
@@ -30,11 +65,19 @@ class Notificacion(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_lectura = models.DateTimeField(null=True, blank=True)
 
+    objects = NotificacionQuerySet.as_manager()
+
     class Meta:
         ordering = ["-fecha_creacion"]
         indexes = [
             models.Index(fields=["ciudadano", "-fecha_creacion"]),
-            models.Index(fields=["leida"]),
+            # Solo las no leídas: el índice se mantiene pequeño aunque crezca
+            # el historial, y marcarlas como leídas las saca de él
+            models.Index(
+                fields=["ciudadano", "-fecha_creacion", "-id"],
+                condition=models.Q(leida=False),
+                name="notificacion_no_leidas",
+            ),
         ]
         verbose_name = "Notificación"
         verbose_name_plural = "Notificaciones"
@@ -42,10 +85,201 @@ class Notificacion(models.Model):
     def __str__(self):
         return f"Notificación para {self.ciudadano.nombre_completo} - {self.get_tipo_display()}"
 
+    def save(self, *args, **kwargs):
+        # post_save (contador y bandeja de salida) queda en la misma transacción
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def marcar_como_leida(self):
         """Marca la notificación como leída"""
-        from django.utils import timezone
-
+        if self.leida:
+            return
+        ahora = timezone.now()
+        # UPDATE condicionado a leida=False: si otra petición la marcó antes,
+        # el contador no se descuenta dos veces
+        Notificacion.objects.filter(pk=self.pk).marcar_leidas(self.ciudadano_id, ahora)
         self.leida = True
-        self.fecha_lectura = timezone.now()
-        self.save()
+        self.fecha_lectura = ahora
+
+
+class ContadorNotificaciones(models.Model):
+    """
+    Notificaciones no leídas de cada ciudadano. Se mantiene al crear, leer y
+    borrar notificaciones para que el conteo que consulta la app no recorra
+    la tabla de notificaciones.
+    """
+
+    ciudadano = models.OneToOneField(
+        Ciudadano, on_delete=models.CASCADE, related_name="contador_notificaciones"
+    )
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Contador de notificaciones"
+        verbose_name_plural = "Contadores de notificaciones"
+
+    def __str__(self):
+        return f"{self.ciudadano_id}: {self.total} no leídas"
+
+
+class CorreoPendiente(models.Model):
+    """
+    Bandeja de salida de correos: una fila por notificación, escrita en la
+    misma transacción que la crea. El comando ``enviar_correos_notificaciones``
+    la vacía (ver ``apps.solicitudes.correos``) sin bloquear la petición.
+    """
+
+    ESTADOS = [
+        ("pendiente", "Pendiente"),
+        ("enviado", "Enviado"),
+        ("fallido", "Fallido"),
+    ]
+
+    notificacion = models.OneToOneField(
+        Notificacion, on_delete=models.CASCADE, related_name="correo"
+    )
+    ciudadano = models.ForeignKey(
+        Ciudadano, on_delete=models.CASCADE, related_name="correos_pendientes"
+    )
+    estado = models.CharField(max_length=20, choices=ESTADOS, default="pendiente")
+    intentos = models.PositiveSmallIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_envio = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Correo pendiente"
+        verbose_name_plural = "Correos pendientes"
+        indexes = [
+            models.Index(
+                fields=["estado", "proximo_intento"], name="correo_estado_proximo"
+            )
+        ]
+
+    def __str__(self):
+        return f"Correo de la notificación {self.notificacion_id} ({self.estado})"
+
+
+def encolar_correos(notificaciones):
+    """
+    Agrega a la bandeja de salida un correo por notificación. Debe llamarse en
+    la misma transacción que crea las notificaciones.
+    """
+    CorreoPendiente.objects.bulk_create(
+        CorreoPendiente(notificacion_id=notificacion.id, ciudadano_id=notificacion.ciudadano_id)
+        for notificacion in notificaciones
+    )
+
+
+def _version_inicial() -> int:
+    # Basada en el reloj para no reutilizar versiones si la caché se vacía
+    return time.time_ns() // 1000
+
+
+def _version_no_leidas(ciudadano_id: int) -> int:
+    clave = CACHE_NO_LEIDAS_VERSION.format(ciudadano_id)
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, _version_inicial(), timeout=None)
+        version = cache.get(clave)
+    return version
+
+
+def _nueva_version_no_leidas(ciudadano_id: int):
+    clave = CACHE_NO_LEIDAS_VERSION.format(ciudadano_id)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        # La versión no existe (expulsada o primera vez)
+        cache.add(clave, _version_inicial(), timeout=None)
+
+
+def _invalidar_no_leidas(ciudadano_id: int):
+    transaction.on_commit(partial(_nueva_version_no_leidas, ciudadano_id))
+
+
+def sumar_no_leidas(ciudadano_id: int, delta: int):
+    """
+    Suma ``delta`` al contador de no leídas de ``ciudadano_id``. Debe llamarse
+    en la misma transacción que crea o marca las notificaciones.
+    """
+    if delta > 0:
+        _sumar(ContadorNotificaciones, {"ciudadano_id": ciudadano_id}, delta)
+    else:
+        # Al descontar no se crea la fila: el ciudadano puede estar borrándose
+        ContadorNotificaciones.objects.filter(ciudadano_id=ciudadano_id).update(
+            total=F("total") + delta
+        )
+    _invalidar_no_leidas(ciudadano_id)
+
+
+def no_leidas_de(ciudadano_id: int) -> int:
+    """Conteo de no leídas desde la caché o, si no está, desde el contador."""
+    clave = CACHE_NO_LEIDAS.format(ciudadano_id, _version_no_leidas(ciudadano_id))
+    total = cache.get(clave)
+    if total is None:
+        total = (
+            ContadorNotificaciones.objects.filter(ciudadano_id=ciudadano_id)
+            .values_list("total", flat=True)
+            .first()
+            or 0
+        )
+        # add: nunca pisa un valor guardado bajo esta versión
+        cache.add(clave, total, CACHE_NO_LEIDAS_TTL)
+    return total
+
+
+def conteos_no_leidas_reales() -> dict[tuple, int]:
+    """``{(ciudadano_id,): no_leidas}`` recalculado desde las notificaciones."""
+    return {
+        (fila["ciudadano_id"],): fila["total"]
+        for fila in Notificacion.objects.filter(leida=False)
+        .values("ciudadano_id")
+        .annotate(total=Count("id"))
+    }
+
+
+class RecolectorNotificaciones(RecolectorTransaccion):
+    """
+    Notificaciones pendientes de la transacción en curso; al confirmarse se
+    crean todas con un solo ``bulk_create``. Las agregadas en un savepoint
+    revertido no se crean.
+    """
+
+    # La transacción ya se confirmó: un fallo se registra y no llega al cliente
+    robusto = True
+
+    def vaciar(self, notificaciones):
+        crear_notificaciones(notificaciones)
+
+
+def notificar(notificacion: Notificacion):
+    """
+    Crea ``notificacion`` al confirmarse la transacción actual, junto con las
+    demás notificaciones de esa transacción; sin transacción, de inmediato.
+    """
+    RecolectorNotificaciones.agregar(notificacion)
+
+
+def crear_notificaciones(notificaciones: list[Notificacion]) -> list[Notificacion]:
+    """
+    Inserta ``notificaciones`` con un ``bulk_create`` y hace lo que ``post_save``
+    haría por cada una: correo en la bandeja de salida, contador de no leídas
+    y difusión en tiempo real.
+    """
+    if not notificaciones:
+        return []
+
+    def publicar():
+        for notificacion in creadas:
+            publicar_notificacion(notificacion)
+
+    with transaction.atomic():
+        creadas = Notificacion.objects.bulk_create(notificaciones)
+        encolar_correos(creadas)
+        por_ciudadano = Counter(n.ciudadano_id for n in creadas if not n.leida)
+        for ciudadano_id, cantidad in por_ciudadano.items():
+            sumar_no_leidas(ciudadano_id, cantidad)
+        transaction.on_commit(publicar)
+    return creadas
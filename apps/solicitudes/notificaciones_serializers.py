@@ -29,3 +29,26 @@ class NotificacionSerializer(serializers.ModelSerializer):
             "fecha_creacion",
             "fecha_lectura",
         ]
+
+
+MAX_IDS_POR_LOTE = 500
+MAX_ID = 2**63 - 1  # límite de BigAutoField
+
+
+class MarcarLeidasSerializer(serializers.Serializer):
+    """Cuerpo de ``marcar_leidas``: ``ids`` o ``hasta_id``"""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MAX_ID),
+        max_length=MAX_IDS_POR_LOTE,
+        required=False,
+    )
+    hasta_id = serializers.IntegerField(min_value=1, max_value=MAX_ID, required=False)
+
+    def validate(self, attrs):
+        if "ids" not in attrs and "hasta_id" not in attrs:
+            raise serializers.ValidationError(
+                f"Envíe 'ids' (lista de hasta {MAX_IDS_POR_LOTE} enteros) o "
+                "'hasta_id' (entero)"
+            )
+        return attrs
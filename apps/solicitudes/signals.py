@@ -1,59 +1,203 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from apps.solicitudes.models import Solicitud, Comentario
-from apps.solicitudes.notificaciones import Notificacion
+from apps.solicitudes.models import Categoria, Solicitud, Comentario
+from apps.solicitudes.notificaciones import (
+    Notificacion,
+    encolar_correos,
+    notificar,
+    sumar_no_leidas,
+)
+from apps.solicitudes.contadores import (
+    reasignar_dependencia,
+    registrar_categoria,
+    registrar_estado,
+    registrar_vigencia,
+)
+from apps.solicitudes.tiempo_real import publicar_notificacion
+
+
+def _notificar_solicitud(solicitud, tipo, mensaje):
+    # solicitud ya está cargada: se asigna sin consultar y el ciudadano va por id
+    notificar(
+        Notificacion(
+            solicitud=solicitud,
+            ciudadano_id=solicitud.ciudadano_id,
+            tipo=tipo,
+            mensaje=mensaje,
+        )
+    )
 
 
 @receiver(post_save, sender=Solicitud)
 def crear_notificacion_solicitud(sender, instance, created, **kwargs):
     """
-    Crea una notificación cuando se crea o actualiza una solicitud
+    Crea una notificación cuando se crea o actualiza una solicitud.
+    Se inserta al confirmar la transacción, junto con las demás.
     """
     if created:
         # Nueva solicitud creada
-        Notificacion.objects.create(
-            solicitud=instance,
-            ciudadano=instance.ciudadano,
-            tipo="solicitud_creada",
-            mensaje=f'Tu solicitud "{instance.folio}" ha sido registrada exitosamente.',
+        _notificar_solicitud(
+            instance,
+            "solicitud_creada",
+            f'Tu solicitud "{instance.folio}" ha sido registrada exitosamente.',
         )
     else:
         # Solicitud actualizada - crear notificación según el estado
         if instance.estado == "completada":
-            Notificacion.objects.create(
-                solicitud=instance,
-                ciudadano=instance.ciudadano,
-                tipo="solicitud_completada",
-                mensaje=f'Tu solicitud "{instance.folio}" ha sido completada.',
+            _notificar_solicitud(
+                instance,
+                "solicitud_completada",
+                f'Tu solicitud "{instance.folio}" ha sido completada.',
             )
         elif instance.estado == "rechazada":
-            Notificacion.objects.create(
-                solicitud=instance,
-                ciudadano=instance.ciudadano,
-                tipo="solicitud_rechazada",
-                mensaje=f'Tu solicitud "{instance.folio}" ha sido rechazada. Revisa los comentarios para más detalles.',
+            _notificar_solicitud(
+                instance,
+                "solicitud_rechazada",
+                f'Tu solicitud "{instance.folio}" ha sido rechazada. Revisa los comentarios para más detalles.',
             )
         elif instance.estado == "visto":
-            Notificacion.objects.create(
-                solicitud=instance,
-                ciudadano=instance.ciudadano,
-                tipo="solicitud_actualizada",
-                mensaje=f'Tu solicitud "{instance.folio}" está siendo revisada.',
+            _notificar_solicitud(
+                instance,
+                "solicitud_actualizada",
+                f'Tu solicitud "{instance.folio}" está siendo revisada.',
             )
 
 
+@receiver(post_save, sender=Solicitud)
+def contar_solicitud_creada(sender, instance, created, **kwargs):
+    """
+    Suma la nueva solicitud a los contadores materializados.
+    Los cambios de estado se cuentan en Solicitud.cambiar_estado.
+    """
+    if created:
+        registrar_estado(instance)
+
+
+@receiver(pre_save, sender=Solicitud)
+def leer_vigencia_previa(sender, instance, update_fields=None, **kwargs):
+    """
+    Guarda si la fila estaba borrada antes del guardado que toca ``deleted_at``
+    (``delete``/``restore`` de django-softdelete) para ajustar los contadores
+    solo en la transición y no contar dos veces.
+    """
+    if instance._state.adding or not update_fields or "deleted_at" not in update_fields:
+        return
+    filas = Solicitud.global_objects.filter(pk=instance.pk)
+    if transaction.get_connection().in_atomic_block:
+        filas = filas.select_for_update()
+    instance._borrada_antes = filas.values_list("deleted_at", flat=True).first() is not None
+
+
+@receiver(post_save, sender=Solicitud)
+def contar_vigencia(sender, instance, created, update_fields=None, **kwargs):
+    """Descuenta la solicitud al borrarla lógicamente y la suma al restaurarla."""
+    borrada_antes = instance.__dict__.pop("_borrada_antes", None)
+    if created or borrada_antes is None:
+        return
+    borrada = instance.deleted_at is not None
+    if borrada != borrada_antes:
+        registrar_vigencia(instance, -1 if borrada else 1)
+
+
+def _guarda_categoria(update_fields) -> bool:
+    return not update_fields or bool({"categoria", "categoria_id"} & set(update_fields))
+
+
+@receiver(pre_save, sender=Solicitud)
+def leer_categoria_previa(sender, instance, update_fields=None, **kwargs):
+    """
+    Si la categoría cambió desde que se leyó la solicitud, guarda dónde está
+    contada (dependencia, categoría y estado guardados) para moverla en los
+    contadores. Sin cambio de categoría no consulta nada.
+    """
+    cargada = instance.__dict__.get("_categoria_cargada")
+    if (
+        instance._state.adding
+        or cargada is None
+        or cargada == instance.categoria_id
+        or not _guarda_categoria(update_fields)
+    ):
+        return
+    filas = Solicitud.global_objects.filter(pk=instance.pk, deleted_at__isnull=True)
+    if transaction.get_connection().in_atomic_block:
+        filas = filas.select_for_update(of=("self",))
+    instance._contada_en = filas.values_list(
+        "categoria__dependencia_municipal_id", "categoria_id", "estado"
+    ).first()
+
+
+@receiver(post_save, sender=Solicitud)
+def contar_cambio_categoria(sender, instance, created, update_fields=None, **kwargs):
+    """Mueve la solicitud vigente a su nueva categoría en los contadores."""
+    contada_en = instance.__dict__.pop("_contada_en", None)
+    if created or _guarda_categoria(update_fields):
+        instance._categoria_cargada = instance.categoria_id
+    if contada_en and contada_en[1] != instance.categoria_id:
+        registrar_categoria(instance, *contada_en)
+
+
+@receiver(post_save, sender=Categoria)
+def contar_cambio_dependencia(sender, instance, created, **kwargs):
+    """Pasa los contadores de la categoría a su dependencia actual."""
+    if not created:
+        reasignar_dependencia(instance)
+
+
 @receiver(post_save, sender=Comentario)
 def crear_notificacion_comentario(sender, instance, created, **kwargs):
     """
     Crea una notificación cuando se añade un comentario a una solicitud
     """
-    if created:
-        Notificacion.objects.create(
-            solicitud=instance.solicitud,
-            ciudadano=instance.solicitud.ciudadano,
+    if not created:
+        return
+    if Comentario._meta.get_field("solicitud").is_cached(instance):
+        _notificar_solicitud(
+            instance.solicitud,
+            "comentario_nuevo",
+            f'Hay un nuevo comentario en tu solicitud "{instance.solicitud.folio}".',
+        )
+        return
+    # Solo los dos campos necesarios, sin cargar la solicitud ni el ciudadano
+    ciudadano_id, folio = Solicitud.global_objects.filter(pk=instance.solicitud_id).values_list(
+        "ciudadano_id", "folio"
+    ).get()
+    notificar(
+        Notificacion(
+            solicitud_id=instance.solicitud_id,
+            ciudadano_id=ciudadano_id,
             tipo="comentario_nuevo",
-            mensaje=f'Hay un nuevo comentario en tu solicitud "{instance.solicitud.folio}".',
+            mensaje=f'Hay un nuevo comentario en tu solicitud "{folio}".',
         )
+    )
+
+
+@receiver(post_save, sender=Notificacion)
+def contar_notificacion_creada(sender, instance, created, **kwargs):
+    """Suma la notificación nueva al contador de no leídas del ciudadano."""
+    if created and not instance.leida:
+        sumar_no_leidas(instance.ciudadano_id, 1)
+
+
+@receiver(post_save, sender=Notificacion)
+def encolar_correo_notificacion(sender, instance, created, **kwargs):
+    """Deja el correo de la notificación en la bandeja de salida."""
+    if created:
+        encolar_correos([instance])
+
+
+@receiver(post_save, sender=Notificacion)
+def difundir_notificacion(sender, instance, created, **kwargs):
+    """Envía la notificación nueva a las conexiones SSE una vez confirmada."""
+    if created:
+        transaction.on_commit(lambda: publicar_notificacion(instance))
+
+
+@receiver(post_delete, sender=Notificacion)
+def descontar_notificacion_borrada(sender, instance, **kwargs):
+    """Descuenta del contador las notificaciones no leídas que se borran."""
+    if not instance.leida:
+        sumar_no_leidas(instance.ciudadano_id, -1)
 
 
 # Registrar los signals cuando se importe este módulo
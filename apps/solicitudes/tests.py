@@ -0,0 +1,701 @@
+import asyncio
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.autenticacion.models import Usuario
+from apps.autenticacion.serializers import CustomTokenObtainPairSerializer
+from apps.ciudadanos.models import Ciudadano
+from apps.dependecias_municipales.models import DependenciaMunicipal
+from apps.funcionarios.models import Funcionario
+from apps.localidades.models import Localidad
+from apps.solicitudes.models import (
+    Categoria,
+    Comentario,
+    Solicitud,
+    TransicionSolicitud,
+    recalcular_primera_respuesta,
+)
+from apps.solicitudes.correos import enviar_lote, reclamar
+from apps.solicitudes.notificaciones import (
+    ContadorNotificaciones,
+    CorreoPendiente,
+    Notificacion,
+)
+from apps.solicitudes.tiempo_real import hub
+
+
+class SolicitudesBaseTestCase(TestCase):
+    """Datos mínimos: una dependencia con categoría, un ciudadano y un funcionario."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.localidad = Localidad.objects.create(
+            codigo_postal="86700",
+            colonia="Centro",
+            municipio="Macuspana",
+            estado="Tabasco",
+            tipo="Colonia",
+        )
+        cls.dependencia = DependenciaMunicipal.objects.create(nombre="Obras Públicas")
+        cls.categoria = Categoria.objects.create(
+            nombre="Bacheo", dependencia_municipal=cls.dependencia
+        )
+
+        cls.usuario_ciudadano = Usuario.objects.create_user(
+            "ABCD000101HTCRRR01", "ciudadano", "secreto123"
+        )
+        cls.ciudadano = Ciudadano.objects.create(
+            curp="ABCD000101HTCRRR01",
+            nombre="Ana",
+            apellido_paterno="Pérez",
+            fecha_nacimiento="2000-01-01",
+            correo="ana@example.com",
+            telefono="9931234567",
+            localidad=cls.localidad,
+            calle="Juárez",
+            numero_exterior="1",
+            usuario=cls.usuario_ciudadano,
+        )
+
+        cls.usuario_funcionario = Usuario.objects.create_user(
+            "funcionario@example.com", "funcionario", "secreto123"
+        )
+        cls.funcionario = Funcionario.objects.create(
+            nombre_completo="Luis Gómez",
+            correo="funcionario@example.com",
+            telefono="9937654321",
+            cargo="Director",
+            sexo="M",
+            dependencia=cls.dependencia,
+            usuario=cls.usuario_funcionario,
+        )
+
+    def setUp(self):
+        # La caché de analítica vive fuera de la transacción de cada prueba
+        cache.clear()
+
+    def crear_solicitudes(self, cantidad, comentarios=0):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self._crear_solicitudes(cantidad, comentarios)
+
+    def _crear_solicitudes(self, cantidad, comentarios):
+        inicio = Solicitud.objects.count()
+        solicitudes = []
+        for i in range(inicio, inicio + cantidad):
+            solicitud = Solicitud.objects.create(
+                folio=f"SOL-TEST-{i:05d}",
+                categoria=self.categoria,
+                descripcion="Bache frente a la escuela primaria.",
+                ciudadano=self.ciudadano,
+            )
+            for j in range(comentarios):
+                Comentario.objects.create(
+                    solicitud=solicitud,
+                    texto=f"Comentario {j}",
+                    creado_por=str(self.usuario_funcionario),
+                    autor=self.usuario_funcionario,
+                )
+            solicitudes.append(solicitud)
+        return solicitudes
+
+    def cliente(self, usuario):
+        client = APIClient()
+        client.force_authenticate(usuario)
+        return client
+
+    def cliente_jwt(self, usuario):
+        """Cliente autenticado con un token real, como lo usa el frontend."""
+        token = CustomTokenObtainPairSerializer.get_token(usuario).access_token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client
+
+    def contar_consultas(self, client, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx.captured_queries)
+
+
+class ConsultasSolicitudesTests(SolicitudesBaseTestCase):
+    def test_listado_funcionario_numero_fijo_de_consultas(self):
+        client = self.cliente(self.usuario_funcionario)
+
+        self.crear_solicitudes(2)
+        pocas = self.contar_consultas(client, "/api/v1/solicitudes/")
+
+        self.crear_solicitudes(15)
+        muchas = self.contar_consultas(client, "/api/v1/solicitudes/")
+
+        self.assertEqual(pocas, muchas)
+
+    def test_mis_solicitudes_numero_fijo_de_consultas(self):
+        client = self.cliente(self.usuario_ciudadano)
+
+        self.crear_solicitudes(2)
+        pocas = self.contar_consultas(client, "/api/v1/solicitudes/mis_solicitudes/")
+
+        self.crear_solicitudes(15)
+        muchas = self.contar_consultas(
+            client, "/api/v1/solicitudes/mis_solicitudes/"
+        )
+
+        self.assertEqual(pocas, muchas)
+
+    def test_detalles_numero_fijo_de_consultas(self):
+        client = self.cliente(self.usuario_funcionario)
+
+        (con_uno,) = self.crear_solicitudes(1, comentarios=1)
+        (con_muchos,) = self.crear_solicitudes(1, comentarios=12)
+
+        uno = self.contar_consultas(
+            client, f"/api/v1/solicitudes/{con_uno.pk}/detalles/"
+        )
+        muchos = self.contar_consultas(
+            client, f"/api/v1/solicitudes/{con_muchos.pk}/detalles/"
+        )
+
+        self.assertEqual(uno, muchos)
+
+
+class PaginacionKeysetTests(SolicitudesBaseTestCase):
+    url = "/api/v1/solicitudes/mis_solicitudes/"
+
+    def recorrer(self, client, limite):
+        paginas, cursor = [], None
+        while True:
+            url = f"{self.url}?limit={limite}"
+            if cursor:
+                url += f"&cursor={cursor}"
+            pagina = client.get(url).json()
+            paginas.append(pagina)
+            cursor = pagina["next_cursor"]
+            if not pagina["has_more"]:
+                self.assertIsNone(cursor)
+                return paginas
+
+    def test_recorrido_completo_sin_repetir_ni_omitir(self):
+        solicitudes = self.crear_solicitudes(7)
+        client = self.cliente(self.usuario_ciudadano)
+
+        paginas = self.recorrer(client, 3)
+
+        self.assertEqual([len(p["results"]) for p in paginas], [3, 3, 1])
+        self.assertEqual(
+            [s["id"] for p in paginas for s in p["results"]],
+            [s.id for s in reversed(solicitudes)],
+        )
+
+    def test_pagina_exacta_no_reporta_mas(self):
+        # Se pide limit+1 filas: con exactamente `limit` no hay siguiente página
+        self.crear_solicitudes(3)
+        client = self.cliente(self.usuario_ciudadano)
+
+        pagina = client.get(f"{self.url}?limit=3").json()
+
+        self.assertEqual(len(pagina["results"]), 3)
+        self.assertFalse(pagina["has_more"])
+        self.assertIsNone(pagina["next_cursor"])
+
+    def test_empates_en_fecha_se_desempatan_por_id(self):
+        solicitudes = self.crear_solicitudes(5)
+        Solicitud.objects.update(fecha_creacion=solicitudes[0].fecha_creacion)
+        client = self.cliente(self.usuario_ciudadano)
+
+        paginas = self.recorrer(client, 2)
+
+        self.assertEqual(
+            [s["id"] for p in paginas for s in p["results"]],
+            sorted((s.id for s in solicitudes), reverse=True),
+        )
+
+    def test_cursor_invalido_responde_400(self):
+        client = self.cliente(self.usuario_ciudadano)
+
+        for cursor in ["no-es-base64!", "W10", "WyJ4IiwgMV0"]:
+            response = client.get(f"{self.url}?cursor={cursor}")
+            self.assertEqual(response.status_code, 400, cursor)
+
+
+class AlcancePorClaimsTests(SolicitudesBaseTestCase):
+    def test_listado_funcionario_sin_consultas_de_autenticacion(self):
+        self.crear_solicitudes(3)
+        client = self.cliente_jwt(self.usuario_funcionario)
+
+        # Solo la consulta de solicitudes: ni Usuario ni Funcionario
+        consultas = self.contar_consultas(client, "/api/v1/solicitudes/")
+        self.assertEqual(consultas, 1)
+
+    def test_listado_ciudadano_sin_consultas_de_autenticacion(self):
+        self.crear_solicitudes(3)
+        client = self.cliente_jwt(self.usuario_ciudadano)
+
+        consultas = self.contar_consultas(
+            client, "/api/v1/solicitudes/mis_solicitudes/"
+        )
+        self.assertEqual(consultas, 1)
+
+
+class TransicionesSolicitudTests(SolicitudesBaseTestCase):
+    def test_actualizacion_registra_transiciones_y_tiempos(self):
+        (solicitud,) = self.crear_solicitudes(1)
+        client = self.cliente(self.usuario_funcionario)
+        url = f"/api/v1/solicitudes/{solicitud.pk}/"
+
+        client.patch(url, {"estado": "visto"}, format="json")
+        client.patch(url, {"estado": "completada"}, format="json")
+        # Editar sin cambiar estado no altera los tiempos
+        client.patch(url, {"comentario": "Atendido"}, format="json")
+
+        solicitud.refresh_from_db()
+        transiciones = list(
+            solicitud.transiciones.values_list("estado_anterior", "estado_nuevo")
+        )
+        self.assertEqual(
+            transiciones, [("enviada", "visto"), ("visto", "completada")]
+        )
+        primera, ultima = solicitud.transiciones.all()
+        self.assertEqual(solicitud.fecha_visto, primera.fecha)
+        self.assertEqual(solicitud.fecha_resolucion, ultima.fecha)
+        self.assertEqual(primera.realizado_por_id, self.usuario_funcionario.id)
+
+    def test_borrado_logico_conserva_transiciones(self):
+        (solicitud,) = self.crear_solicitudes(1)
+        solicitud.cambiar_estado("visto")
+
+        response = self.cliente(self.usuario_ciudadano).delete(
+            f"/api/v1/solicitudes/{solicitud.pk}/"
+        )
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            list(solicitud.transiciones.values_list("estado_nuevo", flat=True)), ["visto"]
+        )
+        solicitud.refresh_from_db()
+        solicitud.restore(strict=False)
+        self.assertEqual(solicitud.transiciones.count(), 1)
+        with self.assertRaises(ValueError):
+            solicitud.transiciones.get().delete()
+        self.assertEqual(
+            Solicitud.objects.filter(transiciones__estado_nuevo="visto").count(), 1
+        )
+        solicitud.hard_delete()
+        self.assertFalse(TransicionSolicitud.objects.exists())
+
+
+class ContadoresSolicitudesTests(SolicitudesBaseTestCase):
+    def test_contadores_siguen_creacion_y_cambios_de_estado(self):
+        from apps.solicitudes.contadores import conteos_reales, totales_ciudadano
+
+        primera, segunda, _ = self.crear_solicitudes(3)
+        primera.cambiar_estado("visto")
+        primera.cambiar_estado("completada")
+        segunda.cambiar_estado("rechazada")
+
+        client = self.cliente(self.usuario_funcionario)
+        response = client.get("/api/v1/analitica/basica/solicitudes-funcionarios/")
+        self.assertEqual(
+            response.json(), {"realizadas": 3, "aprobadas": 1, "rechazadas": 1}
+        )
+        self.assertEqual(
+            totales_ciudadano(self.ciudadano.id),
+            {"completada": 1, "rechazada": 1, "enviada": 1, "visto": 0},
+        )
+        self.assertEqual(
+            conteos_reales()[0],
+            {
+                (self.dependencia.id, self.categoria.id, "enviada"): 1,
+                (self.dependencia.id, self.categoria.id, "completada"): 1,
+                (self.dependencia.id, self.categoria.id, "rechazada"): 1,
+            },
+        )
+
+    def test_reconciliar_corrige_desviaciones(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from apps.solicitudes.contadores import ContadorSolicitudes, totales_dependencia
+
+        self.crear_solicitudes(2)
+        ContadorSolicitudes.objects.update(total=7)
+
+        call_command("reconciliar_contadores", stdout=StringIO())
+
+        self.assertEqual(totales_dependencia(self.dependencia.id), {"enviada": 2})
+
+    def test_borrado_logico_y_restauracion_ajustan_contadores(self):
+        from apps.solicitudes.contadores import totales_ciudadano, totales_dependencia
+
+        primera, _ = self.crear_solicitudes(2)
+        primera.cambiar_estado("visto")
+
+        client = self.cliente(self.usuario_ciudadano)
+        response = client.delete(f"/api/v1/solicitudes/{primera.pk}/")
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            totales_ciudadano(self.ciudadano.id), {"enviada": 1, "visto": 0}
+        )
+        # Borrar de nuevo una fila ya borrada no descuenta dos veces
+        Solicitud.global_objects.get(pk=primera.pk).delete()
+        self.assertEqual(totales_dependencia(self.dependencia.id), {"enviada": 1, "visto": 0})
+
+        Solicitud.global_objects.get(pk=primera.pk).restore(strict=False)
+        self.assertEqual(
+            totales_ciudadano(self.ciudadano.id), {"enviada": 1, "visto": 1}
+        )
+        self.assertEqual(totales_dependencia(self.dependencia.id), {"enviada": 1, "visto": 1})
+
+    def test_cambios_de_categoria_y_dependencia_mueven_contadores(self):
+        from apps.solicitudes.contadores import totales_dependencia
+
+        primera, segunda = self.crear_solicitudes(2)
+        primera.cambiar_estado("visto")
+        otra_dependencia = DependenciaMunicipal.objects.create(nombre="Servicios")
+        otra_categoria = Categoria.objects.create(
+            nombre="Alumbrado", dependencia_municipal=otra_dependencia
+        )
+
+        solicitud = Solicitud.objects.get(pk=primera.pk)
+        solicitud.categoria = otra_categoria
+        solicitud.save()
+        # Guardar de nuevo sin cambios no vuelve a mover la solicitud
+        solicitud.save()
+        self.assertEqual(totales_dependencia(self.dependencia.id), {"enviada": 1, "visto": 0})
+        self.assertEqual(totales_dependencia(otra_dependencia.id), {"visto": 1})
+
+        self.categoria.dependencia_municipal = otra_dependencia
+        self.categoria.save()
+        self.assertEqual(totales_dependencia(self.dependencia.id), {})
+        self.assertEqual(
+            totales_dependencia(otra_dependencia.id), {"enviada": 1, "visto": 1}
+        )
+
+
+class PrimeraRespuestaTests(SolicitudesBaseTestCase):
+    def test_primer_comentario_fija_y_borrar_recalcula(self):
+        (solicitud,) = self.crear_solicitudes(1, comentarios=3)
+        primero, segundo, _ = solicitud.comentarios.all()
+
+        solicitud.refresh_from_db()
+        self.assertEqual(solicitud.primera_respuesta_en, primero.fecha_creacion)
+
+        primero.delete()
+        solicitud.refresh_from_db()
+        self.assertEqual(solicitud.primera_respuesta_en, segundo.fecha_creacion)
+
+        solicitud.comentarios.all().delete()
+        recalcular_primera_respuesta(Solicitud.objects.filter(pk=solicitud.pk))
+        solicitud.refresh_from_db()
+        self.assertIsNone(solicitud.primera_respuesta_en)
+
+
+class AutorComentarioTests(SolicitudesBaseTestCase):
+    def test_asignar_autores_por_lotes(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        (solicitud,) = self.crear_solicitudes(1)
+        for creado_por in [
+            str(self.usuario_funcionario),
+            "Luis Gómez",
+            str(self.usuario_funcionario),
+            "Sistema",
+        ]:
+            Comentario.objects.create(
+                solicitud=solicitud, texto="Revisado", creado_por=creado_por
+            )
+
+        call_command("asignar_autores_comentarios", "--lote=2", stdout=StringIO())
+
+        self.assertEqual(
+            list(solicitud.comentarios.values_list("autor_id", flat=True)),
+            [self.usuario_funcionario.id] * 3 + [None],
+        )
+
+
+class NotificacionesLecturaTests(SolicitudesBaseTestCase):
+    url = "/api/v1/notificaciones/"
+
+    def test_marcado_masivo_en_una_sentencia(self):
+        self.crear_solicitudes(4)
+        ids = sorted(
+            Notificacion.objects.filter(ciudadano=self.ciudadano).values_list(
+                "id", flat=True
+            )
+        )
+        client = self.cliente_jwt(self.usuario_ciudadano)
+
+        response = client.post(
+            f"{self.url}marcar_leidas/", {"ids": ids[:1]}, format="json"
+        )
+        self.assertEqual(response.json(), {"marcadas": 1})
+        response = client.post(
+            f"{self.url}marcar_leidas/", {"hasta_id": ids[1]}, format="json"
+        )
+        self.assertEqual(response.json(), {"marcadas": 1})
+        for cuerpo in ({}, {"ids": [10**20]}, {"ids": [True]}, {"ids": [0]}, {"ids": "1"}):
+            self.assertEqual(
+                client.post(f"{self.url}marcar_leidas/", cuerpo, format="json").status_code,
+                400,
+            )
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = client.post(f"{self.url}marcar_todas_como_leidas/")
+        self.assertEqual(
+            response.json()["detail"], "2 notificaciones marcadas como leídas"
+        )
+        self.assertEqual(
+            sum(
+                q["sql"].startswith('UPDATE "solicitudes_notificacion"')
+                for q in consultas.captured_queries
+            ),
+            1,
+        )
+        self.assertFalse(Notificacion.objects.filter(leida=False).exists())
+
+    def test_listados_por_cursor_sin_n_mas_1(self):
+        self.crear_solicitudes(5)
+        Notificacion.objects.filter(
+            pk=Notificacion.objects.order_by("id").values("id")[:1]
+        ).update(leida=True)
+        client = self.cliente_jwt(self.usuario_ciudadano)
+
+        with CaptureQueriesContext(connection) as consultas:
+            pagina = client.get(f"{self.url}?limit=3").json()
+        self.assertEqual(len(consultas.captured_queries), 1)
+        self.assertEqual(len(pagina["results"]), 3)
+        self.assertTrue(pagina["has_more"])
+        self.assertTrue(pagina["results"][0]["folio_solicitud"].startswith("SOL-TEST-"))
+
+        resto = client.get(f"{self.url}?limit=3&cursor={pagina['next_cursor']}").json()
+        self.assertEqual(len(resto["results"]), 2)
+        self.assertFalse(resto["has_more"])
+
+        no_leidas = client.get(f"{self.url}no_leidas/?limit=10").json()
+        self.assertEqual(len(no_leidas["results"]), 4)
+        self.assertFalse(any(n["leida"] for n in no_leidas["results"]))
+
+    def test_conteo_no_leidas_desde_contador_con_etag(self):
+        self.crear_solicitudes(3, comentarios=1)
+        client = self.cliente_jwt(self.usuario_ciudadano)
+        url = f"{self.url}no_leidas_count/"
+
+        response = client.get(url)
+        self.assertEqual(response.json(), {"no_leidas": 6})
+        etag = response["ETag"]
+
+        # Sondeo sin cambios: ni siquiera se consulta el contador
+        with CaptureQueriesContext(connection) as consultas:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(consultas.captured_queries), 0)
+
+        notificacion = Notificacion.objects.filter(ciudadano=self.ciudadano).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            notificacion.marcar_como_leida()
+            notificacion.marcar_como_leida()
+        with self.captureOnCommitCallbacks(execute=True):
+            Notificacion.objects.filter(leida=False).first().delete()
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"no_leidas": 4})
+        self.assertEqual(
+            ContadorNotificaciones.objects.get(ciudadano=self.ciudadano).total,
+            Notificacion.objects.filter(ciudadano=self.ciudadano, leida=False).count(),
+        )
+
+
+    def test_lector_atrasado_no_deja_conteo_viejo_en_cache(self):
+        from apps.solicitudes.notificaciones import (
+            CACHE_NO_LEIDAS,
+            _version_no_leidas,
+            no_leidas_de,
+        )
+
+        self.crear_solicitudes(2)
+        self.assertEqual(no_leidas_de(self.ciudadano.id), 2)
+
+        # Un lector leyó el contador (2) antes del commit que marca todo como
+        # leído y guarda su valor después de la invalidación
+        version = _version_no_leidas(self.ciudadano.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Notificacion.objects.marcar_leidas(self.ciudadano.id)
+        cache.add(CACHE_NO_LEIDAS.format(self.ciudadano.id, version), 2)
+
+        self.assertEqual(no_leidas_de(self.ciudadano.id), 0)
+
+class NotificacionesTiempoRealTests(SolicitudesBaseTestCase):
+    url = "/api/v1/notificaciones/stream/"
+
+    async def test_stream_reanuda_y_recibe_en_vivo(self):
+        await sync_to_async(self.crear_solicitudes)(3)
+        ids = [
+            pk
+            async for pk in Notificacion.objects.filter(ciudadano=self.ciudadano)
+            .order_by("id")
+            .values_list("id", flat=True)
+        ]
+        ticket = await sync_to_async(self.ticket)()
+
+        response = await AsyncClient().get(
+            f"{self.url}?ticket={ticket}", headers={"Last-Event-ID": str(ids[0])}
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        contenido = response.streaming_content
+        with mock.patch("apps.api.v1.views.notificaciones.backend") as backend:
+            self.assertEqual(await anext(contenido), b"retry: 5000\n\n")
+        # Suscribirse inicia la escucha aunque el proceso nunca publique
+        backend.assert_called_once_with()
+        # Las dos posteriores a Last-Event-ID, desde la base de datos
+        for pk in ids[1:]:
+            self.assertTrue((await anext(contenido)).startswith(f"id: {pk}\n".encode()))
+
+        hub.difundir(self.ciudadano.id, ids[-1] + 1, {"mensaje": "En vivo"})
+        evento = await anext(contenido)
+        self.assertIn(b"En vivo", evento)
+        await contenido.aclose()
+
+    def ticket(self):
+        response = self.cliente_jwt(self.usuario_ciudadano).post(f"{self.url}ticket/")
+        self.assertEqual(response.json()["expira_en"], 30)
+        return response.json()["ticket"]
+
+    async def test_stream_requiere_token_de_ciudadano(self):
+        response = await AsyncClient().get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+        # El token de acceso ya no se acepta en la URL
+        token = (
+            await sync_to_async(CustomTokenObtainPairSerializer.get_token)(
+                self.usuario_ciudadano
+            )
+        ).access_token
+        response = await AsyncClient().get(f"{self.url}?token={token}")
+        self.assertEqual(response.status_code, 401)
+        response = await AsyncClient().get(
+            self.url, headers={"Authorization": f"Bearer {token}"}
+        )
+        self.assertEqual(response.status_code, 200)
+        await response.streaming_content.aclose()
+
+    async def test_ticket_de_un_solo_uso(self):
+        ticket = await sync_to_async(self.ticket)()
+        primera = await AsyncClient().get(f"{self.url}?ticket={ticket}")
+        self.assertEqual(primera.status_code, 200)
+        await primera.streaming_content.aclose()
+
+        repetida = await AsyncClient().get(f"{self.url}?ticket={ticket}")
+        self.assertEqual(repetida.status_code, 401)
+        alterado = await AsyncClient().get(f"{self.url}?ticket={ticket}x")
+        self.assertEqual(alterado.status_code, 401)
+
+    async def test_cola_acotada_en_bytes(self):
+        suscripcion = hub.suscribir(self.ciudadano.id, limite_bytes=200)
+        try:
+            for pk in range(1, 6):
+                hub.difundir(self.ciudadano.id, pk, {"mensaje": "x" * 60})
+            await asyncio.sleep(0)
+            self.assertTrue(suscripcion.desbordada)
+            self.assertLessEqual(suscripcion._bytes, 200)
+        finally:
+            hub.cancelar(suscripcion)
+
+
+class RecolectorNotificacionesTests(SolicitudesBaseTestCase):
+    def test_un_solo_insert_al_confirmar(self):
+        from django.db import transaction
+
+        with CaptureQueriesContext(connection) as consultas:
+            with self.captureOnCommitCallbacks(execute=True):
+                solicitudes = self._crear_solicitudes(3, comentarios=2)
+                # Nada se inserta antes del commit
+                self.assertFalse(Notificacion.objects.exists())
+                try:
+                    with transaction.atomic():
+                        Comentario.objects.create(
+                            solicitud_id=solicitudes[0].id,
+                            texto="Descartado",
+                            creado_por="Sistema",
+                        )
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+
+        inserts = [
+            q["sql"]
+            for q in consultas.captured_queries
+            if q["sql"].startswith('INSERT INTO "solicitudes_notificacion"')
+        ]
+        self.assertEqual(len(inserts), 1)
+        # 3 altas + 6 comentarios; la del savepoint revertido no se crea
+        self.assertEqual(Notificacion.objects.count(), 9)
+        self.assertEqual(CorreoPendiente.objects.count(), 9)
+        self.assertEqual(
+            ContadorNotificaciones.objects.get(ciudadano=self.ciudadano).total, 9
+        )
+
+    def test_recolector_revertido_no_bloquea_los_siguientes(self):
+        from django.db import transaction
+
+        (solicitud,) = self.crear_solicitudes(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            # La primera notificación de la transacción está en el savepoint revertido
+            try:
+                with transaction.atomic():
+                    Comentario.objects.create(
+                        solicitud=solicitud, texto="Descartado", creado_por="Sistema"
+                    )
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            Comentario.objects.create(
+                solicitud=solicitud, texto="Vigente", creado_por="Sistema"
+            )
+
+        self.assertEqual(
+            list(Notificacion.objects.values_list("tipo", flat=True).order_by("id")),
+            ["solicitud_creada", "comentario_nuevo"],
+        )
+
+
+class CorreosNotificacionesTests(SolicitudesBaseTestCase):
+    def test_resumen_por_ciudadano_en_una_conexion(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        self.crear_solicitudes(2, comentarios=1)
+        self.assertEqual(CorreoPendiente.objects.filter(estado="pendiente").count(), 4)
+
+        salida = StringIO()
+        call_command("enviar_correos_notificaciones", "--una-vez", stdout=salida)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["ana@example.com"])
+        self.assertIn("4 notificaciones", mail.outbox[0].subject)
+        self.assertFalse(CorreoPendiente.objects.exclude(estado="enviado").exists())
+        self.assertIn("Correos enviados: 1", salida.getvalue())
+
+    def test_reintento_con_espera_si_falla_smtp(self):
+        self.crear_solicitudes(1)
+        ids = reclamar()
+        with mock.patch("apps.solicitudes.correos.get_connection") as conexion:
+            conexion.return_value.open.side_effect = OSError("SMTP caído")
+            self.assertEqual(enviar_lote(ids), (0, 1))
+
+        correo = CorreoPendiente.objects.get()
+        self.assertEqual((correo.estado, correo.intentos), ("pendiente", 1))
+        self.assertEqual(correo.ultimo_error, "SMTP caído")
+        # Aún no vence la espera: no se vuelve a reclamar
+        self.assertEqual(reclamar(), [])
+        self.assertEqual(mail.outbox, [])
@@ -0,0 +1,268 @@
+"""
+Difusión de notificaciones en tiempo real (Server-Sent Events).
+
+Cada proceso tiene un ``Hub`` con las conexiones SSE abiertas, agrupadas por
+ciudadano. Al confirmarse una ``Notificacion`` nueva (señal ``post_save`` o
+``crear_notificaciones``) se publica en el backend configurado en
+``NOTIFICACIONES_BACKEND``, y el backend la entrega al hub de cada proceso:
+
+- ``BackendLocal``: un solo proceso; entrega directa al hub.
+- ``BackendSocket``: varios procesos en el mismo servidor; cada proceso
+  escucha en un socket Unix de datagramas dentro de
+  ``NOTIFICACIONES_SOCKETS_DIR`` y la publicación se envía a todos.
+- ``BackendPostgres``: varios servidores; ``pg_notify`` al publicar y una
+  conexión dedicada con ``LISTEN`` por proceso (requiere ``psycopg`` 3).
+
+La cola de cada conexión está acotada en bytes. Si un cliente lento la llena
+se descarta lo pendiente y la conexión se resincroniza desde la base de datos
+a partir del último id enviado, igual que al reconectar con ``Last-Event-ID``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+CANAL = "notificaciones"
+LIMITE_BYTES = 64 * 1024  # memoria máxima de eventos pendientes por conexión
+TAMANO_DATAGRAMA = 64 * 1024
+
+
+def formatear_evento(evento_id: int, datos: dict) -> bytes:
+    """Evento SSE ``notificacion`` con ``id`` para poder reanudar."""
+    contenido = json.dumps(datos, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {evento_id}\nevent: notificacion\ndata: {contenido}\n\n".encode()
+
+
+class Suscripcion:
+    """Cola de eventos de una conexión SSE, acotada a ``limite_bytes``."""
+
+    def __init__(self, ciudadano_id: int, limite_bytes: int = LIMITE_BYTES):
+        self.ciudadano_id = ciudadano_id
+        self.limite_bytes = limite_bytes
+        self.desbordada = False
+        self._loop = asyncio.get_running_loop()
+        self._eventos = deque()
+        self._bytes = 0
+        self._aviso = asyncio.Event()
+
+    def _encolar(self, evento_id: int, datos: bytes):
+        if self._bytes + len(datos) > self.limite_bytes:
+            # Se descarta todo: la conexión se pone al día desde la BD
+            self._eventos.clear()
+            self._bytes = 0
+            self.desbordada = True
+        else:
+            self._eventos.append((evento_id, datos))
+            self._bytes += len(datos)
+        self._aviso.set()
+
+    def entregar(self, evento_id: int, datos: bytes):
+        """Encola un evento; se puede llamar desde cualquier hilo."""
+        try:
+            self._loop.call_soon_threadsafe(self._encolar, evento_id, datos)
+        except RuntimeError:
+            # El loop ya se cerró: la conexión terminó
+            pass
+
+    async def esperar(self, segundos: float) -> list[tuple[int, bytes]]:
+        """Eventos pendientes; lista vacía si pasan ``segundos`` sin ninguno."""
+        if not self._eventos and not self.desbordada:
+            try:
+                await asyncio.wait_for(self._aviso.wait(), segundos)
+            except asyncio.TimeoutError:
+                return []
+        self._aviso.clear()
+        eventos = list(self._eventos)
+        self._eventos.clear()
+        self._bytes = 0
+        return eventos
+
+
+class Hub:
+    """Conexiones SSE abiertas en este proceso, por ciudadano."""
+
+    def __init__(self):
+        self._suscripciones = defaultdict(set)
+        self._candado = threading.Lock()
+
+    def suscribir(self, ciudadano_id: int, limite_bytes: int = LIMITE_BYTES) -> Suscripcion:
+        suscripcion = Suscripcion(ciudadano_id, limite_bytes)
+        with self._candado:
+            self._suscripciones[ciudadano_id].add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        with self._candado:
+            conexiones = self._suscripciones.get(suscripcion.ciudadano_id)
+            if conexiones is not None:
+                conexiones.discard(suscripcion)
+                if not conexiones:
+                    del self._suscripciones[suscripcion.ciudadano_id]
+
+    def difundir(self, ciudadano_id: int, evento_id: int, datos: dict):
+        with self._candado:
+            conexiones = list(self._suscripciones.get(ciudadano_id, ()))
+        if not conexiones:
+            return
+        # Se codifica una sola vez para todas las conexiones del ciudadano
+        evento = formatear_evento(evento_id, datos)
+        for suscripcion in conexiones:
+            suscripcion.entregar(evento_id, evento)
+
+    def recibir(self, mensaje: bytes | str):
+        """Entrega un mensaje serializado por ``_mensaje``."""
+        try:
+            contenido = json.loads(mensaje)
+            self.difundir(contenido["ciudadano_id"], contenido["id"], contenido["datos"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Mensaje de notificación inválido: %r", mensaje)
+
+
+def _mensaje(ciudadano_id: int, evento_id: int, datos: dict) -> str:
+    return json.dumps(
+        {"ciudadano_id": ciudadano_id, "id": evento_id, "datos": datos},
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+class BackendLocal:
+    """Entrega directa al hub del proceso (un solo worker)."""
+
+    def __init__(self, hub: Hub):
+        self.hub = hub
+
+    def iniciar(self):
+        pass
+
+    def publicar(self, ciudadano_id: int, evento_id: int, datos: dict):
+        self.hub.recibir(_mensaje(ciudadano_id, evento_id, datos))
+
+
+class BackendSocket(BackendLocal):
+    """
+    Varios workers en un mismo servidor: un socket Unix de datagramas por
+    proceso en ``NOTIFICACIONES_SOCKETS_DIR``; publicar envía a todos.
+    """
+
+    def __init__(self, hub: Hub):
+        super().__init__(hub)
+        self.directorio = settings.NOTIFICACIONES_SOCKETS_DIR
+        self.ruta = os.path.join(self.directorio, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._envio = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+
+    def iniciar(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        escucha = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        escucha.bind(self.ruta)
+        threading.Thread(
+            target=self._escuchar, args=(escucha,), name="notificaciones-socket", daemon=True
+        ).start()
+
+    def _escuchar(self, escucha: socket.socket):
+        while True:
+            self.hub.recibir(escucha.recv(TAMANO_DATAGRAMA))
+
+    def publicar(self, ciudadano_id: int, evento_id: int, datos: dict):
+        mensaje = _mensaje(ciudadano_id, evento_id, datos).encode()
+        for nombre in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                self._envio.sendto(mensaje, ruta)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Socket de un proceso que ya terminó
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
+            except OSError:
+                logger.exception("No se pudo enviar la notificación a %s", ruta)
+
+
+class BackendPostgres(BackendLocal):
+    """
+    Varios servidores: ``pg_notify`` al publicar y un hilo por proceso con una
+    conexión dedicada en ``LISTEN`` que entrega al hub.
+    """
+
+    def iniciar(self):
+        try:
+            import psycopg  # noqa: F401
+        except ImportError as exc:
+            raise ImproperlyConfigured("BackendPostgres requiere psycopg 3") from exc
+        threading.Thread(target=self._escuchar, name="notificaciones-pg", daemon=True).start()
+
+    def _escuchar(self):
+        import psycopg
+
+        espera = 1
+        while True:
+            try:
+                datos = connection.settings_dict
+                with psycopg.connect(
+                    dbname=datos["NAME"],
+                    user=datos["USER"],
+                    password=datos["PASSWORD"],
+                    host=datos["HOST"],
+                    port=datos["PORT"] or None,
+                    autocommit=True,
+                ) as conexion:
+                    conexion.execute(f"LISTEN {CANAL}")
+                    espera = 1
+                    for aviso in conexion.notifies():
+                        self.hub.recibir(aviso.payload)
+            except Exception:
+                logger.exception("Se perdió la conexión LISTEN; reintentando en %ss", espera)
+                time.sleep(espera)
+                espera = min(espera * 2, 60)
+
+    def publicar(self, ciudadano_id: int, evento_id: int, datos: dict):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, %s)", [CANAL, _mensaje(ciudadano_id, evento_id, datos)]
+            )
+
+
+hub = Hub()
+_backend = None
+_candado_backend = threading.Lock()
+
+
+def backend():
+    """
+    Backend configurado, iniciado la primera vez que se usa en el proceso: al
+    publicar o al abrir un stream (para escuchar lo que publican los demás).
+    """
+    global _backend
+    if _backend is None:
+        with _candado_backend:
+            if _backend is None:
+                instancia = import_string(settings.NOTIFICACIONES_BACKEND)(hub)
+                instancia.iniciar()
+                _backend = instancia
+    return _backend
+
+
+def publicar_notificacion(notificacion):
+    """Publica una notificación ya confirmada a las conexiones de su ciudadano."""
+    from apps.solicitudes.notificaciones_serializers import NotificacionSerializer
+
+    datos = dict(NotificacionSerializer(notificacion).data)
+    try:
+        backend().publicar(notificacion.ciudadano_id, notificacion.id, datos)
+    except Exception:
+        # El tiempo real es best-effort: el cliente recupera lo perdido al reconectar
+        logger.exception("No se pudo publicar la notificación %s", notificacion.id)
@@ -0,0 +1,83 @@
+import os
+import re
+
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+
+RANGO = re.compile(r"^bytes=(\d*)-(\d*)$")
+TAMANO_BLOQUE = 64 * 1024
+
+
+def _rango(encabezado: str, tamano: int) -> tuple[int, int] | None:
+    """
+    ``(inicio, fin)`` inclusivos de un ``Range`` de un solo intervalo.
+    Devuelve ``None`` si el encabezado no se entiende (se sirve completo) y
+    lanza ``ValueError`` si el intervalo no es satisfacible.
+    """
+    coincidencia = RANGO.match(encabezado.strip())
+    if not coincidencia:
+        return None
+    inicio, fin = coincidencia.groups()
+    if not inicio and not fin:
+        return None
+    if not inicio:
+        # bytes=-N: los últimos N bytes
+        sufijo = int(fin)
+        if sufijo == 0:
+            raise ValueError("Rango vacío")
+        return max(tamano - sufijo, 0), tamano - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        raise ValueError("Rango fuera del archivo")
+    return inicio, fin
+
+
+def _leer(ruta: str, inicio: int, longitud: int):
+    with open(ruta, "rb") as archivo:
+        archivo.seek(inicio)
+        while longitud > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, longitud))
+            if not bloque:
+                break
+            longitud -= len(bloque)
+            yield bloque
+
+
+def respuesta_archivo(request, ruta: str, etag: str, content_type: str, nombre: str):
+    """
+    Sirve ``ruta`` como adjunto con soporte de descargas reanudables:
+    ``If-None-Match`` (304), ``Range`` de un intervalo (206/416) e
+    ``If-Range`` (si el ``ETag`` cambió se envía el archivo completo).
+    """
+    if request.headers.get("If-None-Match") == etag:
+        respuesta = HttpResponseNotModified()
+        respuesta["ETag"] = etag
+        return respuesta
+
+    tamano = os.path.getsize(ruta)
+    rango = None
+    encabezado = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if encabezado and (if_range is None or if_range == etag):
+        try:
+            rango = _rango(encabezado, tamano)
+        except ValueError:
+            respuesta = HttpResponse(status=416)
+            respuesta["Content-Range"] = f"bytes */{tamano}"
+            respuesta["Accept-Ranges"] = "bytes"
+            return respuesta
+
+    inicio, fin = rango or (0, tamano - 1)
+    longitud = fin - inicio + 1 if tamano else 0
+    respuesta = StreamingHttpResponse(
+        _leer(ruta, inicio, longitud),
+        status=206 if rango else 200,
+        content_type=content_type,
+    )
+    if rango:
+        respuesta["Content-Range"] = f"bytes {inicio}-{fin}/{tamano}"
+    respuesta["Content-Length"] = str(longitud)
+    respuesta["Accept-Ranges"] = "bytes"
+    respuesta["ETag"] = etag
+    respuesta["Content-Disposition"] = f'attachment; filename="{nombre}"'
+    return respuesta
@@ -0,0 +1,102 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor opaco sobre ``(fecha_creacion, id)``.
+
+    En lugar de ``OFFSET`` filtra con ``(fecha_creacion, id) < cursor``, de modo
+    que el motor recorre el índice desde la última fila entregada y el costo de
+    una página profunda es el mismo que el de la primera.
+
+    Parámetros de consulta:
+    - ``cursor``: valor opaco devuelto en ``next_cursor`` de la página anterior.
+    - ``limit``: tamaño de página (acotado por ``max_page_size``).
+    """
+
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    campo_fecha = "fecha_creacion"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size_actual = self.get_page_size(request)
+
+        queryset = queryset.order_by(f"-{self.campo_fecha}", "-id")
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            fecha, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{f"{self.campo_fecha}__lt": fecha})
+                | Q(**{self.campo_fecha: fecha, "id__lt": pk})
+            )
+
+        # Se pide una fila extra para saber si hay más resultados sin un COUNT(*)
+        filas = list(queryset[: self.page_size_actual + 1])
+        self.has_more = len(filas) > self.page_size_actual
+        filas = filas[: self.page_size_actual]
+
+        self.next_cursor = None
+        if self.has_more and filas:
+            ultima = filas[-1]
+            self.next_cursor = self.encode_cursor(
+                getattr(ultima, self.campo_fecha), ultima.pk
+            )
+
+        return filas
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "results": data,
+                "next_cursor": self.next_cursor,
+                "has_more": self.has_more,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results", "has_more"],
+            "properties": {
+                "results": schema,
+                "next_cursor": {"type": "string", "nullable": True},
+                "has_more": {"type": "boolean"},
+            },
+        }
+
+    def get_page_size(self, request):
+        valor = request.query_params.get(self.page_size_query_param)
+        if valor is None:
+            return self.page_size
+        try:
+            limite = int(valor)
+        except (TypeError, ValueError):
+            return self.page_size
+        if limite <= 0:
+            return self.page_size
+        return min(limite, self.max_page_size)
+
+    @staticmethod
+    def encode_cursor(fecha: datetime, pk: int) -> str:
+        crudo = json.dumps([fecha.isoformat(), pk], separators=(",", ":"))
+        return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str):
+        try:
+            relleno = "=" * (-len(cursor) % 4)
+            fecha, pk = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+            return datetime.fromisoformat(fecha), int(pk)
+        except (binascii.Error, ValueError, TypeError):
+            raise ValidationError({"cursor": "Cursor inválido."})
@@ -0,0 +1,347 @@
+"""
+Escritor de PDF sin dependencias externas para los reportes.
+
+El documento se describe como una lista de elementos (títulos, párrafos,
+tablas y gráficas de barras) y se maqueta al serializarlo: ``bloques()``
+escribe los objetos de cada página en cuanto la página se llena, con saltos
+automáticos (las tablas repiten su encabezado) y el contenido comprimido con
+zlib. El árbol de páginas y la tabla ``xref`` van al final, de modo que el
+documento puede enviarse con ``StreamingHttpResponse`` sin armarlo completo
+en memoria.
+"""
+
+import hashlib
+import json
+import zlib
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+
+ANCHO_PAGINA, ALTO_PAGINA = 612, 792  # carta, en puntos
+MARGEN = 50
+ANCHO_UTIL = ANCHO_PAGINA - 2 * MARGEN
+INTERLINEA = 1.4
+ANCHO_CARACTER = 0.5  # ancho medio de un carácter de Helvetica / tamaño de fuente
+COLOR_BARRA = b"0.25 0.45 0.75 rg"
+
+# Objetos de número fijo; las páginas se numeran a partir de PRIMER_OBJETO
+CATALOGO, PAGINAS, FUENTE, FUENTE_NEGRITA = 1, 2, 3, 4
+PRIMER_OBJETO = 5
+
+TTL_CACHE = 3600
+MAX_BYTES_CACHE = 5 * 1024 * 1024
+
+
+def _escapar(texto) -> bytes:
+    texto = " ".join(str(texto).split())
+    texto = texto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return texto.encode("cp1252", errors="replace")
+
+
+def _recortar(texto, ancho: float, tamano: float) -> str:
+    texto = str(texto)
+    maximo = max(int(ancho / (tamano * ANCHO_CARACTER)), 4)
+    return texto if len(texto) <= maximo else texto[: maximo - 3] + "..."
+
+
+def _partir(texto: str, tamano: float) -> list[str]:
+    """Divide un párrafo en líneas que caben en el ancho útil."""
+    maximo = int(ANCHO_UTIL / (tamano * ANCHO_CARACTER))
+    lineas, actual = [], ""
+    for palabra in str(texto).split():
+        candidata = f"{actual} {palabra}" if actual else palabra
+        if len(candidata) <= maximo or not actual:
+            actual = candidata
+        else:
+            lineas.append(actual)
+            actual = palabra
+    return lineas + [actual] if actual else lineas or [""]
+
+
+class _Pagina:
+    """Operaciones de dibujo de una página y la posición vertical actual."""
+
+    def __init__(self, numero: int):
+        self.numero = numero
+        self.y = ALTO_PAGINA - MARGEN
+        self.operaciones = []
+
+    @property
+    def vacia(self) -> bool:
+        return self.y == ALTO_PAGINA - MARGEN
+
+    def cabe(self, alto: float) -> bool:
+        return self.vacia or self.y - alto >= MARGEN
+
+    def _texto(self, x: float, y: float, texto, tamano: float, negrita: bool = False):
+        fuente = b"/F2" if negrita else b"/F1"
+        self.operaciones.append(
+            b"BT %s %g Tf %g %g Td (%s) Tj ET" % (fuente, tamano, x, y, _escapar(texto))
+        )
+
+    def linea(self, celdas, tamano: float, negrita: bool = False):
+        """Una línea de texto; ``celdas`` es una lista de ``(x, texto)``."""
+        base = self.y - tamano
+        for x, texto in celdas:
+            self._texto(x, base, texto, tamano, negrita)
+        self.y -= tamano * INTERLINEA
+
+    def regla(self):
+        y = self.y + 2
+        self.operaciones.append(
+            b"0.5 w %g %g m %g %g l S" % (MARGEN, y, ANCHO_PAGINA - MARGEN, y)
+        )
+        self.y -= 2
+
+    def barra(self, etiqueta, valor: float, maximo: float, tamano: float):
+        ancho_etiqueta = ANCHO_UTIL * 0.3
+        ancho_barras = ANCHO_UTIL - ancho_etiqueta - 60
+        base = self.y - tamano
+        self._texto(MARGEN, base, _recortar(etiqueta, ancho_etiqueta - 6, tamano), tamano)
+        ancho = ancho_barras * valor / maximo if maximo else 0
+        x = MARGEN + ancho_etiqueta
+        self.operaciones.append(
+            b"%s %g %g %g %g re f 0 g" % (COLOR_BARRA, x, base - 1, ancho, tamano)
+        )
+        self._texto(x + ancho + 4, base, valor, tamano)
+        self.y -= tamano * 1.8
+
+    def contenido(self) -> bytes:
+        pie = b"BT /F1 8 Tf %g %g Td (%s) Tj ET" % (
+            ANCHO_PAGINA - MARGEN - 40,
+            MARGEN / 2,
+            _escapar(f"Página {self.numero}"),
+        )
+        return b"\n".join([*self.operaciones, pie])
+
+
+class _Escritor:
+    """Serializa objetos PDF llevando los desplazamientos para la ``xref``."""
+
+    def __init__(self):
+        self.posicion = 0
+        self.desplazamientos = {}
+        self.siguiente = PRIMER_OBJETO
+        self.paginas = []
+
+    def _objeto(self, numero: int, cuerpo: bytes) -> bytes:
+        datos = b"%d 0 obj\n%s\nendobj\n" % (numero, cuerpo)
+        self.desplazamientos[numero] = self.posicion
+        self.posicion += len(datos)
+        return datos
+
+    def encabezado(self) -> bytes:
+        datos = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+        self.posicion = len(datos)
+        fuente = b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>"
+        return b"".join(
+            [
+                datos,
+                self._objeto(CATALOGO, b"<< /Type /Catalog /Pages %d 0 R >>" % PAGINAS),
+                self._objeto(FUENTE, fuente % b"Helvetica"),
+                self._objeto(FUENTE_NEGRITA, fuente % b"Helvetica-Bold"),
+            ]
+        )
+
+    def pagina(self, contenido: bytes) -> bytes:
+        numero_contenido, numero_pagina = self.siguiente, self.siguiente + 1
+        self.siguiente += 2
+        self.paginas.append(numero_pagina)
+        comprimido = zlib.compress(contenido)
+        return self._objeto(
+            numero_contenido,
+            b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream"
+            % (len(comprimido), comprimido),
+        ) + self._objeto(
+            numero_pagina,
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> /Contents %d 0 R >>"
+            % (PAGINAS, ANCHO_PAGINA, ALTO_PAGINA, FUENTE, FUENTE_NEGRITA, numero_contenido),
+        )
+
+    def cierre(self) -> bytes:
+        hijos = b" ".join(b"%d 0 R" % numero for numero in self.paginas)
+        datos = self._objeto(
+            PAGINAS,
+            b"<< /Type /Pages /Kids [%s] /Count %d >>" % (hijos, len(self.paginas)),
+        )
+        inicio_xref = self.posicion
+        entradas = [b"0000000000 65535 f "]
+        entradas += [
+            b"%010d 00000 n " % self.desplazamientos[numero]
+            for numero in range(1, self.siguiente)
+        ]
+        return datos + b"".join(
+            [
+                b"xref\n0 %d\n" % self.siguiente,
+                b"\n".join(entradas),
+                b"\ntrailer << /Size %d /Root %d 0 R >>\n" % (self.siguiente, CATALOGO),
+                b"startxref\n%d\n%%%%EOF\n" % inicio_xref,
+            ]
+        )
+
+
+class DocumentoPDF:
+    """
+    Documento de reporte. Los métodos agregan elementos y devuelven el propio
+    documento; ``bloques()`` lo maqueta y genera los bytes del PDF.
+    """
+
+    def __init__(self, titulo: str | None = None):
+        self._elementos = []
+        if titulo:
+            self.titulo(titulo)
+
+    def titulo(self, texto: str, tamano: float = 16) -> "DocumentoPDF":
+        self._elementos.append(("titulo", texto, tamano))
+        return self
+
+    def texto(self, texto: str, tamano: float = 11) -> "DocumentoPDF":
+        for linea in _partir(texto, tamano):
+            self._elementos.append(("texto", linea, tamano))
+        return self
+
+    def espacio(self, puntos: float = 12) -> "DocumentoPDF":
+        self._elementos.append(("espacio", puntos))
+        return self
+
+    def tabla(self, encabezados, filas, anchos=None, tamano: float = 10) -> "DocumentoPDF":
+        """
+        Tabla con encabezado en negritas, repetido en cada página. ``anchos``
+        (en puntos) se reparte por igual si no se indica; el texto que no cabe
+        en su columna se recorta.
+        """
+        encabezados = list(encabezados)
+        anchos = list(anchos or [ANCHO_UTIL / len(encabezados)] * len(encabezados))
+        self._elementos.append(("tabla", encabezados, anchos, tamano))
+        for fila in filas:
+            self._elementos.append(("fila", list(fila)))
+        self._elementos.append(("fin_tabla",))
+        return self
+
+    def grafica_barras(self, etiquetas, valores, tamano: float = 9) -> "DocumentoPDF":
+        """Gráfica de barras horizontales, una por etiqueta."""
+        valores = list(valores)
+        maximo = max(valores, default=0)
+        for etiqueta, valor in zip(etiquetas, valores):
+            self._elementos.append(("barra", etiqueta, valor, maximo, tamano))
+        return self
+
+    def bloques(self):
+        """Genera el PDF en bloques de bytes, una página a la vez."""
+        escritor = _Escritor()
+        yield escritor.encabezado()
+
+        pagina = _Pagina(1)
+        tabla = None  # (encabezados, posiciones x, anchos, tamaño) de la tabla en curso
+
+        def encabezado_tabla():
+            encabezados, posiciones, anchos, tamano = tabla
+            pagina.linea(
+                [
+                    (x, _recortar(texto, ancho - 4, tamano))
+                    for x, texto, ancho in zip(posiciones, encabezados, anchos)
+                ],
+                tamano,
+                negrita=True,
+            )
+            pagina.regla()
+
+        for tipo, *args in self._elementos:
+            if tipo == "espacio":
+                alto = args[0]
+            elif tipo == "tabla":
+                alto = args[2] * INTERLINEA * 2 + 2  # encabezado y al menos una fila
+            elif tipo == "fin_tabla":
+                alto = 0
+            elif tipo == "fila":
+                alto = tabla[3] * INTERLINEA
+            elif tipo == "barra":
+                alto = args[3] * 1.8
+            else:
+                alto = args[1] * INTERLINEA
+
+            if not pagina.cabe(alto):
+                yield escritor.pagina(pagina.contenido())
+                pagina = _Pagina(pagina.numero + 1)
+                if tipo == "fila":
+                    encabezado_tabla()
+
+            if tipo == "titulo":
+                pagina.linea([(MARGEN, _recortar(args[0], ANCHO_UTIL, args[1]))], args[1], True)
+            elif tipo == "texto":
+                pagina.linea([(MARGEN, args[0])], args[1])
+            elif tipo == "espacio":
+                if not pagina.vacia:
+                    pagina.y -= args[0]
+            elif tipo == "tabla":
+                encabezados, anchos, tamano = args
+                posiciones = [MARGEN + sum(anchos[:i]) for i in range(len(anchos))]
+                tabla = (encabezados, posiciones, anchos, tamano)
+                encabezado_tabla()
+            elif tipo == "fila":
+                _, posiciones, anchos, tamano = tabla
+                pagina.linea(
+                    [
+                        (x, _recortar(valor, ancho - 4, tamano))
+                        for x, valor, ancho in zip(posiciones, args[0], anchos)
+                    ],
+                    tamano,
+                )
+            elif tipo == "fin_tabla":
+                tabla = None
+            elif tipo == "barra":
+                pagina.barra(*args)
+
+        yield escritor.pagina(pagina.contenido())
+        yield escritor.cierre()
+
+    def a_bytes(self) -> bytes:
+        return b"".join(self.bloques())
+
+
+def huella(*datos) -> str:
+    """Hash estable de datos serializables en JSON."""
+    contenido = json.dumps(datos, cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+def _guardar_al_terminar(bloques, clave: str, ttl: int):
+    """Reenvía los bloques y, al terminar, guarda el PDF completo en caché."""
+    guardados, tamano = [], 0
+    for bloque in bloques:
+        tamano += len(bloque)
+        if tamano <= MAX_BYTES_CACHE:
+            guardados.append(bloque)
+        yield bloque
+    if tamano <= MAX_BYTES_CACHE:
+        cache.set(clave, b"".join(guardados), timeout=ttl)
+
+
+def respuesta_pdf(request, construir, datos, nombre: str, ttl: int = TTL_CACHE):
+    """
+    Sirve como adjunto el PDF que ``construir(datos)`` describe. El resultado
+    se cachea por la huella de ``datos`` (y del constructor): una descarga
+    repetida con los mismos datos no vuelve a maquetar el documento, y si el
+    cliente ya lo tiene (``If-None-Match``) se responde 304.
+    """
+    firma = huella(construir.__module__, construir.__qualname__, datos)
+    etag = f'"{firma[:32]}"'
+    if request.headers.get("If-None-Match") == etag:
+        respuesta = HttpResponseNotModified()
+        respuesta["ETag"] = etag
+        return respuesta
+
+    clave = f"pdf:{firma}"
+    contenido = cache.get(clave)
+    if contenido is not None:
+        respuesta = HttpResponse(contenido, content_type="application/pdf")
+    else:
+        respuesta = StreamingHttpResponse(
+            _guardar_al_terminar(construir(datos).bloques(), clave, ttl),
+            content_type="application/pdf",
+        )
+    respuesta["ETag"] = etag
+    respuesta["Content-Disposition"] = f'attachment; filename="{nombre}"'
+    return respuesta
@@ -0,0 +1,74 @@
+"""
+Trabajo acumulado durante una transacción y ejecutado una sola vez al
+confirmarla.
+
+``RecolectorTransaccion.agregar`` guarda un elemento en el recolector de la
+conexión y registra con ``transaction.on_commit`` un aviso ligero. Al
+confirmar, el primer aviso que se ejecuta vacía el recolector completo con una
+sola llamada a ``vaciar``; los demás no hacen nada. Si se revierte el
+savepoint donde se agregó un elemento, Django descarta su aviso y el elemento
+ya no se entrega; si se revierte la transacción completa se libera el
+recolector. Fuera de una transacción se entrega al momento.
+"""
+
+import weakref
+
+from django.db import transaction
+
+_recolectores = weakref.WeakValueDictionary()
+
+
+class _Aviso:
+    """Callback de ``on_commit`` de un elemento; vacía su recolector."""
+
+    __slots__ = ("recolector", "__weakref__")
+
+    def __init__(self, recolector):
+        self.recolector = recolector
+
+    def __call__(self):
+        self.recolector.vaciar_pendientes()
+
+
+class RecolectorTransaccion:
+    """
+    Base de los recolectores: las subclases implementan ``vaciar`` con los
+    elementos de la transacción confirmada, en el orden en que se agregaron.
+    Hay un recolector por subclase y conexión.
+    """
+
+    # ``robust`` de ``on_commit``: si es True un error en ``vaciar`` se
+    # registra en el log en lugar de propagarse
+    robusto = False
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self._elementos = []
+
+    @classmethod
+    def agregar(cls, elemento):
+        conexion = transaction.get_connection()
+        if not conexion.in_atomic_block:
+            cls(conexion).vaciar([elemento])
+            return
+
+        clave = (cls, conexion)
+        recolector = _recolectores.get(clave)
+        if recolector is None:
+            recolector = _recolectores[clave] = cls(conexion)
+        aviso = _Aviso(recolector)
+        # El aviso solo sigue vivo mientras su savepoint no se revierta
+        recolector._elementos.append((weakref.ref(aviso), elemento))
+        transaction.on_commit(aviso, robust=cls.robusto)
+
+    def vaciar_pendientes(self):
+        clave = (type(self), self.conexion)
+        if _recolectores.get(clave) is self:
+            del _recolectores[clave]
+        elementos = [elemento for aviso, elemento in self._elementos if aviso() is not None]
+        self._elementos = []
+        if elementos:
+            self.vaciar(elementos)
+
+    def vaciar(self, elementos: list):
+        raise NotImplementedError
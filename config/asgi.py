@@ -13,4 +13,6 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
+# Necesario para el stream SSE de notificaciones (apps.solicitudes.tiempo_real):
+# servirlo con un servidor ASGI, p. ej. ``uvicorn config.asgi:application``
 application = get_asgi_application()
@@ -49,7 +49,8 @@ SIMPLE_JWT = {
 REST_FRAMEWORK = {
     # "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # Construye el usuario desde los claims del token, sin consultar la BD
+        "apps.autenticacion.authentication.JWTClaimsAuthentication",
         "rest_framework.authentication.TokenAuthentication",
         "rest_framework.authentication.BasicAuthentication",
     ],
@@ -114,6 +115,11 @@ if DATABASE_ENGINE == "sqlite3":
             "NAME": BASE_DIR / "db.sqlite3",
         }
     }
+    # Los índices con ``include=`` (TransicionSolicitud y la primera respuesta
+    # de Solicitud) son índices cubrientes de PostgreSQL, el motor de
+    # producción. SQLite crea el mismo índice sin las columnas incluidas, lo
+    # que basta para desarrollo, así que su advertencia se silencia solo aquí.
+    SILENCED_SYSTEM_CHECKS = ["models.W040"]
 else:
     DATABASES = {
         "default": {
@@ -125,6 +131,20 @@ else:
         }
     }
 
+# Caché (resultados de analítica). Por defecto en memoria del proceso; en
+# producción usar un backend compartido, p. ej. CACHE_URL=rediscache://host:6379/1
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
+# Notificaciones en tiempo real (SSE, requiere servidor ASGI). Con varios
+# workers usar apps.solicitudes.tiempo_real.BackendSocket (mismo servidor) o
+# apps.solicitudes.tiempo_real.BackendPostgres (LISTEN/NOTIFY)
+NOTIFICACIONES_BACKEND = env.str(
+    "NOTIFICACIONES_BACKEND", default="apps.solicitudes.tiempo_real.BackendLocal"
+)
+NOTIFICACIONES_SOCKETS_DIR = env.str(
+    "NOTIFICACIONES_SOCKETS_DIR", default="/tmp/sac-notificaciones"
+)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -165,6 +185,13 @@ STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "solicitudes"
 
+# Archivos privados generados por el sistema (fuera de MEDIA_ROOT, que se sirve
+# públicamente); solo se entregan a través de vistas autenticadas
+PAQUETES_ROOT = env.str("PAQUETES_ROOT", str(BASE_DIR / "privado" / "paquetes"))
+EXPORTACIONES_ROOT = env.str(
+    "EXPORTACIONES_ROOT", str(BASE_DIR / "privado" / "exportaciones")
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 